@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
 from app.schemas.activity import SyncActivityRequest, GetActivityResponse, CreateSessionRequest, GetSessionsResponse
 from app.schemas.responses import StandardResponse
 from app.services.firebase_service import FirebaseService
 from app.dependencies import get_current_user
 from app.models.activity import DailyActivity, Session
+from app.utils.responses import model_response
+from app.utils.etag import versions_etag, etag_matches, etag_headers, not_modified
 from datetime import datetime, timedelta
+from typing import Optional
 
 router = APIRouter()
 firebase_service = FirebaseService()
@@ -42,6 +45,8 @@ async def sync_daily_activity(
             message=f"Activity for {request.date} synced successfully"
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to sync activity: {str(e)}")
 
@@ -49,31 +54,45 @@ async def sync_daily_activity(
 @router.get("/historical", response_model=GetActivityResponse)
 async def get_historical_activity(
     days: int = Query(7, description="Number of days to retrieve (7 or 30)"),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Get historical activity data from cloud
     
-    Returns daily activity summaries for the requested period
+    Returns daily activity summaries for the requested period; supports If-None-Match
     """
     try:
         end_date = datetime.utcnow().date()
         start_date = end_date - timedelta(days=days-1)
         
+        if if_none_match:
+            versions = await firebase_service.get_activity_versions(
+                user_id=current_user["user_id"],
+                start_date=start_date.isoformat(),
+                end_date=end_date.isoformat()
+            )
+            etag = versions_etag('activity', start_date.isoformat(), end_date.isoformat(), versions)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+        
         activity_data = await firebase_service.get_activity_range(
             user_id=current_user["user_id"],
             start_date=start_date.isoformat(),
             end_date=end_date.isoformat()
         )
         
+        etag = versions_etag('activity', start_date.isoformat(), end_date.isoformat(), activity_data)
         daily_activities = [DailyActivity(**data) for data in activity_data]
         
-        return GetActivityResponse(
+        return model_response(GetActivityResponse(
             data=daily_activities,
             days=days,
             start_date=start_date.isoformat(),
             end_date=end_date.isoformat()
-        )
+        ), headers=etag_headers(etag))
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch historical activity: {str(e)}")
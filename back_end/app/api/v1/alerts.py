@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from app.schemas.responses import StandardResponse
 from app.services.firebase_service import FirebaseService
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, is_still_authorized
 from app.models.alert import Alert
+from app.utils.responses import list_response
+from app.services.alert_broker import get_alert_broker
+from app.config import get_settings
 from datetime import datetime, timedelta
-from typing import List
+from typing import List, Optional
+from pydantic import TypeAdapter
 
 router = APIRouter()
 firebase_service = FirebaseService()
+alert_list_adapter = TypeAdapter(List[Alert])
+settings = get_settings()
 
 @router.post("", response_model=StandardResponse, status_code=201)
 async def create_alert(
@@ -38,6 +45,8 @@ async def create_alert(
             data={"alert_id": alert_id}
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create alert: {str(e)}")
 
@@ -60,12 +69,44 @@ async def get_alerts(
         )
         
         alerts = [Alert(**data) for data in alerts_data]
-        return alerts
+        return list_response(alert_list_adapter, alerts)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch alerts: {str(e)}")
 
 
+@router.get("/stream")
+async def stream_alerts(
+    current_user: dict = Depends(get_current_user),
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Server-Sent Events stream of new alerts (text/event-stream)
+    
+    Replaces polling GET /alerts. Frames:
+    - `event: alert` with the alert JSON; remember its `id:` line
+    - `event: resync` when missed alerts can't be replayed; re-fetch GET /alerts
+    - `: ping` comments as heartbeats
+    
+    On reconnect send the last id as Last-Event-ID to receive what was missed.
+    The stream ends at the first heartbeat after the access token expires or
+    is revoked (logout); reconnect with a fresh token.
+    """
+    stream = get_alert_broker().stream(
+        current_user["user_id"],
+        last_event_id=last_event_id,
+        heartbeat_seconds=settings.ALERT_STREAM_HEARTBEAT_SECONDS,
+        authorized=lambda: is_still_authorized(current_user)
+    )
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/{alert_id}/acknowledge", response_model=StandardResponse)
 async def acknowledge_alert(
     alert_id: str,
@@ -83,5 +124,7 @@ async def acknowledge_alert(
             message="Alert acknowledged"
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to acknowledge alert: {str(e)}")
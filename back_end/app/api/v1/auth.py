@@ -1,5 +1,6 @@
-from fastapi import APIRouter, HTTPException, status
-from app.schemas.auth import SignupRequest, LoginRequest, TokenResponse
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.dependencies import get_current_user
+from app.schemas.auth import SignupRequest, LoginRequest, TokenResponse, RefreshTokenRequest
 from app.schemas.responses import StandardResponse, ErrorResponse
 from app.services.auth_service import AuthService
 from app.utils.validators import Validators
@@ -33,19 +34,21 @@ async def signup(request: SignupRequest):
             full_name=request.full_name
         )
         
-        # Generate token
-        token = auth_service.create_token(user_data)
+        # Generate access/refresh tokens for a new session
+        tokens = auth_service.create_tokens(user_data)
         
         return TokenResponse(
-            access_token=token,
             token_type="bearer",
             user_id=user_data['user_id'],
             email=user_data['email'],
-            username=user_data['username']
+            username=user_data['username'],
+            **tokens
         )
     
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Signup failed: {str(e)}")
 
@@ -57,7 +60,7 @@ async def login(request: LoginRequest):
     
     Flutter app should:
     1. Call this endpoint with email/password
-    2. Store the access_token securely
+    2. Store the access_token and refresh_token securely
     3. Call GET /users/me/profile to fetch user data
     4. Store profile in local SQLite
     """
@@ -68,15 +71,15 @@ async def login(request: LoginRequest):
             password=request.password
         )
         
-        # Generate token
-        token = auth_service.create_token(user_data)
+        # Generate access/refresh tokens for a new session
+        tokens = auth_service.create_tokens(user_data)
         
         return TokenResponse(
-            access_token=token,
             token_type="bearer",
             user_id=user_data['user_id'],
             email=user_data['email'],
-            username=user_data['username']
+            username=user_data['username'],
+            **tokens
         )
     
     except ValueError as e:
@@ -84,19 +87,53 @@ async def login(request: LoginRequest):
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Login failed: {str(e)}")
 
 
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh(request: RefreshTokenRequest):
+    """
+    Exchange a refresh token for a new access/refresh token pair
+    
+    The presented refresh token is revoked (rotation): the app must store
+    the new one. Reusing an old refresh token revokes the whole session.
+    """
+    try:
+        result = await auth_service.refresh(request.refresh_token)
+        return TokenResponse(token_type="bearer", **result)
+    
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Token refresh failed: {str(e)}")
+
+
 @router.post("/logout", response_model=StandardResponse)
-async def logout():
+async def logout(current_user: dict = Depends(get_current_user)):
     """
-    Logout endpoint (client-side token removal)
+    Logout: revoke the session's access and refresh tokens
     
-    JWT tokens are stateless, so logout is handled by Flutter app
-    removing the token from secure storage
+    The Flutter app should still remove both tokens from secure storage.
     """
-    return StandardResponse(
-        success=True,
-        message="Logged out successfully. Remove token from client storage."
-    )
+    try:
+        if current_user.get('session_id'):
+            await auth_service.revoke_session(current_user['session_id'], current_user['user_id'])
+        
+        return StandardResponse(
+            success=True,
+            message="Logged out successfully. Remove tokens from client storage."
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Logout failed: {str(e)}")
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from app.schemas.coach import BulkSummaryRequest, PatientSummary
+from app.services.coach_service import CoachService
+from app.dependencies import get_current_coach
+from app.config import get_settings
+import logging
+
+router = APIRouter()
+coach_service = CoachService()
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+@router.post("/summaries", response_class=StreamingResponse)
+async def get_patient_summaries(
+    request: BulkSummaryRequest,
+    current_user: dict = Depends(get_current_coach)
+):
+    """
+    Latest summary for many patients in one call (coach/admin only)
+
+    For each user ID returns the latest VitalsSummary, the number of
+    unacknowledged alerts and the day's activity.
+
+    Response is newline-delimited JSON (one PatientSummary per line),
+    streamed in completion order, not request order. Users the coach
+    isn't assigned to, or whose data couldn't be loaded or is invalid,
+    come back with an "error" field.
+    """
+    user_ids = list(dict.fromkeys(request.user_ids))
+    if len(user_ids) > settings.BULK_SUMMARY_MAX_USERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BULK_SUMMARY_MAX_USERS} users per request"
+        )
+    
+    allowed = coach_service.allowed_user_ids(current_user, user_ids)
+    allowed_set = set(allowed)
+    denied = [user_id for user_id in user_ids if user_id not in allowed_set]
+    
+    async def generate():
+        for user_id in denied:
+            yield PatientSummary(user_id=user_id, error="Not authorized for this user").model_dump_json() + "\n"
+        async for item in coach_service.stream_summaries(allowed, request.date):
+            # The 200 is already sent: one bad document must not cut the stream short
+            try:
+                summary = PatientSummary(**item)
+            except ValidationError as e:
+                logger.warning("Invalid stored summary for user %s: %s", item['user_id'], e)
+                summary = PatientSummary(user_id=item['user_id'], error="Stored data for this user is invalid")
+            yield summary.model_dump_json() + "\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
@@ -1,13 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from app.schemas.responses import StandardResponse
+from app.schemas.nutrition import FoodSearchResponse, AnalyzeMealRequest, MealAnalysisResponse
 from app.services.firebase_service import FirebaseService
+from app.services.food_search_service import FoodSearchService
 from app.dependencies import get_current_user
 from app.models.nutrition import NutritionEntry
+from app.utils.responses import list_response
 from datetime import datetime, timedelta
 from typing import List
+from pydantic import TypeAdapter
 
 router = APIRouter()
 firebase_service = FirebaseService()
+food_search_service = FoodSearchService()
+nutrition_list_adapter = TypeAdapter(List[NutritionEntry])
 
 @router.post("", response_model=StandardResponse, status_code=201)
 async def log_nutrition(
@@ -34,6 +40,8 @@ async def log_nutrition(
             data={"entry_id": entry_id}
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to log nutrition: {str(e)}")
 
@@ -55,23 +63,47 @@ async def get_nutrition_entries(
         )
         
         entries = [NutritionEntry(**data) for data in entries_data]
-        return entries
+        return list_response(nutrition_list_adapter, entries)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch nutrition entries: {str(e)}")
 
 
-@router.post("/analyze", response_model=dict)
-async def analyze_food_image(current_user: dict = Depends(get_current_user)):
+@router.get("/foods/search", response_model=FoodSearchResponse)
+async def search_foods(
+    q: str = Query(..., min_length=1, description="Food name or prefix (typos tolerated)"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of results"),
+    current_user: dict = Depends(get_current_user)
+):
     """
-    Placeholder for future AI-powered food analysis
-    
-    Will use Gen AI to:
-    - Identify food from image
-    - Estimate nutritional values
-    - Suggest similar healthier alternatives
+    Search the bundled food database
+
+    Used for autocomplete while the user types a food name.
+    Nutrient values are per 100 g; serving_g is a typical portion.
+    """
+    return FoodSearchResponse(query=q, results=food_search_service.search(q, limit=limit))
+
+
+@router.post("/analyze", response_model=MealAnalysisResponse)
+async def analyze_meal(
+    request: AnalyzeMealRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Estimate nutrition for a free-text meal description
+
+    Parses food_items (same format as NutritionEntry.food_items), e.g.
+    "2 eggs, 150g rice, 1 cup milk", against the bundled food database.
+    Quantities without a unit use the food's typical serving size.
+    Items that couldn't be matched are returned in 'unmatched'.
     """
-    return {
-        "message": "AI food analysis coming soon!",
-        "note": "This endpoint will integrate with Gen AI backend in the future"
-    }
+    try:
+        analysis = food_search_service.analyze_meal(request.food_items)
+        return MealAnalysisResponse(meal_type=request.meal_type, **analysis)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to analyze meal: {str(e)}")
@@ -1,13 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from app.schemas.activity import CreateSessionRequest, GetSessionsResponse
+from app.schemas.activity import CreateSessionRequest, GetSessionsResponse, SessionTraceResponse
+from app.schemas.vitals import VitalsWindowResponse
 from app.schemas.responses import StandardResponse
 from app.services.firebase_service import FirebaseService
+from app.services.timeseries_service import TimeSeriesService, parse_metrics, window_dates
 from app.dependencies import get_current_user
 from app.models.activity import Session
+from app.utils.responses import model_response
 from datetime import datetime, timedelta
+from typing import Optional
 
 router = APIRouter()
 firebase_service = FirebaseService()
+timeseries_service = TimeSeriesService(firebase_service)
 
 @router.post("", response_model=StandardResponse, status_code=201)
 async def create_session(
@@ -34,6 +39,8 @@ async def create_session(
             data={"session_id": session_id}
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create session: {str(e)}")
 
@@ -57,10 +64,64 @@ async def get_sessions(
         
         sessions = [Session(**data) for data in sessions_data]
         
-        return GetSessionsResponse(
+        return model_response(GetSessionsResponse(
             sessions=sessions,
             total=len(sessions)
-        )
+        ))
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch sessions: {str(e)}")
+
+
+@router.get("/{session_id}/trace", response_model=SessionTraceResponse)
+async def get_session_trace(
+    session_id: str,
+    metrics: str = Query("heart_rate", description="Comma-separated reading fields"),
+    bucket: Optional[int] = Query(None, gt=0, description="Average into buckets of this many timestamp units"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Vitals recorded during a session (start_time to end_time)
+
+    Same data as GET /vitals/window for the session's time range.
+    """
+    try:
+        metric_list = parse_metrics(metrics)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        session_data = await firebase_service.get_session(current_user["user_id"], session_id)
+        if not session_data:
+            raise HTTPException(status_code=404, detail="Session not found")
+        
+        session = Session(**session_data)
+        try:
+            window_dates(session.start_time, session.end_time)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Session can't be traced: {e}")
+        points = await timeseries_service.get_window(
+            user_id=current_user["user_id"],
+            start=session.start_time,
+            end=session.end_time,
+            metrics=metric_list,
+            bucket=bucket
+        )
+        
+        return SessionTraceResponse(
+            session=session,
+            trace=VitalsWindowResponse(
+                start=session.start_time,
+                end=session.end_time,
+                bucket=bucket,
+                metrics=metric_list,
+                points=points
+            )
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch session trace: {str(e)}")
@@ -1,14 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, status
+from fastapi.responses import StreamingResponse
 from app.schemas.user import UserProfileResponse, UpdateProfileRequest
 from app.schemas.responses import StandardResponse
 from app.services.firebase_service import FirebaseService
+from app.services.export_service import EXPORT_FORMATS, ExportService
 from app.dependencies import get_current_user
+from app.utils.etag import make_etag, etag_matches, etag_headers, not_modified
+from app.utils.responses import model_response
+from datetime import datetime
+from typing import Optional
 
 router = APIRouter()
 firebase_service = FirebaseService()
+export_service = ExportService(firebase_service)
 
 @router.get("/me/profile", response_model=UserProfileResponse)
-async def get_my_profile(current_user: dict = Depends(get_current_user)):
+async def get_my_profile(
+    current_user: dict = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
+):
     """
     Get the authenticated user's profile
     
@@ -16,13 +26,23 @@ async def get_my_profile(current_user: dict = Depends(get_current_user)):
     1. Fetch user profile from cloud
     2. Store it in local SQLite user_profile table
     3. Use locally for app operation
+    
+    Send the last ETag in If-None-Match; 304 means the cached profile is current.
     """
     try:
-        profile = await firebase_service.get_user_profile(current_user["user_id"])
+        user_id = current_user["user_id"]
+        if if_none_match:
+            version = await firebase_service.get_user_profile_version(user_id)
+            if version:
+                etag = make_etag('profile', user_id, version)
+                if etag_matches(if_none_match, etag):
+                    return not_modified(etag)
+        
+        profile = await firebase_service.get_user_profile(user_id)
         
         if not profile:
             # Return default profile if none exists
-            return UserProfileResponse(
+            response = UserProfileResponse(
                 user_id=current_user["user_id"],
                 daily_calorie_goal=2000,
                 daily_step_goal=10000,
@@ -32,9 +52,21 @@ async def get_my_profile(current_user: dict = Depends(get_current_user)):
                 daily_carbs_goal=250,
                 daily_fats_goal=70
             )
+        else:
+            response = UserProfileResponse(**profile)
         
-        return UserProfileResponse(**profile)
+        if profile and profile.get('updated_at'):
+            etag = make_etag('profile', user_id, profile['updated_at'])
+        else:
+            # No version marker (default or demo profile): hash the content
+            etag = make_etag('profile', user_id, response.model_dump_json())
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        
+        return model_response(response, headers=etag_headers(etag))
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch profile: {str(e)}")
 
@@ -68,6 +100,8 @@ async def update_my_profile(
             message="Profile updated successfully"
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to update profile: {str(e)}")
 
@@ -90,5 +124,44 @@ async def get_my_info(current_user: dict = Depends(get_current_user)):
             "last_login": user.get('last_login')
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch user info: {str(e)}")
+
+
+@router.get("/me/export", response_class=StreamingResponse)
+async def export_my_data(
+    export_format: str = Query("csv", alias="format", pattern=f"^({'|'.join(EXPORT_FORMATS)})$"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Download all of the authenticated user's data as a zip
+    
+    Contains profile.json, one CSV (or Parquet, with format=parquet) file
+    per collection: vitals readings, daily vitals summaries, activities,
+    sessions, alerts, nutrition; and a manifest.json with row counts,
+    written last. The zip is streamed as it is built, so large accounts
+    start downloading immediately; a zip that doesn't open was cut off.
+    """
+    try:
+        if not export_service.supports(export_format):
+            raise HTTPException(status_code=400, detail="Parquet export is not available on this server, use format=csv")
+        
+        user_id = current_user["user_id"]
+        user = await firebase_service.get_user_by_id(user_id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        profile = await firebase_service.get_user_profile(user_id)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to start export: {str(e)}")
+    
+    filename = f"healthtrack-export-{datetime.utcnow().date().isoformat()}.zip"
+    return StreamingResponse(
+        export_service.stream_archive(user_id, user, profile, export_format),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"}
+    )
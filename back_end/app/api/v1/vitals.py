@@ -1,17 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from app.schemas.vitals import SyncVitalsRequest, GetVitalsResponse
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+from app.schemas.vitals import (
+    SyncVitalsRequest, GetVitalsResponse, PercentilesResponse, VitalsWindowResponse,
+    CreateUploadRequest, UploadStatusResponse,
+)
 from app.schemas.responses import StandardResponse
 from app.services.firebase_service import FirebaseService
+from app.services.percentile_service import SKETCH_METRICS, merge_percentiles
+from app.services.timeseries_service import TimeSeriesService, parse_metrics, window_dates
+from app.services.vitals_ingest import VitalsIngestService
+from app.services.upload_sessions import UploadBusyError, UploadNotFoundError, get_upload_store
 from app.dependencies import get_current_user
-from app.models.vitals import DailyVitals
+from app.models.vitals import DailyVitals, VitalsSummary
+from app.utils.responses import model_response
+from app.utils.etag import make_etag, day_version, versions_etag, etag_matches, etag_headers, not_modified
+from app.utils.columnar_codec import MSGPACK_CONTENT_TYPES, decode_vitals_msgpack
 from datetime import datetime, timedelta
+from typing import Optional
+import asyncio
+import math
 
 router = APIRouter()
 firebase_service = FirebaseService()
+timeseries_service = TimeSeriesService(firebase_service)
+vitals_ingest_service = VitalsIngestService(firebase_service)
+upload_store = get_upload_store()
 
-@router.post("/sync", response_model=StandardResponse)
+@router.post(
+    "/sync",
+    response_model=StandardResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {
+                    k: v for k, v in SyncVitalsRequest.model_json_schema(
+                        ref_template="#/components/schemas/{model}"
+                    ).items() if k != "$defs"
+                }},
+                "application/x-msgpack": {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    },
+)
 async def sync_daily_vitals(
-    request: SyncVitalsRequest,
+    http_request: Request,
     current_user: dict = Depends(get_current_user)
 ):
     """
@@ -22,34 +58,181 @@ async def sync_daily_vitals(
     Request includes:
     - date: "2025-11-17"
     - readings: Array of all vital readings from today (HR, SpO2, temp, etc.)
-    - summary: Aggregated statistics (avg_hr, steps, calories, wellness_score)
+    - summary: Client totals (steps, calories, distance_km, active_minutes)
+    
+    Send Content-Type: application/x-msgpack for the compact columnar
+    format (see app/utils/columnar_codec.py); it is several times smaller
+    and cheaper to decode than JSON for a full day of readings.
+    
+    Heart rate, SpO2 and temperature statistics and wellness_score are
+    computed on the server from the cleaned readings (client values for
+    these fields are ignored). Sustained abnormal readings create alerts.
+    
+    Readings are cleaned before storage: sorted, de-duplicated,
+    impossible values masked and spikes smoothed. The response data
+    has per-step counts under "ingest".
+    
+    When readings carry accelerometer data, steps, active minutes and
+    sleep minutes are recomputed on the server and also written to the
+    day's activity document (hourly breakdown included).
     
     This data moves from "today's real-time data" to "historical data"
     """
+    content_type = http_request.headers.get('content-type', '').split(';')[0].strip().lower()
+    body = await http_request.body()
+    return await _ingest_body(current_user["user_id"], content_type, body)
+
+
+async def _ingest_body(user_id: str, content_type: str, body) -> StandardResponse:
+    """Decode a sync payload (JSON or columnar msgpack) and ingest it"""
+    if content_type in MSGPACK_CONTENT_TYPES:
+        try:
+            date, summary, columns, utc_offset_minutes = decode_vitals_msgpack(body)
+            summary_dict = VitalsSummary(**(summary or {})).dict()
+        except (ValueError, TypeError, ValidationError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid vitals payload: {str(e)}")
+    else:
+        try:
+            request = SyncVitalsRequest.model_validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError([{**err, 'loc': ('body', *err['loc'])} for err in e.errors()])
+        date, summary_dict, columns = request.date, request.summary.dict(), None
+        utc_offset_minutes = request.utc_offset_minutes
+    
     try:
-        readings_dict = [reading.dict() for reading in request.readings]
-        summary_dict = request.summary.dict()
-        
-        await firebase_service.store_daily_vitals(
-            user_id=current_user["user_id"],
-            date=request.date,
-            readings=readings_dict,
-            summary=summary_dict
-        )
+        if columns is not None:
+            report = await vitals_ingest_service.ingest_columns(
+                user_id=user_id,
+                date=date,
+                columns=columns,
+                summary=summary_dict,
+                utc_offset_minutes=utc_offset_minutes
+            )
+        else:
+            report = await vitals_ingest_service.ingest(
+                user_id=user_id,
+                date=date,
+                readings=[reading.dict() for reading in request.readings],
+                summary=summary_dict,
+                utc_offset_minutes=utc_offset_minutes
+            )
         
         return StandardResponse(
             success=True,
-            message=f"Vitals for {request.date} synced successfully"
+            message=f"Vitals for {date} synced successfully",
+            data={"ingest": report}
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to sync vitals: {str(e)}")
 
 
+# ==================== RESUMABLE UPLOADS ====================
+
+@router.post("/uploads", response_model=UploadStatusResponse, status_code=201)
+async def create_upload(
+    request: CreateUploadRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Start a resumable upload of a /vitals/sync payload
+    
+    For payloads too large to send reliably in one request. The response
+    gives chunk_size and chunk_count: PUT each chunk (byte range
+    index * chunk_size onwards) to /uploads/{upload_id}/chunks/{index}
+    with its SHA-256 in X-Chunk-SHA256, in any order and as often as
+    needed, then POST /uploads/{upload_id}/commit. After a dropped
+    connection, GET /uploads/{upload_id} lists the missing chunks.
+    Uploads idle for idle_timeout_seconds are deleted.
+    """
+    content_type = request.content_type.split(';')[0].strip().lower()
+    if content_type != 'application/json' and content_type not in MSGPACK_CONTENT_TYPES:
+        raise HTTPException(status_code=400, detail="content_type must be application/json or application/x-msgpack")
+    try:
+        return await asyncio.to_thread(
+            upload_store.create, current_user["user_id"], content_type, request.total_size, request.sha256
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create upload: {str(e)}")
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadStatusResponse)
+async def get_upload_status(
+    upload_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Which chunks of an upload have been received"""
+    return await _upload_call(upload_store.status, current_user["user_id"], upload_id)
+
+
+@router.put("/uploads/{upload_id}/chunks/{index}", response_model=UploadStatusResponse)
+async def put_upload_chunk(
+    upload_id: str,
+    index: int,
+    http_request: Request,
+    x_chunk_sha256: str = Header(..., description="Hex SHA-256 of the chunk body"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Store one chunk of an upload (the raw bytes are the request body)
+    
+    Re-sending a chunk replaces it. A wrong size or checksum gets 400 and
+    the chunk has to be sent again.
+    """
+    body = bytearray()
+    async for piece in http_request.stream():
+        body += piece
+        if len(body) > upload_store.chunk_size:
+            raise HTTPException(status_code=413, detail=f"Chunks are at most {upload_store.chunk_size} bytes")
+    return await _upload_call(upload_store.put_chunk, current_user["user_id"], upload_id, index, bytes(body), x_chunk_sha256)
+
+
+@router.post("/uploads/{upload_id}/commit", response_model=StandardResponse)
+async def commit_upload(
+    upload_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Assemble a complete upload and ingest it as POST /vitals/sync would
+    
+    Returns the same response as /vitals/sync and deletes the upload. If
+    ingestion fails, the upload is kept and the commit can be retried.
+    """
+    user_id = current_user["user_id"]
+    session, body = await _upload_call(upload_store.assemble, user_id, upload_id)
+    try:
+        response = await _ingest_body(user_id, session['content_type'], body)
+    except BaseException:
+        await asyncio.to_thread(upload_store.release, upload_id)
+        raise
+    del body
+    await asyncio.to_thread(upload_store.finish, upload_id)
+    return response
+
+
+async def _upload_call(method, *args):
+    """Run an UploadStore method in a worker thread, mapping its errors to HTTP statuses"""
+    try:
+        return await asyncio.to_thread(method, *args)
+    except UploadNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload not found (it may have expired or been committed)")
+    except UploadBusyError:
+        raise HTTPException(status_code=409, detail="Upload is being committed")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to process upload: {str(e)}")
+
+
 @router.get("/historical", response_model=GetVitalsResponse)
 async def get_historical_vitals(
     days: int = Query(7, description="Number of days to retrieve (7 or 30)"),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
 ):
     """
     Get historical vitals data from cloud
@@ -64,41 +247,149 @@ async def get_historical_vitals(
     3. Store returned data in local historical_vitals table
     4. Display charts from cached data
     
-    Returns daily aggregated data for the requested period
+    Returns daily aggregated data for the requested period. Send the last
+    ETag in If-None-Match; 304 means no day in the range has been re-synced.
     """
     try:
         # Calculate date range
         end_date = datetime.utcnow().date()
         start_date = end_date - timedelta(days=days-1)
         
+        if if_none_match:
+            # Check the per-day sync markers before loading any readings
+            versions = await firebase_service.get_vitals_versions(
+                user_id=current_user["user_id"],
+                start_date=start_date.isoformat(),
+                end_date=end_date.isoformat()
+            )
+            etag = versions_etag('vitals', start_date.isoformat(), end_date.isoformat(), versions)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+        
         # Fetch from Firebase
         vitals_data = await firebase_service.get_vitals_range(
             user_id=current_user["user_id"],
             start_date=start_date.isoformat(),
             end_date=end_date.isoformat()
         )
+        etag = versions_etag('vitals', start_date.isoformat(), end_date.isoformat(), vitals_data)
         
         # Convert to DailyVitals models
         daily_vitals = [DailyVitals(**data) for data in vitals_data]
         
-        return GetVitalsResponse(
+        return model_response(GetVitalsResponse(
             data=daily_vitals,
             days=days,
             start_date=start_date.isoformat(),
             end_date=end_date.isoformat()
-        )
+        ), headers=etag_headers(etag))
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch historical vitals: {str(e)}")
 
 
+@router.get("/percentiles", response_model=PercentilesResponse)
+async def get_vitals_percentiles(
+    start_date: str = Query(..., description="First day (YYYY-MM-DD)"),
+    end_date: str = Query(..., description="Last day (YYYY-MM-DD), inclusive"),
+    metrics: str = Query("heart_rate", description="Comma-separated: heart_rate, spo2, temperature"),
+    percentiles: str = Query("50,95", description="Comma-separated percentiles, e.g. 5,50,95,99"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Percentiles of vitals over any date range
+
+    Merges the per-day quantile sketches stored at sync time, so a quarter
+    reads ~90 small sketches instead of every raw reading. Values are
+    approximate (typically within a fraction of a unit).
+    """
+    metric_list = [m.strip() for m in metrics.split(',') if m.strip()]
+    unknown = [m for m in metric_list if m not in SKETCH_METRICS]
+    if not metric_list or unknown:
+        raise HTTPException(status_code=400, detail=f"metrics must be from: {', '.join(SKETCH_METRICS)}")
+    
+    try:
+        percentile_list = [float(p) for p in percentiles.split(',') if p.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="percentiles must be numbers between 0 and 100")
+    # float() also accepts nan/inf, which would slip past a range check
+    if not percentile_list or not all(math.isfinite(p) and 0 <= p <= 100 for p in percentile_list):
+        raise HTTPException(status_code=422, detail="percentiles must be numbers between 0 and 100")
+    
+    try:
+        day_docs = await firebase_service.get_vitals_sketches(
+            user_id=current_user["user_id"],
+            start_date=start_date,
+            end_date=end_date
+        )
+        
+        return PercentilesResponse(
+            start_date=start_date,
+            end_date=end_date,
+            metrics=merge_percentiles(day_docs, metric_list, percentile_list)
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to compute percentiles: {str(e)}")
+
+
+@router.get("/window", response_model=VitalsWindowResponse)
+async def get_vitals_window(
+    start: int = Query(..., description="Window start timestamp (same unit as reading timestamps)"),
+    end: int = Query(..., description="Window end timestamp, inclusive"),
+    metrics: str = Query("heart_rate", description="Comma-separated reading fields"),
+    bucket: Optional[int] = Query(None, gt=0, description="Average into buckets of this many timestamp units"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Readings between two timestamps, e.g. heart rate during a workout
+
+    Only the days overlapping the window are loaded, and only the
+    requested metrics are returned. With bucket set, readings are
+    averaged per bucket (aligned to start) and each point has a count.
+    """
+    try:
+        metric_list = parse_metrics(metrics)
+        window_dates(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        points = await timeseries_service.get_window(
+            user_id=current_user["user_id"],
+            start=start,
+            end=end,
+            metrics=metric_list,
+            bucket=bucket
+        )
+        
+        return VitalsWindowResponse(start=start, end=end, bucket=bucket, metrics=metric_list, points=points)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch vitals window: {str(e)}")
+
+
 @router.get("/date/{date}")
 async def get_vitals_by_date(
     date: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    if_none_match: Optional[str] = Header(None)
 ):
-    """Get vitals for a specific date (YYYY-MM-DD)"""
+    """Get vitals for a specific date (YYYY-MM-DD); supports If-None-Match"""
     try:
+        if if_none_match:
+            version = await firebase_service.get_vitals_version(current_user["user_id"], date)
+            if version is not None:
+                etag = make_etag('vitals', date, version)
+                if etag_matches(if_none_match, etag):
+                    return not_modified(etag)
+        
         vitals = await firebase_service.get_vitals_by_date(
             user_id=current_user["user_id"],
             date=date
@@ -107,7 +398,8 @@ async def get_vitals_by_date(
         if not vitals:
             raise HTTPException(status_code=404, detail=f"No vitals found for {date}")
         
-        return vitals
+        etag = make_etag('vitals', date, day_version(vitals))
+        return JSONResponse(content=jsonable_encoder(vitals), headers=etag_headers(etag))
     
     except HTTPException:
         raise
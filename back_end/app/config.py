@@ -1,17 +1,30 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     # App
     APP_NAME: str = "HealthTrack API"
     VERSION: str = "1.0.0"
     DEBUG: bool = True
+    STARTUP_WARMUP: bool = True  # Prime bcrypt/JWT and the Firestore channel before serving
+    
+    # Logging (queued and written to stdout by a background thread)
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True  # One JSON object per line; False for plain text
+    LOG_QUEUE_SIZE: int = 10000  # Records beyond this are dropped rather than blocking requests
+    LOG_DEBUG_SAMPLE_RATE: float = 0.01  # Share of requests whose DEBUG records are kept
     
     # Security
     SECRET_KEY: str = "your-secret-key-change-in-production"
+    METRICS_TOKEN: str = ""  # Sent by the monitoring system as X-Metrics-Token; empty disables /metrics
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15  # Short-lived; clients renew with the refresh token
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30  # Rotated on every /auth/refresh
+    REVOCATION_BLOOM_CAPACITY: int = 100000  # Revoked IDs the bloom filter is sized for
+    REVOCATION_BLOOM_FP_RATE: float = 0.001
+    REVOCATION_MAX_ENTRIES: int = 50000  # Exact denylist size; older entries are confirmed in Firestore
+    REVOCATION_RETRY_SECONDS: float = 30.0  # Retry a failed startup load of revoked sessions this often
     
     # Firebase
     FIREBASE_PROJECT_ID: str = ""
@@ -23,6 +36,86 @@ class Settings(BaseSettings):
     FIREBASE_TOKEN_URI: str = "https://oauth2.googleapis.com/token"
     FIREBASE_CREDENTIALS_PATH: str = ""  # Path to service account JSON file
     
+    # Vitals processing
+    SERVER_ACTIVITY_ANALYSIS: bool = True  # Derive steps/active/sleep minutes from IMU readings
+    SERVER_ALERT_DETECTION: bool = True  # Create alerts for sustained abnormal vitals found at sync
+    VITALS_RAW_RETENTION_DAYS: int = 30  # Then app.jobs.compact_vitals keeps per-minute averages
+    VITALS_MINUTE_RETENTION_DAYS: int = 365  # Then per-hour averages
+    VITALS_WINDOW_MAX_DAYS: int = 7  # Longest range /vitals/window and session traces load
+    
+    # Resumable sync uploads (/vitals/uploads), spooled to local disk until commit
+    UPLOAD_SPOOL_DIR: str = ""  # Empty: <system temp dir>/healthtrack-uploads
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # bytes
+    UPLOAD_MAX_SIZE: int = 64 * 1024 * 1024  # bytes per upload
+    UPLOAD_IDLE_TIMEOUT_SECONDS: float = 6 * 3600.0  # Uploads with no activity this long are deleted
+    UPLOAD_GC_INTERVAL_SECONDS: float = 600.0
+    
+    # Response compression (brotli, or gzip when the client doesn't accept br)
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    
+    # Rate limiting: "<count>/<second|minute|hour|day>" per client (user ID, else IP);
+    # the longest matching path prefix wins, other paths share RATE_LIMIT_DEFAULT
+    RATE_LIMITS: Dict[str, str] = {
+        "/api/v1/auth/login": "10/minute",
+        "/api/v1/auth/signup": "5/minute",
+        "/api/v1/vitals/sync": "20/hour",
+        "/api/v1/coach/summaries": "30/minute",
+        "/api/v1/users/me/export": "5/hour",
+    }
+    RATE_LIMIT_DEFAULT: str = "300/minute"
+    RATE_LIMIT_TRUST_FORWARDED: bool = False  # Key by X-Forwarded-For (only behind a trusted proxy)
+    MAX_CONCURRENT_REQUESTS: int = 256  # Further requests get 503 instead of queueing
+    
+    # Request deadlines in seconds (0 = none); the longest matching path prefix wins
+    REQUEST_DEADLINE_SECONDS: float = 10.0
+    ROUTE_DEADLINES: Dict[str, float] = {
+        "/api/v1/vitals/sync": 30.0,
+        "/api/v1/vitals/uploads": 30.0,
+        "/api/v1/alerts/stream": 0,
+        "/api/v1/coach/summaries": 0,
+        "/api/v1/users/me/export": 0,
+    }
+    FIRESTORE_CALL_TIMEOUT_SECONDS: float = 10.0  # Cap per call, also for streams and background work
+    
+    # Firestore circuit breaker
+    CIRCUIT_WINDOW_SIZE: int = 20  # Recent calls considered
+    CIRCUIT_MIN_CALLS: int = 10  # Calls needed before the circuit can open
+    CIRCUIT_FAILURE_RATE: float = 0.5
+    CIRCUIT_SLOW_CALL_SECONDS: float = 2.0
+    CIRCUIT_SLOW_CALL_RATE: float = 0.8
+    CIRCUIT_OPEN_SECONDS: float = 15.0  # Fail fast this long before probing again
+    CIRCUIT_HALF_OPEN_PROBES: int = 3
+    STALE_CACHE_MAX_ENTRIES: int = 256  # Last good read results kept for fallback
+    STALE_CACHE_TTL_SECONDS: float = 3600.0
+    
+    # Login lookups (email -> user id/password hash)
+    EMAIL_CACHE_TTL_SECONDS: float = 300.0
+    EMAIL_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Profile cache (invalidated across workers via profile_versions)
+    PROFILE_CACHE_TTL_SECONDS: float = 300.0
+    PROFILE_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Deferred writes (last_login, signup default profile)
+    WRITE_BEHIND_FLUSH_SECONDS: float = 1.0
+    WRITE_BEHIND_BATCH_SIZE: int = 200  # Documents per Firestore batch (max 500)
+    
+    # Alert push (GET /alerts/stream)
+    ALERT_STREAM_HEARTBEAT_SECONDS: float = 15.0
+    ALERT_STREAM_REPLAY_SIZE: int = 100  # Recent alerts kept per user for Last-Event-ID replay
+    ALERT_STREAM_QUEUE_SIZE: int = 100  # Undelivered alerts before a slow subscriber is dropped
+    
+    # Coach bulk summaries
+    BULK_SUMMARY_MAX_USERS: int = 500
+    BULK_SUMMARY_CONCURRENCY: int = 16  # Max in-flight Firestore calls per request
+    BULK_SUMMARY_BATCH_SIZE: int = 100  # Documents per batched get_all
+    
+    # Account export (GET /users/me/export); Parquet needs the optional 'pyarrow' package
+    EXPORT_PAGE_SIZE: int = 500  # Documents per read (one Parquet row group per page)
+    EXPORT_VITALS_PAGE_SIZE: int = 1  # Day documents per read (a raw day is ~86k readings)
+    
     # CORS - Allow all origins for development
     ALLOWED_ORIGINS: str = "*"
     
@@ -1,34 +1,84 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.config import get_settings
 from app.services.auth_service import AuthService
+from app.services.coach_service import COACH_ROLES
+from app.utils.request_context import set_request_user
+from typing import Optional
+import hmac
+import time
 
 security = HTTPBearer()
 auth_service = AuthService()
+settings = get_settings()
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+async def get_current_user(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """
     Dependency to get the current authenticated user from JWT token
     Usage: current_user: dict = Depends(get_current_user)
     """
     token = credentials.credentials
     
-    payload = auth_service.verify_token(token)
-    if payload is None:
+    # RateLimitMiddleware has usually verified this token already
+    cached = getattr(request.state, 'auth_payload', None)
+    if cached is not None and cached[0] == token:
+        payload = cached[1]
+    else:
+        payload = auth_service.verify_token(token)
+    if payload is None or await auth_service.is_revoked(payload):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    set_request_user(payload.get('sub'))
     
     return {
         'user_id': payload.get('sub'),
         'email': payload.get('email'),
-        'username': payload.get('username', '')
+        'username': payload.get('username', ''),
+        'session_id': payload.get('sid'),
+        'token_id': payload.get('jti'),
+        'expires_at': payload.get('exp'),
     }
 
-async def get_optional_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+async def is_still_authorized(current_user: dict) -> bool:
+    """For long-lived responses (SSE): the request's token hasn't expired or been revoked since"""
+    if current_user.get('expires_at') is not None and time.time() >= current_user['expires_at']:
+        return False
+    return not await auth_service.is_revoked({
+        'jti': current_user.get('token_id'),
+        'sid': current_user.get('session_id'),
+        'exp': current_user.get('expires_at'),
+    })
+
+async def get_optional_user(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """Optional authentication - returns None if not authenticated"""
     try:
-        return await get_current_user(credentials)
+        return await get_current_user(request, credentials)
     except:
         return None
+
+async def get_current_coach(current_user: dict = Depends(get_current_user)) -> dict:
+    """
+    Dependency for clinician endpoints
+    Requires role 'coach' or 'admin' on the users/{id} document
+    """
+    user = await auth_service.firebase_service.get_user_by_id(current_user['user_id'])
+    if not user or user.get('role') not in COACH_ROLES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Coach or admin role required",
+        )
+    
+    return {**current_user, 'role': user['role'], 'patient_ids': user.get('patient_ids', [])}
+
+async def require_metrics_token(x_metrics_token: Optional[str] = Header(None)):
+    """
+    Dependency for internal endpoints (/metrics)
+    Requires X-Metrics-Token to match METRICS_TOKEN; with no token configured they don't exist
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if x_metrics_token is None or not hmac.compare_digest(x_metrics_token.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid metrics token")
@@ -0,0 +1,312 @@
+"""
+Vitals retention and compaction job
+
+Downsamples the raw readings of old daily_vitals documents according to
+the retention policy: raw readings for VITALS_RAW_RETENTION_DAYS, then
+per-minute averages, then (after VITALS_MINUTE_RETENTION_DAYS) per-hour
+averages. Compacted readings keep the VitalReading shape, with one reading
+per minute/hour at the bucket start plus a `samples` count, so history and
+window queries keep working; the day's summary, sketches and hourly rollups
+(computed from the raw data at sync) are left as they are.
+
+Run from the back_end directory:
+    python -m app.jobs.compact_vitals [--max-seconds 300] [--batch-size 50] [--dry-run]
+
+Days are processed oldest first, a date at a time, in batched writes. The
+position (per-resolution watermarks and the last document written) is
+checkpointed in the same batch as the writes, so the job can run in short
+time slices (--max-seconds) and resumes where it stopped. A day re-synced
+while it is being compacted fails its conditional write; the checkpoint
+then stays put and the page is re-read (up to PAGE_ATTEMPTS times) so it
+is compacted from its new contents. A day re-synced after the job has
+passed its date stays raw until a --full run.
+
+Requires a collection-group index on daily_vitals.date.
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import argparse
+import logging
+import time
+
+import numpy as np
+
+from app.config import get_settings
+from app.utils.vitals_columns import (
+    INTEGER_FIELDS, NUMERIC_FIELDS, MILLISECONDS_THRESHOLD, columns_to_readings, readings_to_columns, take,
+)
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+STATE_COLLECTION = 'job_state'
+STATE_DOCUMENT = 'compact_vitals'
+
+# resolution -> bucket seconds; a missing resolution field means raw readings
+RESOLUTIONS = {'minute': 60, 'hour': 3600}
+RANK = {None: 0, 'minute': 1, 'hour': 2}
+# Reads of a page whose documents keep changing under us before moving past them
+PAGE_ATTEMPTS = 3
+
+
+# ==================== DOWNSAMPLING ====================
+
+def downsample_readings(readings: List[dict], bucket_seconds: int) -> List[dict]:
+    """
+    Average readings into fixed buckets aligned to the epoch
+
+    Each bucket becomes one reading at the bucket start: the mean of every
+    numeric field (weighted by `samples` when the input is itself
+    compacted, so minute -> hour equals raw -> hour), the most frequent
+    activity_state, and the number of raw samples it stands for.
+    """
+    if not readings:
+        return []
+    columns = readings_to_columns(readings)
+    weights = np.fromiter((r.get('samples') or 1 for r in readings), dtype=np.float64, count=len(readings))
+    order = np.argsort(columns['timestamp'], kind='stable')
+    columns, weights = take(columns, order), weights[order]
+
+    timestamps = columns['timestamp']
+    unit = 1000 if timestamps.max() > MILLISECONDS_THRESHOLD else 1
+    bucket = bucket_seconds * unit
+    keys = timestamps // bucket
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+    out = {'timestamp': keys[starts] * bucket}
+    for field in NUMERIC_FIELDS:
+        values = columns[field]
+        valid = ~np.isnan(values)
+        if not valid.any():
+            continue
+        totals = np.add.reduceat(np.where(valid, values * weights, 0.0), starts)
+        counts = np.add.reduceat(np.where(valid, weights, 0.0), starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = totals / counts
+        out[field] = means if field in INTEGER_FIELDS else np.round(means, 3)
+
+    states = columns['activity_state']
+    ends = np.r_[starts[1:], len(timestamps)]
+    out['activity_state'] = np.array([
+        _most_common(states[start:end]) for start, end in zip(starts.tolist(), ends.tolist())
+    ], dtype=object)
+
+    compacted = columns_to_readings(out)
+    samples = np.add.reduceat(weights, starts).astype(np.int64).tolist()
+    for reading, count in zip(compacted, samples):
+        reading['samples'] = count
+    return compacted
+
+
+def _most_common(states: np.ndarray) -> Optional[str]:
+    present = [state for state in states.tolist() if state is not None]
+    return Counter(present).most_common(1)[0][0] if present else None
+
+
+def compacted_fields(data: dict, resolution: str) -> Optional[dict]:
+    """Fields to update on a day document, or None if it is already at (or past) resolution"""
+    if RANK[data.get('resolution')] >= RANK[resolution]:
+        return None
+    readings = downsample_readings(data.get('readings') or [], RESOLUTIONS[resolution])
+    return {
+        'readings': readings,
+        'readings_sorted': True,
+        'first_timestamp': readings[0]['timestamp'] if readings else None,
+        'last_timestamp': readings[-1]['timestamp'] if readings else None,
+        'resolution': resolution,
+        'compacted_at': datetime.utcnow().isoformat(),
+    }
+
+
+# ==================== POLICY AND STATE ====================
+
+def cutoffs(today: date, raw_days: int, minute_days: int) -> Tuple[str, str]:
+    """(raw_cutoff, hour_cutoff): days before raw_cutoff lose raw readings, days before hour_cutoff go hourly"""
+    return (today - timedelta(days=raw_days)).isoformat(), (today - timedelta(days=minute_days)).isoformat()
+
+
+def next_day(day: str) -> str:
+    return (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+
+
+def next_work_date(state: dict, raw_cutoff: str, hour_cutoff: str) -> Optional[Tuple[str, str]]:
+    """
+    (date, target resolution) to work on next, or None when caught up
+
+    state['hour_through'] / state['minute_through']: every day before it is
+    already at hour / at least minute resolution.
+    """
+    day = min(state['hour_through'], state['minute_through'])
+    while day < raw_cutoff:
+        if day < hour_cutoff:
+            return day, 'hour'
+        if day >= state['minute_through']:
+            return day, 'minute'
+        day = state['minute_through']
+    return None
+
+
+def advance(state: dict, day: str, resolution: str) -> dict:
+    """State after every document of day has been brought to resolution"""
+    following = next_day(day)
+    state = {**state, 'cursor': None}
+    state['minute_through'] = max(state['minute_through'], following)
+    if resolution == 'hour':
+        state['hour_through'] = max(state['hour_through'], following)
+    return state
+
+
+def earliest_date(db) -> Optional[str]:
+    query = db.collection_group('daily_vitals').select(['date']).order_by('date').limit(1)
+    for doc in query.stream():
+        return doc.to_dict().get('date')
+    return None
+
+
+# ==================== FIRESTORE ====================
+
+def commit_page(db, updates: List[tuple], state_ref, state: dict) -> List[str]:
+    """
+    Commit one page of updates together with the checkpoint; returns the
+    paths of documents skipped because they changed since they were read
+
+    The checkpoint is only written when nothing was skipped, so the caller
+    can re-read the page.
+    """
+    from google.api_core.exceptions import FailedPrecondition
+
+    batch = db.batch()
+    for ref, fields, option in updates:
+        batch.update(ref, fields, option=option)
+    batch.set(state_ref, state)
+    try:
+        batch.commit()
+        return []
+    except FailedPrecondition:
+        pass
+
+    # A day was re-synced after we read it: write the others one by one
+    conflicts = []
+    for ref, fields, option in updates:
+        try:
+            ref.update(fields, option=option)
+        except FailedPrecondition:
+            conflicts.append(ref.path)
+    if not conflicts:
+        state_ref.set(state)
+    return conflicts
+
+
+def run(db, raw_days: int, minute_days: int, batch_size: int = 50, max_seconds: Optional[float] = None,
+        full: bool = False, dry_run: bool = False) -> dict:
+    """Compact until caught up or max_seconds has passed; returns counters for this run"""
+    if minute_days < raw_days:
+        raise ValueError("Minute retention must be at least as long as raw retention")
+
+    started = time.monotonic()
+    state_ref = db.collection(STATE_COLLECTION).document(STATE_DOCUMENT)
+    snapshot = state_ref.get()
+    state = snapshot.to_dict() if snapshot.exists and not full else None
+    raw_cutoff, hour_cutoff = cutoffs(date.today(), raw_days, minute_days)
+    if state is None:
+        first = earliest_date(db) or raw_cutoff
+        state = {'minute_through': first, 'hour_through': first, 'cursor': None}
+
+    report: Dict[str, float] = {'days': 0, 'skipped': 0, 'conflicts': 0,
+                                'readings_before': 0, 'readings_after': 0, 'finished': False}
+    attempts = 0
+    while True:
+        work = next_work_date(state, raw_cutoff, hour_cutoff)
+        if work is None:
+            report['finished'] = True
+            break
+        if max_seconds is not None and time.monotonic() - started >= max_seconds:
+            break
+        day, resolution = work
+
+        query = db.collection_group('daily_vitals').where('date', '==', day).limit(batch_size)
+        cursor = state.get('cursor')
+        if cursor and cursor.get('date') == day:
+            query = query.start_after(db.document(cursor['after']).get())
+        docs = list(query.stream())
+
+        updates = []
+        for doc in docs:
+            data = doc.to_dict()
+            fields = compacted_fields(data, resolution)
+            if fields is None:
+                report['skipped'] += 1
+                continue
+            report['readings_before'] += len(data.get('readings') or [])
+            report['readings_after'] += len(fields['readings'])
+            updates.append((doc.reference, fields, db.write_option(last_update_time=doc.update_time)))
+
+        previous = state
+        if len(docs) < batch_size:
+            state = advance(state, day, resolution)
+        else:
+            state = {**state, 'cursor': {'date': day, 'after': docs[-1].reference.path}}
+        state['updated_at'] = datetime.utcnow().isoformat()
+
+        conflicts = []
+        if not dry_run and (updates or len(docs) < batch_size):
+            conflicts = commit_page(db, updates, state_ref, state)
+        report['days'] += len(updates) - len(conflicts)
+        if not conflicts:
+            attempts = 0
+            continue
+
+        attempts += 1
+        if attempts < PAGE_ATTEMPTS:
+            # Re-read the same page: the written documents are skipped, the changed ones compacted afresh
+            state = previous
+            continue
+        logger.warning("Leaving %d document(s) of %s raw, they changed on every attempt: %s",
+                       len(conflicts), day, ', '.join(conflicts))
+        state_ref.set(state)
+        report['conflicts'] += len(conflicts)
+        attempts = 0
+
+    report['elapsed_seconds'] = round(time.monotonic() - started, 2)
+    report['position'] = {key: state[key] for key in ('minute_through', 'hour_through')}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Downsample old raw vitals readings per the retention policy")
+    parser.add_argument('--raw-days', type=int, default=settings.VITALS_RAW_RETENTION_DAYS,
+                        help="Keep raw readings this many days")
+    parser.add_argument('--minute-days', type=int, default=settings.VITALS_MINUTE_RETENTION_DAYS,
+                        help="Keep minute averages this many days, hourly after that")
+    parser.add_argument('--batch-size', type=int, default=50, help="Day documents per read page and write batch")
+    parser.add_argument('--max-seconds', type=float, default=None, help="Stop (resumably) after this long")
+    parser.add_argument('--full', action='store_true', help="Ignore the checkpoint and recheck every day")
+    parser.add_argument('--dry-run', action='store_true', help="Compute but don't write anything")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    from firebase_admin import firestore
+    from app.utils.firebase_admin import initialize_firebase
+    import firebase_admin
+
+    initialize_firebase()
+    if not firebase_admin._apps:
+        logger.error("Firebase is not configured - vitals compaction needs Firestore")
+        raise SystemExit(1)
+
+    report = run(firestore.client(), args.raw_days, args.minute_days, max(args.batch_size, 1),
+                 args.max_seconds, args.full, args.dry_run)
+    logger.info("Compacted %d day(s): %d readings -> %d (%d already compacted, %d left raw after changing "
+                "during the run) in %ss", report['days'], report['readings_before'], report['readings_after'],
+                report['skipped'], report['conflicts'], report['elapsed_seconds'])
+    if args.dry_run:
+        logger.info("Dry run, nothing written")
+    elif report['finished']:
+        logger.info("Retention policy applied through %s", report['position'])
+    else:
+        logger.info("Stopped at the time limit at %s; run again to continue", report['position'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,397 @@
+"""
+Population analytics batch job
+
+Computes cohort statistics (age band, heart condition) over every user's
+daily vitals summaries and stores them in analytics/population.
+
+Run from the back_end directory:
+    python -m app.jobs.population_analytics [--partitions 8] [--processes 4] [--full]
+
+The job is incremental: only daily_vitals documents synced since the last
+run are read. Per-cohort results are kept as mergeable partial states
+(count/sum/sum of squares/min/max/histogram), so new days are merged into
+the stored state instead of recomputing from scratch.
+
+What each day contributed is recorded per (user, date) in analytics_days,
+so a day re-synced after it was counted replaces its earlier values
+instead of being counted twice. The checkpoint is the newest synced_at
+actually read, and each run re-reads a short overlap before it, so days
+whose write landed while a run was scanning are picked up by the next one
+(days already counted at the same synced_at are skipped). Run with --full
+to rebuild from scratch.
+
+Requires a collection-group index on daily_vitals.synced_at.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Tuple
+import argparse
+import logging
+import math
+import os
+import time
+
+ANALYTICS_COLLECTION = 'analytics'
+POPULATION_DOCUMENT = 'population'
+# analytics_days/{user_id}_{date}: what a day contributed to the population states
+CONTRIBUTIONS_COLLECTION = 'analytics_days'
+EPOCH = '1970-01-01T00:00:00'
+
+# Re-read this much before the checkpoint: writes stamped just before the
+# previous run's scan may only have become visible after it
+RESCAN_OVERLAP = timedelta(minutes=10)
+WRITE_BATCH_SIZE = 400
+
+logger = logging.getLogger(__name__)
+
+# summary field -> histogram bin width
+METRICS = {
+    'avg_heart_rate': 5,
+    'min_heart_rate': 5,  # resting heart rate proxy
+    'avg_spo2': 1,
+    'avg_temperature': 0.2,
+    'steps': 1000,
+    'wellness_score': 5,
+}
+
+AGE_BANDS = ((0, 30, 'under_30'), (30, 45, '30-44'), (45, 60, '45-59'), (60, 200, '60_plus'))
+
+
+def age_band(age: Optional[int]) -> str:
+    if age is None:
+        return 'unknown'
+    for low, high, label in AGE_BANDS:
+        if low <= age < high:
+            return label
+    return 'unknown'
+
+
+def cohorts_for(profile: dict) -> List[str]:
+    """Cohort keys a user contributes to"""
+    return [
+        'all',
+        f"age_band:{age_band(profile.get('age'))}",
+        f"heart_condition:{str(bool(profile.get('has_heart_condition'))).lower()}",
+    ]
+
+
+# ==================== MERGEABLE STATE ====================
+
+def empty_metric_state() -> dict:
+    return {'n': 0, 'sum': 0.0, 'sumsq': 0.0, 'min': None, 'max': None, 'hist': {}}
+
+
+def add_value(state: dict, value: float, bin_width: float):
+    state['n'] += 1
+    state['sum'] += value
+    state['sumsq'] += value * value
+    state['min'] = value if state['min'] is None else min(state['min'], value)
+    state['max'] = value if state['max'] is None else max(state['max'], value)
+    key = str(round(math.floor(value / bin_width) * bin_width, 6))
+    state['hist'][key] = state['hist'].get(key, 0) + 1
+
+
+def remove_value(state: dict, value: float, bin_width: float):
+    """
+    Undo add_value (for a re-synced day)
+
+    min/max can't be un-merged: when the removed value was the minimum or
+    maximum, they fall back to the edges of the remaining histogram bins.
+    """
+    state['n'] -= 1
+    state['sum'] -= value
+    state['sumsq'] -= value * value
+    key = str(round(math.floor(value / bin_width) * bin_width, 6))
+    if state['hist'].get(key, 0) > 1:
+        state['hist'][key] -= 1
+    else:
+        state['hist'].pop(key, None)
+    if state['n'] <= 0 or not state['hist']:
+        state.update(empty_metric_state())
+        return
+    bins = sorted(float(key) for key in state['hist'])
+    if value == state['min']:
+        state['min'] = bins[0]
+    if value == state['max']:
+        state['max'] = round(bins[-1] + bin_width, 6)
+
+
+def merge_metric_states(a: dict, b: dict) -> dict:
+    merged = {
+        'n': a['n'] + b['n'],
+        'sum': a['sum'] + b['sum'],
+        'sumsq': a['sumsq'] + b['sumsq'],
+        'min': min((v for v in (a['min'], b['min']) if v is not None), default=None),
+        'max': max((v for v in (a['max'], b['max']) if v is not None), default=None),
+        'hist': dict(a['hist']),
+    }
+    for key, count in b['hist'].items():
+        merged['hist'][key] = merged['hist'].get(key, 0) + count
+    return merged
+
+
+def merge_partials(a: Dict[str, Dict[str, dict]], b: Dict[str, Dict[str, dict]]) -> Dict[str, Dict[str, dict]]:
+    """Merge {cohort: {metric: state}} partial results"""
+    merged = {cohort: dict(metrics) for cohort, metrics in a.items()}
+    for cohort, metrics in b.items():
+        target = merged.setdefault(cohort, {})
+        for metric, state in metrics.items():
+            target[metric] = merge_metric_states(target[metric], state) if metric in target else state
+    return merged
+
+
+def compute_partial(records: List[Tuple[List[str], dict]]) -> Dict[str, Dict[str, dict]]:
+    """
+    Pool worker: fold (cohorts, summary) records into partial states
+
+    Top-level so it can be pickled by multiprocessing.
+    """
+    partial: Dict[str, Dict[str, dict]] = {}
+    for cohorts, summary in records:
+        for metric, bin_width in METRICS.items():
+            value = summary.get(metric)
+            if value is None:
+                continue
+            for cohort in cohorts:
+                state = partial.setdefault(cohort, {}).setdefault(metric, empty_metric_state())
+                add_value(state, float(value), bin_width)
+    return partial
+
+
+def subtract_partial(states: Dict[str, Dict[str, dict]], records: List[Tuple[List[str], dict]]):
+    """Remove (cohorts, values) records counted earlier from states, in place"""
+    for cohorts, values in records:
+        for metric, bin_width in METRICS.items():
+            value = values.get(metric)
+            if value is None:
+                continue
+            for cohort in cohorts:
+                state = states.get(cohort, {}).get(metric)
+                if state is not None and state['n'] > 0:
+                    remove_value(state, float(value), bin_width)
+
+
+def contribution_values(summary: dict) -> dict:
+    return {metric: float(summary[metric]) for metric in METRICS if summary.get(metric) is not None}
+
+
+def counted_contribution(contribution: Optional[dict], completed_run: str) -> Optional[dict]:
+    """
+    The contribution a day has in the stored states
+
+    A contribution written by a run that never finished (its population
+    document wasn't saved) isn't counted yet; the one it replaced is.
+    """
+    if contribution is None:
+        return None
+    if contribution.get('run_at', '') <= completed_run:
+        return contribution
+    return contribution.get('replaces')
+
+
+def finalize(state: dict) -> dict:
+    """Mean, standard deviation and histogram percentiles from a partial state"""
+    n = state['n']
+    if n == 0:
+        return {'count': 0}
+    mean = state['sum'] / n
+    variance = max(state['sumsq'] / n - mean * mean, 0.0)
+
+    bins = sorted((float(key), count) for key, count in state['hist'].items())
+    percentiles = {}
+    for q in (5, 25, 50, 75, 95):
+        target, seen = q / 100 * n, 0
+        for low, count in bins:
+            seen += count
+            if seen >= target:
+                percentiles[f'p{q}'] = low
+                break
+
+    return {
+        'count': n,
+        'mean': round(mean, 3),
+        'std': round(math.sqrt(variance), 3),
+        'min': state['min'],
+        'max': state['max'],
+        **percentiles,
+    }
+
+
+# ==================== FIRESTORE SCANNING ====================
+
+def time_partitions(start: str, end: str, count: int) -> List[Tuple[str, str]]:
+    """Split (start, end] into count contiguous synced_at ranges"""
+    start_dt, end_dt = datetime.fromisoformat(start), datetime.fromisoformat(end)
+    step = (end_dt - start_dt) / count
+    bounds = [start_dt + step * i for i in range(count)] + [end_dt]
+    return [(bounds[i].isoformat(), bounds[i + 1].isoformat()) for i in range(count)]
+
+
+def scan_partition(db, low: str, high: str) -> List[Tuple[str, str, str, dict]]:
+    """Read (user_id, date, synced_at, summary) for daily_vitals synced in (low, high]"""
+    query = db.collection_group('daily_vitals') \
+        .where('synced_at', '>', low) \
+        .where('synced_at', '<=', high) \
+        .select(['date', 'synced_at', 'summary'])
+    rows = []
+    for doc in query.stream():
+        data = doc.to_dict()
+        rows.append((doc.reference.parent.parent.id, data.get('date') or doc.id, data['synced_at'], data.get('summary') or {}))
+    return rows
+
+
+def earliest_synced_at(db) -> Optional[str]:
+    """Oldest synced_at across all users, so a first run partitions real data"""
+    query = db.collection_group('daily_vitals').select(['synced_at']).order_by('synced_at').limit(1)
+    for doc in query.stream():
+        return doc.to_dict().get('synced_at')
+    return None
+
+
+def load_profiles(db, user_ids: List[str], batch_size: int = 100) -> Dict[str, dict]:
+    """Batched point reads of users/{id}/profile/data"""
+    profiles = {}
+    for i in range(0, len(user_ids), batch_size):
+        refs = [
+            db.collection('users').document(user_id).collection('profile').document('data')
+            for user_id in user_ids[i:i + batch_size]
+        ]
+        for doc in db.get_all(refs, field_paths=['age', 'has_heart_condition']):
+            if doc.exists:
+                profiles[doc.reference.parent.parent.id] = doc.to_dict()
+    return profiles
+
+
+def load_contributions(db, keys: List[str], batch_size: int = 100) -> Dict[str, dict]:
+    """Batched point reads of analytics_days/{user_id}_{date}"""
+    contributions = {}
+    for i in range(0, len(keys), batch_size):
+        refs = [db.collection(CONTRIBUTIONS_COLLECTION).document(key) for key in keys[i:i + batch_size]]
+        for doc in db.get_all(refs):
+            if doc.exists:
+                contributions[doc.id] = doc.to_dict()
+    return contributions
+
+
+def write_results(db, doc_ref, result: dict, contributions: Dict[str, dict]):
+    """
+    Write the day contributions, then the population document
+
+    The population document goes in the last batch: until it is written,
+    the new contributions are not treated as counted (counted_contribution).
+    """
+    writes = [(db.collection(CONTRIBUTIONS_COLLECTION).document(key), data) for key, data in contributions.items()]
+    writes.append((doc_ref, result))
+    for i in range(0, len(writes), WRITE_BATCH_SIZE):
+        batch = db.batch()
+        for ref, data in writes[i:i + WRITE_BATCH_SIZE]:
+            batch.set(ref, data)
+        batch.commit()
+
+
+def run(db, partitions: int = 8, processes: int = 4, full: bool = False, dry_run: bool = False) -> dict:
+    """Run one incremental pass; returns the document written to analytics/population"""
+    doc_ref = db.collection(ANALYTICS_COLLECTION).document(POPULATION_DOCUMENT)
+    snapshot = doc_ref.get()
+    stored = snapshot.to_dict() if snapshot.exists and not full else {}
+    watermark = stored.get('watermark')
+    if watermark is None:
+        earliest = earliest_synced_at(db)
+        # Step back a microsecond so the oldest document falls inside (low, high]
+        low = (datetime.fromisoformat(earliest) - timedelta(microseconds=1)).isoformat() if earliest else EPOCH
+    else:
+        low = max((datetime.fromisoformat(watermark) - RESCAN_OVERLAP).isoformat(), EPOCH)
+    now = datetime.utcnow().isoformat()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=partitions) as executor:
+        chunks = list(executor.map(lambda bounds: scan_partition(db, *bounds), time_partitions(low, now, partitions)))
+    # Latest sync of each (user, date)
+    latest: Dict[str, Tuple[str, str, str, dict]] = {}
+    for row in (row for chunk in chunks for row in chunk):
+        key = f"{row[0]}_{row[1]}"
+        if key not in latest or row[2] > latest[key][2]:
+            latest[key] = row
+    logger.info("Read %d day(s) from %d partition(s) in %.2fs", len(latest), partitions, time.perf_counter() - started)
+
+    completed_run = stored.get('run_at', '')
+    previous = {} if full else load_contributions(db, sorted(latest))
+    profiles = load_profiles(db, sorted({user_id for user_id, _, _, _ in latest.values()}))
+
+    additions, removals, contributions = [], [], {}
+    for key, (user_id, date, synced_at, summary) in latest.items():
+        counted = counted_contribution(previous.get(key), completed_run)
+        if counted is not None and counted['synced_at'] == synced_at:
+            continue  # Already counted (read again in the overlap)
+        if counted is not None:
+            removals.append((counted['cohorts'], counted['values']))
+        contribution = {
+            'user_id': user_id,
+            'date': date,
+            'synced_at': synced_at,
+            'cohorts': cohorts_for(profiles.get(user_id, {})),
+            'values': contribution_values(summary),
+        }
+        additions.append((contribution['cohorts'], contribution['values']))
+        contributions[key] = {**contribution, 'run_at': now, 'replaces': counted and {
+            field: counted[field] for field in ('user_id', 'date', 'synced_at', 'cohorts', 'values', 'run_at')
+        }}
+
+    # One slice per process; each worker returns a small partial state
+    slices = [additions[i::processes] for i in range(processes)] if additions else []
+    partial: Dict[str, Dict[str, dict]] = {}
+    if slices:
+        with Pool(processes=processes) as pool:
+            for result in pool.imap_unordered(compute_partial, slices):
+                partial = merge_partials(partial, result)
+
+    states = {cohort: {metric: dict(state, hist=dict(state['hist'])) for metric, state in metrics.items()}
+              for cohort, metrics in stored.get('states', {}).items()}
+    subtract_partial(states, removals)
+    states = merge_partials(states, partial)
+    result = {
+        'states': states,
+        'stats': {
+            cohort: {metric: finalize(state) for metric, state in metrics.items()}
+            for cohort, metrics in states.items()
+        },
+        # Newest sync actually read; the next run re-reads RESCAN_OVERLAP before it
+        'watermark': max([watermark or low] + [row[2] for row in latest.values()]),
+        'days_processed': stored.get('days_processed', 0) + len(additions) - len(removals),
+        'run_at': now,
+        'updated_at': now,
+    }
+    logger.info("Counted %d new and %d re-synced day(s)", len(additions) - len(removals), len(removals))
+
+    if dry_run:
+        logger.info("Dry run, nothing written")
+    else:
+        write_results(db, doc_ref, result, contributions)
+        logger.info("Population analytics updated (%d day(s) total)", result['days_processed'])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute population vitals analytics")
+    parser.add_argument('--partitions', type=int, default=8, help="Parallel synced_at partitions to scan")
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 2, help="Aggregation worker processes")
+    parser.add_argument('--full', action='store_true', help="Ignore stored state and rebuild from all data")
+    parser.add_argument('--dry-run', action='store_true', help="Compute but don't write results")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    from firebase_admin import firestore
+    from app.utils.firebase_admin import initialize_firebase
+    import firebase_admin
+
+    initialize_firebase()
+    if not firebase_admin._apps:
+        logger.error("Firebase is not configured - population analytics needs Firestore")
+        raise SystemExit(1)
+
+    run(firestore.client(), args.partitions, max(args.processes, 1), args.full, args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,78 @@
-from fastapi import FastAPI
+import asyncio
+import contextvars
+import logging
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import get_settings
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.request_context import RequestContextMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware, rate_limit_stats
+from app.services.write_behind import get_write_behind
+from app.services.profile_cache import get_profile_cache
+from app.services.alert_broker import get_alert_broker
+from app.services.firebase_service import email_cache_stats
+from app.utils.single_flight import get_single_flight
+from app.utils.circuit_breaker import get_firestore_breaker, stale_stats
 from app.utils.firebase_admin import initialize_firebase
-from app.api.v1 import auth, users, vitals, activities, alerts, sessions, nutrition
+from app.utils.log import logging_stats, setup_logging, stop_logging
+from app.middleware.error_handler import logged_http_exception_handler
+from app.services.warmup import warm_up
+from app.services.auth_service import AuthService
+from app.dependencies import require_metrics_token
+from app.services.token_revocation import get_revocation_list
+from app.services.upload_sessions import get_upload_store
+from app.api.v1 import auth, users, vitals, activities, alerts, sessions, nutrition, coach
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Importing the app has no side effects; logging, Firebase and warm-up happen here
+    setup_logging(settings.LOG_LEVEL, settings.LOG_JSON, settings.LOG_QUEUE_SIZE, settings.LOG_DEBUG_SAMPLE_RATE)
+    await asyncio.to_thread(initialize_firebase)
+    # Revoked sessions must stay rejected after a restart; if they can't be loaded
+    # the worker still starts, checks them in Firestore and keeps retrying the load
+    auth_service = AuthService()
+    revocation_retry = None
+    if not await auth_service.load_revocations():
+        revocation_retry = asyncio.get_running_loop().create_task(
+            auth_service.retry_load_revocations(settings.REVOCATION_RETRY_SECONDS), context=contextvars.Context())
+    if settings.STARTUP_WARMUP:
+        timings = await warm_up()
+        logger.info("Warm-up done", extra={'timings_ms': timings})
+    # Deletes resumable uploads left idle (abandoned by the client)
+    get_upload_store().start_gc(settings.UPLOAD_GC_INTERVAL_SECONDS)
+    yield
+    await get_upload_store().stop_gc()
+    if revocation_retry is not None:
+        revocation_retry.cancel()
+    # Commit queued last_login/profile writes before the worker exits
+    await get_write_behind().drain()
+    get_profile_cache().stop_listener()
+    get_revocation_list().stop_listener()
+    stop_logging()
 
-# Initialize Firebase
-initialize_firebase()
 
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.VERSION,
     debug=settings.DEBUG,
-    description="HealthTrack Backend API for multi-user health monitoring with cloud sync"
+    description="HealthTrack Backend API for multi-user health monitoring with cloud sync",
+    lifespan=lifespan
+)
+
+# Rate limits and load shedding (innermost, so rejections still get CORS headers)
+app.add_middleware(
+    RateLimitMiddleware,
+    limits=settings.RATE_LIMITS,
+    default_limit=settings.RATE_LIMIT_DEFAULT,
+    max_in_flight=settings.MAX_CONCURRENT_REQUESTS,
+    exempt_paths=("/health", "/metrics", "/api/v1/alerts/stream"),
+    trust_forwarded=settings.RATE_LIMIT_TRUST_FORWARDED,
 )
 
 # CORS - Allow all origins for development
@@ -25,6 +84,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses (negotiated br/gzip, small bodies skipped)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+
+# Per-request state (request ID, deadline, stale-data flag) and the request log line
+app.add_middleware(RequestContextMiddleware)
+
+# Log 5xx responses with the exception behind them before rendering as usual
+app.add_exception_handler(StarletteHTTPException, logged_http_exception_handler)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
 app.include_router(users.router, prefix="/api/v1/users", tags=["Users"])
@@ -33,6 +106,7 @@ app.include_router(activities.router, prefix="/api/v1/activities", tags=["Activi
 app.include_router(alerts.router, prefix="/api/v1/alerts", tags=["Alerts"])
 app.include_router(sessions.router, prefix="/api/v1/sessions", tags=["Sessions"])
 app.include_router(nutrition.router, prefix="/api/v1/nutrition", tags=["Nutrition"])
+app.include_router(coach.router, prefix="/api/v1/coach", tags=["Coach"])
 
 @app.get("/")
 def root():
@@ -45,3 +119,20 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy", "service": "healthtrack-api"}
+
+@app.get("/metrics", dependencies=[Depends(require_metrics_token)])
+def metrics():
+    """In-process cache/queue statistics for this worker (monitoring only, see METRICS_TOKEN)"""
+    write_behind = get_write_behind()
+    return {
+        "profile_cache": get_profile_cache().stats(),
+        "email_cache": email_cache_stats(),
+        "write_behind": {**write_behind.stats, "pending": write_behind.pending_count()},
+        "alert_stream": {"subscribers": get_alert_broker().subscriber_count()},
+        "circuit_breaker": {**get_firestore_breaker().snapshot(), "stale_served": stale_stats['served']},
+        "rate_limit": rate_limit_stats(),
+        "token_revocation": get_revocation_list().snapshot(),
+        "single_flight": {**get_single_flight().stats, "in_flight": get_single_flight().in_flight()},
+        "logging": logging_stats(),
+        "uploads": get_upload_store().stats,
+    }
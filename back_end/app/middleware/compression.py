@@ -0,0 +1,147 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Optional
+import zlib
+
+try:
+    import brotli
+except ImportError:  # In requirements.txt; without it, gzip only
+    brotli = None
+
+# Already compressed or must not be buffered/transformed
+EXCLUDED_CONTENT_TYPES = (
+    'text/event-stream', 'application/zip', 'application/gzip', 'application/x-msgpack',
+    'image/', 'video/', 'audio/',
+)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header (honours q=0)"""
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip()] = q
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == 'br':
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # 31 = gzip container
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        if self._brotli is not None:
+            out = self._brotli.process(data)
+            return out + self._brotli.flush() if flush else out
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self) -> bytes:
+        if self._brotli is not None:
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """
+    Negotiated brotli/gzip response compression
+
+    Single-body responses smaller than minimum_size are sent as-is.
+    Streaming responses are compressed chunk by chunk and flushed after
+    each chunk so NDJSON lines reach the client without waiting for the
+    end of the stream. Event streams and already-compressed types are
+    never touched. Every other response gets Vary: Accept-Encoding,
+    compressed or not, so shared caches keep the encodings apart.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding', ''))
+
+        start_message: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, compressor, passthrough
+
+            if message['type'] == 'http.response.start':
+                start_message = message
+                headers = Headers(raw=message['headers'])
+                content_type = headers.get('content-type', '')
+                passthrough = (
+                    'content-encoding' in headers
+                    or any(content_type.startswith(excluded) for excluded in EXCLUDED_CONTENT_TYPES)
+                )
+                if not passthrough:
+                    MutableHeaders(raw=message['headers']).add_vary_header('Accept-Encoding')
+                    passthrough = encoding is None
+                if passthrough:
+                    await send(message)
+                return
+
+            if message['type'] != 'http.response.body' or passthrough:
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+
+            if start_message is not None:
+                headers = MutableHeaders(raw=start_message['headers'])
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+                headers['Content-Encoding'] = encoding
+                if more_body:
+                    del headers['Content-Length']
+                    await send(start_message)
+                    start_message = None
+                    await send({
+                        'type': 'http.response.body',
+                        'body': compressor.compress(body, flush=True),
+                        'more_body': True,
+                    })
+                    return
+
+                compressed = compressor.compress(body) + compressor.finish()
+                headers['Content-Length'] = str(len(compressed))
+                await send(start_message)
+                start_message = None
+                await send({'type': 'http.response.body', 'body': compressed})
+                return
+
+            # Continuation of a streaming response
+            if more_body:
+                await send({'type': 'http.response.body', 'body': compressor.compress(body, flush=True), 'more_body': True})
+            else:
+                await send({'type': 'http.response.body', 'body': compressor.compress(body) + compressor.finish()})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,7 +1,11 @@
 from fastapi import Request, status
+from fastapi.exception_handlers import http_exception_handler as default_http_exception_handler
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
+import logging
+
+logger = logging.getLogger('app.errors')
 
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     """Handle HTTP exceptions"""
@@ -35,3 +39,20 @@ async def general_exception_handler(request: Request, exc: Exception):
             "detail": str(exc)
         }
     )
+
+async def logged_http_exception_handler(request: Request, exc: StarletteHTTPException):
+    """
+    Log server-side errors, then respond exactly like FastAPI's default handler
+
+    Routers turn unexpected exceptions into HTTPException(500, ...) inside
+    their except blocks, so the original exception (and its traceback) is
+    the HTTPException's __context__.
+    """
+    if exc.status_code >= 500:
+        cause = exc.__cause__ or exc.__context__
+        if cause is not None:
+            logger.error("%s %s failed: %s", request.method, request.url.path, exc.detail,
+                         exc_info=(type(cause), cause, cause.__traceback__))
+        else:
+            logger.warning("%s %s returned %d: %s", request.method, request.url.path, exc.status_code, exc.detail)
+    return await default_http_exception_handler(request, exc)
@@ -0,0 +1,93 @@
+import json
+import math
+
+from app.utils.rate_limit import ConcurrencyLimiter, RouteLimits, TokenBucketLimiter, client_ip
+from app.utils.request_context import set_request_user
+from app.utils.security import SecurityUtils
+
+
+class RateLimitMiddleware:
+    """
+    Per-client token-bucket rate limiting plus global load shedding
+
+    Clients are keyed by the user ID of a valid bearer token, else by IP
+    address. The verified token payload is kept in request.state so
+    get_current_user doesn't decode it a second time. Over its route's
+    limit a client gets 429; when max_in_flight requests are already being
+    handled, new ones get 503 instead of queueing behind them. Paths in
+    exempt_paths (health checks, long-lived streams) are neither limited
+    nor counted.
+    """
+
+    def __init__(self, app, limits: dict, default_limit: str, max_in_flight: int,
+                 exempt_paths: tuple = (), trust_forwarded: bool = False):
+        self.app = app
+        self.routes = RouteLimits(limits, default_limit)
+        self.buckets = TokenBucketLimiter()
+        self.concurrency = ConcurrencyLimiter(max_in_flight)
+        self.exempt_paths = tuple(exempt_paths)
+        self.trust_forwarded = trust_forwarded
+        _limiters.append(self)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'].startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        client = self._identify(scope)
+        name, capacity, refill = self.routes.match(scope['path'])
+        allowed, retry_after = self.buckets.allow((name, client), capacity, refill)
+        if not allowed:
+            await _reject(send, 429, "Rate limit exceeded", retry_after)
+            return
+
+        if not self.concurrency.try_acquire():
+            await _reject(send, 503, "Server busy, retry shortly", 1.0)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.concurrency.release()
+
+    def _identify(self, scope) -> str:
+        for name, value in scope.get('headers', ()):
+            if name == b'authorization':
+                scheme, _, token = value.decode('latin-1').partition(' ')
+                if scheme.lower() == 'bearer' and token:
+                    payload = SecurityUtils.verify_token(token)
+                    scope.setdefault('state', {})['auth_payload'] = (token, payload)
+                    if payload and payload.get('sub'):
+                        set_request_user(payload['sub'])
+                        return 'user:' + payload['sub']
+                break
+        return 'ip:' + (client_ip(scope, self.trust_forwarded) or 'unknown')
+
+    def snapshot(self) -> dict:
+        return {
+            **self.buckets.stats,
+            'shed': self.concurrency.stats['shed'],
+            'in_flight': self.concurrency.in_flight,
+            'peak_in_flight': self.concurrency.stats['peak'],
+        }
+
+
+async def _reject(send, status_code: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status_code,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            (b'retry-after', str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+# Instances built by the app's middleware stack (for /metrics)
+_limiters: list = []
+
+
+def rate_limit_stats() -> dict:
+    return _limiters[-1].snapshot() if _limiters else {}
@@ -0,0 +1,72 @@
+import logging
+import re
+
+from app.utils.request_context import begin_request
+from app.utils.deadlines import route_deadline
+
+STALE_HEADER = b'x-data-stale'
+REQUEST_ID_HEADER = b'x-request-id'
+
+# Incoming request IDs are echoed into logs, so only accept plain tokens
+_VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+logger = logging.getLogger('app.request')
+
+
+class RequestContextMiddleware:
+    """
+    Creates the per-request state (app.utils.request_context), including
+    the route's deadline and a request ID, and turns flags set while
+    handling the request into response headers: X-Request-ID always,
+    X-Data-Stale: true when a read fell back to the last good value. Stale
+    responses lose their ETag: the body may be a reduced copy (vitals
+    without readings) and must not be revalidated as the current version.
+
+    A client-supplied X-Request-ID is kept so logs correlate end to end.
+    One log line per request records status, duration and backend time.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        state = begin_request(route_deadline(scope['path']), _incoming_request_id(scope))
+        status_code = 500
+
+        async def send_with_flags(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                headers = list(message.get('headers', []))
+                headers.append((REQUEST_ID_HEADER, state.request_id.encode()))
+                if state.stale:
+                    headers = [(name, value) for name, value in headers if name.lower() != b'etag']
+                    headers.append((STALE_HEADER, b'true'))
+                message['headers'] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_flags)
+        finally:
+            logger.info(
+                "%s %s %d", scope['method'], scope['path'], status_code,
+                extra={
+                    'status': status_code,
+                    'duration_ms': round(state.elapsed_ms(), 1),
+                    'backend_calls': len(state.timings),
+                    'backend_ms': round(sum(ms for _, ms in state.timings), 1),
+                    'stale': state.stale,
+                },
+            )
+
+
+def _incoming_request_id(scope):
+    for name, value in scope.get('headers', ()):
+        if name == REQUEST_ID_HEADER:
+            request_id = value.decode('latin-1')
+            return request_id if _VALID_REQUEST_ID.match(request_id) else None
+    return None
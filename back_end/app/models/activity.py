@@ -2,7 +2,7 @@ from pydantic import BaseModel
 from typing import List, Optional, Dict
 
 class HourlyActivity(BaseModel):
-    hour: int  # 0-23
+    hour: int  # 0-23 from local midnight (24 on a 25-hour DST day)
     steps: int = 0
     calories: int = 0
     distance_km: float = 0.0
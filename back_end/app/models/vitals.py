@@ -25,6 +25,7 @@ class VitalsSummary(BaseModel):
     calories: int = 0
     distance_km: float = 0.0
     active_minutes: int = 0
+    sleep_minutes: Optional[int] = None
     wellness_score: Optional[int] = None
 
 class DailyVitals(BaseModel):
@@ -33,3 +34,4 @@ class DailyVitals(BaseModel):
     readings: List[VitalReading]
     summary: VitalsSummary
     synced_at: Optional[str] = None
+    resolution: Optional[str] = None  # None: raw readings; 'minute' or 'hour' once compacted
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from typing import List, Optional
 from app.models.activity import DailyActivity, Session, HourlyActivity
+from app.schemas.vitals import VitalsWindowResponse
 
 class SyncActivityRequest(BaseModel):
     date: str  # YYYY-MM-DD
@@ -32,3 +33,7 @@ class CreateSessionRequest(BaseModel):
 class GetSessionsResponse(BaseModel):
     sessions: List[Session]
     total: int
+
+class SessionTraceResponse(BaseModel):
+    session: Session
+    trace: VitalsWindowResponse
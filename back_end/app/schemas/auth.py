@@ -17,6 +17,8 @@ class TokenResponse(BaseModel):
     user_id: str
     email: str
     username: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None  # access token lifetime in seconds
 
 class RefreshTokenRequest(BaseModel):
     refresh_token: str
@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field, field_validator
+from datetime import datetime
+from typing import List, Optional
+from app.models.vitals import VitalsSummary
+from app.models.activity import DailyActivity
+
+class BulkSummaryRequest(BaseModel):
+    user_ids: List[str] = Field(..., min_length=1)
+    date: Optional[str] = None  # YYYY-MM-DD, defaults to today (UTC)
+
+    @field_validator('date')
+    @classmethod
+    def check_date(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None:
+            datetime.strptime(value, '%Y-%m-%d')  # ValueError -> 422
+        return value
+
+class PatientSummary(BaseModel):
+    """One line of the NDJSON stream returned by POST /coach/summaries"""
+    user_id: str
+    summary_date: Optional[str] = None
+    summary: Optional[VitalsSummary] = None
+    unacknowledged_alerts: int = 0
+    activity: Optional[DailyActivity] = None
+    error: Optional[str] = None
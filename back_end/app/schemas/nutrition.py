@@ -0,0 +1,39 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class NutrientValues(BaseModel):
+    calories: float
+    protein_g: float
+    carbs_g: float
+    fats_g: float
+    fiber_g: float
+    sugar_g: float
+    sodium_mg: float
+
+class FoodSearchResult(BaseModel):
+    name: str
+    score: float
+    serving_g: float
+    serving_unit: str
+    per_100g: NutrientValues
+
+class FoodSearchResponse(BaseModel):
+    query: str
+    results: List[FoodSearchResult]
+
+class AnalyzeMealRequest(BaseModel):
+    food_items: str  # Comma-separated, e.g. "2 eggs, 150g rice, 1 cup milk"
+    meal_type: Optional[str] = None
+
+class AnalyzedFoodItem(NutrientValues):
+    input: str
+    food: str
+    quantity: float
+    unit: str
+    grams: float
+
+class MealAnalysisResponse(BaseModel):
+    meal_type: Optional[str] = None
+    items: List[AnalyzedFoodItem]
+    unmatched: List[str]
+    totals: NutrientValues
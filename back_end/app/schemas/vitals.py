@@ -1,14 +1,49 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Union
 from app.models.vitals import VitalReading, VitalsSummary, DailyVitals
 
 class SyncVitalsRequest(BaseModel):
     date: str  # YYYY-MM-DD
     readings: List[VitalReading]
     summary: VitalsSummary
+    utc_offset_minutes: Optional[int] = Field(None, ge=-840, le=840)  # At local midnight; inferred if missing
+
+class CreateUploadRequest(BaseModel):
+    content_type: str = "application/json"  # Of the assembled payload, as for POST /vitals/sync
+    total_size: int = Field(gt=0)  # bytes
+    sha256: Optional[str] = Field(None, pattern=r"^[0-9a-fA-F]{64}$")  # Of the whole payload, checked at commit
+
+class UploadStatusResponse(BaseModel):
+    upload_id: str
+    content_type: str
+    total_size: int
+    chunk_size: int  # Every chunk but the last is exactly this size
+    chunk_count: int
+    received: List[int]
+    missing: List[int]
+    idle_timeout_seconds: float  # Uploads with no activity this long are deleted
 
 class GetVitalsResponse(BaseModel):
     data: List[DailyVitals]
     days: int
     start_date: str
     end_date: str
+
+class MetricPercentiles(BaseModel):
+    days: int  # Days in range that had a sketch for this metric
+    count: int  # Readings represented
+    min: Optional[float] = None
+    max: Optional[float] = None
+    percentiles: Dict[str, Optional[float]]  # {"p50": 72.0, "p95": 118.5}
+
+class PercentilesResponse(BaseModel):
+    start_date: str
+    end_date: str
+    metrics: Dict[str, MetricPercentiles]
+
+class VitalsWindowResponse(BaseModel):
+    start: int
+    end: int
+    bucket: Optional[int] = None  # Bucket width in timestamp units, None for raw readings
+    metrics: List[str]
+    points: List[Dict[str, Union[int, float, None]]]  # {"timestamp": ..., "heart_rate": ..., "count": ... (bucketed)}
@@ -0,0 +1,166 @@
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+import asyncio
+import json
+import uuid
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Sent instead of a replay when the client's Last-Event-ID can't be honoured
+# (buffer overrun, server restart, slow consumer); the app should re-fetch GET /alerts
+RESYNC_EVENT = 'resync'
+
+
+class AlertBroker:
+    """
+    In-process per-user pub/sub for new alerts
+
+    Each user keeps a small ring buffer of recent events so a reconnecting
+    client can replay from Last-Event-ID. Subscribers are bounded queues;
+    an idle connection costs one queue and one suspended coroutine.
+
+    Event IDs are "<broker epoch>-<sequence>": an ID from another process
+    or an earlier run can't be replayed and yields a resync event instead.
+    Alerts are only delivered to subscribers connected to the same worker.
+    """
+
+    def __init__(self, replay_size: int = 100, queue_size: int = 100, max_users: int = 10000):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.replay_size = replay_size
+        self.queue_size = queue_size
+        self.max_users = max_users
+        self._seq = 0
+        self._buffers: 'OrderedDict[str, Deque[Tuple[int, dict]]]' = OrderedDict()
+        self._evicted: Dict[str, int] = {}  # newest sequence dropped from each user's buffer
+        self._evicted_users_seq = 0  # newest sequence lost when a whole buffer was dropped
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def _event_id(self, seq: int) -> str:
+        return f"{self.epoch}-{seq}"
+
+    def _parse_event_id(self, event_id: Optional[str]) -> Optional[int]:
+        epoch, _, seq = (event_id or '').partition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def publish(self, user_id: str, alert: dict) -> Optional[str]:
+        """Record an alert and push it to the user's live subscribers"""
+        buffer = self._buffers.get(user_id)
+        if buffer is None:
+            buffer = self._buffers[user_id] = deque(maxlen=self.replay_size)
+            if len(self._buffers) > self.max_users:
+                evicted_user, evicted = self._buffers.popitem(last=False)
+                self._evicted.pop(evicted_user, None)
+                if evicted:
+                    self._evicted_users_seq = max(self._evicted_users_seq, evicted[-1][0])
+        else:
+            self._buffers.move_to_end(user_id)
+            # Re-syncing a day re-creates server alerts with the same ID
+            if alert.get('id') and any(event.get('id') == alert['id'] for _, event in buffer):
+                return None
+
+        self._seq += 1
+        if len(buffer) == buffer.maxlen:
+            self._evicted[user_id] = buffer[0][0]
+        buffer.append((self._seq, alert))
+        event = (self._event_id(self._seq), alert)
+        for queue in list(self._subscribers.get(user_id, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer: cut it off; it reconnects and resyncs
+                self._drop(user_id, queue)
+        return event[0]
+
+    def _drop(self, user_id: str, queue: asyncio.Queue):
+        self._unsubscribe(user_id, queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait((None, None))
+
+    def _unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def replay(self, user_id: str, last_event_id: Optional[str]) -> Optional[List[Tuple[str, dict]]]:
+        """Events after last_event_id, or None if the gap can't be filled"""
+        seq = self._parse_event_id(last_event_id)
+        if seq is None:
+            return None
+        buffer = self._buffers.get(user_id)
+        if buffer is None:
+            # The user's buffer may have been dropped after the client's last event
+            return [] if seq >= self._evicted_users_seq else None
+        if seq < self._evicted.get(user_id, 0):
+            return None
+        return [(self._event_id(s), alert) for s, alert in buffer if s > seq]
+
+    async def stream(self, user_id: str, last_event_id: Optional[str] = None, heartbeat_seconds: float = 15.0,
+                     authorized: Optional[Callable[[], Awaitable[bool]]] = None) -> AsyncIterator[str]:
+        """
+        Yield SSE frames for a user: replay, then live alerts and heartbeats
+
+        authorized is awaited at each heartbeat; the stream ends once it
+        returns False (the token expired or was revoked).
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        # Subscribed before replaying, so an alert published in between is in both: send it once
+        delivered = 0
+        try:
+            yield f"retry: {int(heartbeat_seconds * 1000)}\n\n"
+            if last_event_id:
+                events = self.replay(user_id, last_event_id)
+                if events is None:
+                    yield format_sse(RESYNC_EVENT, {}, self._event_id(self._seq))
+                else:
+                    for event_id, alert in events:
+                        delivered = self._parse_event_id(event_id)
+                        yield format_sse('alert', alert, event_id)
+
+            while True:
+                try:
+                    event_id, alert = await asyncio.wait_for(queue.get(), timeout=heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    if authorized is not None and not await authorized():
+                        return
+                    # Comment frame keeps proxies from closing the idle connection
+                    yield ": ping\n\n"
+                    continue
+                if event_id is None:
+                    yield format_sse(RESYNC_EVENT, {}, None)
+                    return
+                if self._parse_event_id(event_id) <= delivered:
+                    continue
+                yield format_sse('alert', alert, event_id)
+        finally:
+            self._unsubscribe(user_id, queue)
+
+
+def format_sse(event: str, data: dict, event_id: Optional[str]) -> str:
+    """Serialize one Server-Sent Event frame"""
+    frame = f"event: {event}\n"
+    if event_id:
+        frame += f"id: {event_id}\n"
+    return frame + f"data: {json.dumps(data, default=str, separators=(',', ':'))}\n\n"
+
+
+_alert_broker: Optional[AlertBroker] = None
+
+
+def get_alert_broker() -> AlertBroker:
+    """Process-wide alert broker"""
+    global _alert_broker
+    if _alert_broker is None:
+        _alert_broker = AlertBroker(replay_size=settings.ALERT_STREAM_REPLAY_SIZE,
+                                    queue_size=settings.ALERT_STREAM_QUEUE_SIZE)
+    return _alert_broker
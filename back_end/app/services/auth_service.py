@@ -1,7 +1,16 @@
 from app.utils.security import SecurityUtils
 from app.services.firebase_service import FirebaseService
-from datetime import datetime
+from app.services.token_revocation import SESSION_KIND, get_revocation_list
+from app.config import get_settings
+from datetime import datetime, timedelta
 from typing import Optional
+import asyncio
+import logging
+import time
+import uuid
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
 
 class AuthService:
     def __init__(self):
@@ -40,7 +49,8 @@ class AuthService:
             'daily_carbs_goal': 250,
             'daily_fats_goal': 70,
         }
-        await self.firebase_service.update_user_profile(user_id, default_profile)
+        # Deferred: GET /users/me/profile serves the same defaults until it lands
+        await self.firebase_service.update_user_profile(user_id, default_profile, defer=True)
         
         return {
             'user_id': user_id,
@@ -59,8 +69,8 @@ class AuthService:
         if not self.security.verify_password(password, user['password_hash']):
             raise ValueError("Invalid credentials")
         
-        # Update last login
-        await self.firebase_service.update_user(user['id'], {'last_login': datetime.utcnow().isoformat()})
+        # Update last login (off the response path; coalesced per user)
+        await self.firebase_service.update_user(user['id'], {'last_login': datetime.utcnow().isoformat()}, defer=True)
         
         return {
             'user_id': user['id'],
@@ -68,15 +78,119 @@ class AuthService:
             'username': user.get('username', ''),
         }
     
-    def create_token(self, user_data: dict) -> str:
-        """Create JWT access token"""
+    def create_tokens(self, user_data: dict, session_id: Optional[str] = None) -> dict:
+        """
+        Create an access/refresh token pair
+        
+        Both carry the session ID (sid) the pair belongs to: a new one at
+        login, the same one when rotating, so logout can revoke them together.
+        """
         token_data = {
             'sub': user_data['user_id'],
             'email': user_data['email'],
-            'username': user_data.get('username', '')
+            'username': user_data.get('username', ''),
+            'sid': session_id or uuid.uuid4().hex,
+        }
+        return {
+            'access_token': self.security.create_access_token(token_data),
+            'refresh_token': self.security.create_refresh_token(token_data),
+            'expires_in': settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
         }
-        return self.security.create_access_token(token_data)
     
     def verify_token(self, token: str) -> Optional[dict]:
         """Verify and decode JWT token"""
         return self.security.verify_token(token)
+    
+    async def is_revoked(self, payload: dict) -> bool:
+        """
+        Whether the token's session has been revoked
+        
+        Answered from memory; Firestore is read only for a bloom filter hit
+        the in-memory denylist can no longer confirm (or for every session
+        while the revocations couldn't be loaded).
+        """
+        token_ids = [payload['sid']] if payload.get('sid') else []
+        if not token_ids:
+            return False
+        revocations = get_revocation_list()
+        revoked, unconfirmed = revocations.check(token_ids)
+        if revoked or unconfirmed is None:
+            return revoked
+        if await self.firebase_service.is_token_id_revoked(unconfirmed):
+            revocations.add(unconfirmed, payload['exp'])
+            return True
+        return False
+    
+    async def refresh(self, refresh_token: str) -> dict:
+        """
+        Rotate a refresh token: the presented token is revoked and a new pair
+        for the same session is returned
+        
+        Presenting an already rotated refresh token means it leaked (or the
+        client replayed it), so the whole session is revoked.
+        """
+        payload = self.security.verify_token(refresh_token, token_type='refresh')
+        if payload is None or not payload.get('sid'):
+            raise ValueError("Invalid refresh token")
+        
+        user_data = {
+            'user_id': payload['sub'],
+            'email': payload.get('email', ''),
+            'username': payload.get('username', ''),
+        }
+        # Revoking the presented token is the atomic step: only one caller can do it
+        if await self.is_revoked(payload) or not await self._revoke(payload['jti'], 'token', payload['sub'], payload['exp']):
+            await self.revoke_session(payload['sid'], payload['sub'])
+            raise ValueError("Refresh token has been revoked")
+        
+        return {**user_data, **self.create_tokens(user_data, session_id=payload['sid'])}
+    
+    async def revoke_session(self, session_id: str, user_id: str):
+        """Revoke every access and refresh token of a session (logout)"""
+        # Outlives any refresh token of the session, which are rotated at most this long ago
+        expires_at = time.time() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS).total_seconds()
+        await self._revoke(session_id, SESSION_KIND, user_id, expires_at)
+    
+    async def _revoke(self, token_id: str, kind: str, user_id: str, expires_at: float) -> bool:
+        """
+        Revoke in Firestore, then (sessions only) in memory; False if it was
+        already revoked
+        
+        A failed write raises before anything is recorded, so the token stays
+        usable (and retryable) rather than revoked on this worker only.
+        """
+        stored = await self.firebase_service.revoke_token_id(token_id, kind, user_id, expires_at)
+        if self.firebase_service.demo_mode:
+            # Nothing is stored: the in-memory list is the only record
+            return get_revocation_list().add(token_id, expires_at)
+        if kind == SESSION_KIND:
+            # The listener may have added it already; the store decides who revoked it first
+            get_revocation_list().add(token_id, expires_at)
+        return stored
+    
+    async def load_revocations(self) -> bool:
+        """
+        Follow new session revocations and load the unexpired ones (app
+        startup); False if Firestore couldn't be read
+        
+        Until a load succeeds every session is checked in Firestore.
+        """
+        revocations = get_revocation_list()
+        if not self.firebase_service.demo_mode:
+            # Listening first, so a revocation made during the load isn't missed
+            revocations.start_listener(self.firebase_service.db)
+        try:
+            revocations.load(await self.firebase_service.get_revoked_session_ids())
+        except Exception as e:
+            revocations.mark_incomplete()
+            logger.warning("Revoked sessions not loaded, checking them in Firestore until they are: %s", e)
+            return False
+        return True
+    
+    async def retry_load_revocations(self, interval: float):
+        """Retry load_revocations every interval seconds until it succeeds"""
+        while True:
+            await asyncio.sleep(interval)
+            if await self.load_revocations():
+                logger.info("Revoked sessions loaded")
+                return
@@ -0,0 +1,84 @@
+from app.services.firebase_service import FirebaseService
+from app.config import get_settings
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+import asyncio
+
+settings = get_settings()
+
+COACH_ROLES = ('coach', 'admin')
+
+
+class CoachService:
+    def __init__(self, firebase_service: Optional[FirebaseService] = None):
+        self.firebase_service = firebase_service or FirebaseService()
+
+    def allowed_user_ids(self, coach: dict, user_ids: List[str]) -> List[str]:
+        """
+        Filter requested user IDs down to the ones this coach may see
+
+        Admins see everyone; coaches only the users listed in their
+        'patient_ids' field on the users/{coach_id} document.
+        """
+        if coach.get('role') == 'admin':
+            return user_ids
+        patients = set(coach.get('patient_ids') or [])
+        return [user_id for user_id in user_ids if user_id in patients]
+
+    async def stream_summaries(self, user_ids: List[str], date: Optional[str] = None) -> AsyncIterator[dict]:
+        """
+        Yield each user's latest summary as soon as it is ready
+
+        Today's vitals and activity documents are fetched with one get_all per
+        batch of users; users with no vitals today fall back to a per-user
+        "latest day" query. All Firestore work shares one semaphore so a large
+        request never has more than BULK_SUMMARY_CONCURRENCY calls in flight.
+        """
+        date = date or datetime.utcnow().date().isoformat()
+        semaphore = asyncio.Semaphore(settings.BULK_SUMMARY_CONCURRENCY)
+        batch_size = settings.BULK_SUMMARY_BATCH_SIZE
+
+        async def load_batch(batch: List[str]):
+            async with semaphore:
+                return await asyncio.gather(
+                    self.firebase_service.get_vitals_summaries_batch(batch, date),
+                    self.firebase_service.get_activities_batch(batch, date),
+                )
+
+        async def load_user(user_id: str, batch_task: asyncio.Task) -> dict:
+            try:
+                vitals_by_user, activity_by_user = await batch_task
+                vitals = vitals_by_user.get(user_id)
+                async with semaphore:
+                    if vitals is None:
+                        vitals = await self.firebase_service.get_latest_vitals_summary(user_id)
+                async with semaphore:
+                    unacknowledged = await self.firebase_service.count_unacknowledged_alerts(user_id)
+
+                return {
+                    'user_id': user_id,
+                    'summary_date': vitals.get('date') if vitals else None,
+                    'summary': vitals.get('summary') if vitals else None,
+                    'unacknowledged_alerts': unacknowledged,
+                    'activity': activity_by_user.get(user_id),
+                }
+            except Exception as e:
+                return {'user_id': user_id, 'error': str(e)}
+
+        batch_tasks = [
+            asyncio.create_task(load_batch(user_ids[i:i + batch_size]))
+            for i in range(0, len(user_ids), batch_size)
+        ]
+        user_tasks = [
+            asyncio.create_task(load_user(user_id, batch_tasks[i // batch_size]))
+            for i, user_id in enumerate(user_ids)
+        ]
+
+        try:
+            for next_done in asyncio.as_completed(user_tasks):
+                yield await next_done
+        finally:
+            # Client went away or we finished: don't leave work running
+            for task in user_tasks + batch_tasks:
+                task.cancel()
+            await asyncio.gather(*user_tasks, *batch_tasks, return_exceptions=True)
@@ -0,0 +1,249 @@
+"""
+Full-account data export (GET /users/me/export)
+
+The export is a zip streamed straight into the response:
+
+    profile.json              account fields (no password hash) and health profile
+    vitals_readings.<ext>     one row per reading (raw, or minute/hour averages once compacted)
+    vitals_daily.<ext>        one row per day: the day's VitalsSummary
+    activities.<ext>          DailyActivity rows (hourly_breakdown as a JSON string)
+    sessions.<ext>, alerts.<ext>, nutrition.<ext>
+    manifest.json             format, export time and row count per file (written last)
+
+<ext> is csv, or parquet with the optional 'pyarrow' package installed.
+Each collection is read a page at a time and every page is encoded
+(CSV rows, or one Parquet row group) and compressed into the zip before
+the next is read, so memory stays at about one page whatever the size
+of the account. The zip uses data descriptors, so it never has to seek
+back: if the stream breaks part-way, the client is left with a zip that
+has no central directory and fails to open rather than a silently
+truncated file.
+"""
+from app.services.firebase_service import FirebaseService
+from app.config import get_settings
+from app.models.activity import DailyActivity, Session
+from app.models.alert import Alert
+from app.models.nutrition import NutritionEntry
+from app.models.vitals import VitalsSummary
+from app.utils.vitals_columns import INTEGER_FIELDS, NUMERIC_FIELDS
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple, get_args
+import asyncio
+import csv
+import io
+import json
+import logging
+import time
+import zipfile
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Optional dependency: CSV only
+    pyarrow = None
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('csv', 'parquet')
+
+# Fields never exported
+ACCOUNT_EXCLUDED_FIELDS = ('password_hash',)
+
+_KINDS = {int: 'int', float: 'float', bool: 'bool', str: 'str'}
+
+
+def _model_columns(model) -> List[Tuple[str, str]]:
+    """(name, kind) for each model field; kind is int/float/bool/str, or json for nested values"""
+    columns = []
+    for name, field in model.model_fields.items():
+        if name == 'user_id':
+            continue
+        types = [arg for arg in get_args(field.annotation) if arg is not type(None)] or [field.annotation]
+        columns.append((name, _KINDS.get(types[0], 'json')))
+    return columns
+
+
+def _rows(columns: List[Tuple[str, str]], records: List[dict]) -> List[list]:
+    json_columns = {name for name, kind in columns if kind == 'json'}
+    return [
+        [
+            json.dumps(record[name], default=str) if name in json_columns and record.get(name) is not None
+            else record.get(name)
+            for name, _ in columns
+        ]
+        for record in records
+    ]
+
+
+READING_COLUMNS = [
+    ('date', 'str'), ('resolution', 'str'), ('timestamp', 'int'),
+    *((field, 'int' if field in INTEGER_FIELDS else 'float') for field in NUMERIC_FIELDS),
+    ('activity_state', 'str'), ('samples', 'int'),
+]
+DAILY_VITALS_COLUMNS = [('date', 'str'), ('resolution', 'str'), ('synced_at', 'str'), *_model_columns(VitalsSummary)]
+
+
+def _reading_rows(docs: List[dict]) -> List[list]:
+    rows = []
+    for doc in docs:
+        date, resolution = doc.get('date', doc['id']), doc.get('resolution')
+        for reading in doc.get('readings') or []:
+            rows.append([
+                date, resolution, reading.get('timestamp'),
+                *[reading.get(field) for field in NUMERIC_FIELDS],
+                reading.get('activity_state'), reading.get('samples'),
+            ])
+    return rows
+
+
+def _daily_vitals_rows(docs: List[dict]) -> List[list]:
+    return _rows(DAILY_VITALS_COLUMNS, [
+        {**(doc.get('summary') or {}), 'date': doc.get('date', doc['id']),
+         'resolution': doc.get('resolution'), 'synced_at': doc.get('synced_at')}
+        for doc in docs
+    ])
+
+
+def _model_table(name: str, collection: str, model):
+    columns = _model_columns(model)
+    return name, collection, columns, lambda docs: _rows(columns, docs), None, settings.EXPORT_PAGE_SIZE
+
+
+# (file name, subcollection, columns, page -> rows, fields read, documents per page)
+EXPORT_TABLES = (
+    ('vitals_readings', 'daily_vitals', READING_COLUMNS, _reading_rows,
+     ['date', 'resolution', 'readings'], settings.EXPORT_VITALS_PAGE_SIZE),
+    ('vitals_daily', 'daily_vitals', DAILY_VITALS_COLUMNS, _daily_vitals_rows,
+     ['date', 'resolution', 'synced_at', 'summary'], settings.EXPORT_PAGE_SIZE),
+    _model_table('activities', 'daily_activities', DailyActivity),
+    _model_table('sessions', 'sessions', Session),
+    _model_table('alerts', 'alerts', Alert),
+    _model_table('nutrition', 'nutrition', NutritionEntry),
+)
+
+
+# ==================== ZIP ENTRIES ====================
+
+class _ZipSink:
+    """Write-only file for ZipFile: collects output until the next drain()"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class _CsvEntry:
+    def __init__(self, archive: zipfile.ZipFile, name: str, columns: List[Tuple[str, str]]):
+        self._file = io.TextIOWrapper(archive.open(name, 'w', force_zip64=True), encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([column for column, _ in columns])
+
+    def write(self, rows: List[list]):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class _ParquetEntry:
+    """One Parquet file inside the zip, a row group per write()"""
+
+    TYPES = {'int': 'int64', 'float': 'float64', 'bool': 'bool_', 'str': 'string', 'json': 'string'}
+
+    def __init__(self, archive: zipfile.ZipFile, name: str, columns: List[Tuple[str, str]]):
+        # Parquet pages are already compressed, so the entry is stored as is
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_STORED
+        self._file = archive.open(info, 'w', force_zip64=True)
+        self._schema = pyarrow.schema([(column, getattr(pyarrow, self.TYPES[kind])()) for column, kind in columns])
+        self._writer = pyarrow.parquet.ParquetWriter(self._file, self._schema, compression='zstd')
+
+    @staticmethod
+    def _array(values: tuple, arrow_type):
+        try:
+            return pyarrow.array(values, type=arrow_type, from_pandas=True)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, TypeError):
+            # e.g. averaged heart rates (floats) in an int column
+            return pyarrow.array(values, from_pandas=True).cast(arrow_type, safe=False)
+
+    def write(self, rows: List[list]):
+        if not rows:
+            return
+        columns = zip(*rows)
+        arrays = [self._array(values, field.type) for values, field in zip(columns, self._schema)]
+        self._writer.write_table(pyarrow.Table.from_arrays(arrays, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+        self._file.close()
+
+
+# ==================== EXPORT ====================
+
+class ExportService:
+    def __init__(self, firebase_service: Optional[FirebaseService] = None):
+        self.firebase_service = firebase_service or FirebaseService()
+
+    @staticmethod
+    def supports(export_format: str) -> bool:
+        return export_format == 'csv' or (export_format == 'parquet' and pyarrow is not None)
+
+    async def stream_archive(self, user_id: str, account: dict, profile: Optional[dict],
+                             export_format: str = 'csv') -> AsyncIterator[bytes]:
+        """
+        Yield the export zip in pieces, about one storage page at a time
+
+        account and profile are read by the caller before the response
+        starts, so a missing user or an unavailable database still gets a
+        proper status code.
+        """
+        sink = _ZipSink()
+        archive = zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED)
+        entry_type = _ParquetEntry if export_format == 'parquet' else _CsvEntry
+        manifest = {
+            'user_id': user_id,
+            'format': export_format,
+            'exported_at': datetime.utcnow().isoformat(),
+            'files': {},
+        }
+
+        account = {key: value for key, value in account.items() if key not in ACCOUNT_EXCLUDED_FIELDS}
+        archive.writestr('profile.json', json.dumps({'account': account, 'profile': profile}, indent=2, default=str))
+        yield sink.drain()
+
+        try:
+            for name, collection, columns, to_rows, field_paths, page_size in EXPORT_TABLES:
+                file_name = f"{name}.{export_format}"
+                entry = entry_type(archive, file_name, columns)
+                count = 0
+                async for docs in self.firebase_service.iter_user_collection(user_id, collection, page_size, field_paths):
+                    rows = to_rows(docs)
+                    count += len(rows)
+                    # Encoding and deflating a raw day takes a while: keep it off the event loop
+                    await asyncio.to_thread(entry.write, rows)
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+                await asyncio.to_thread(entry.close)
+                manifest['files'][file_name] = count
+                yield sink.drain()
+        except Exception:
+            logger.exception("Export for user %s failed part-way; the client gets an incomplete zip", user_id)
+            raise
+
+        archive.writestr('manifest.json', json.dumps(manifest, indent=2))
+        archive.close()
+        yield sink.drain()
@@ -1,75 +1,337 @@
-from firebase_admin import firestore
-from typing import List, Dict, Optional
-from datetime import datetime
-import firebase_admin
+from typing import AsyncIterator, List, Dict, Optional
+from datetime import datetime, timezone
+import asyncio
+import logging
+import time
+
+from app.services.alert_broker import get_alert_broker
+from app.services.write_behind import get_write_behind
+from app.services.profile_cache import VERSION_COLLECTION, get_profile_cache
+from app.services.token_revocation import REVOKED_COLLECTION, SESSION_KIND
+from app.config import get_settings
+from app.utils.cache import TTLCache
+from app.utils.single_flight import single_flight
+from app.utils.circuit_breaker import get_firestore_breaker, stale_fallback
+from app.utils.etag import day_version
+from app.utils.deadlines import DeadlineExceededError, call_timeout, record_timing
+from app.utils.request_context import current_request_state
+from app.utils.validators import Validators
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# User fields copied into the user_emails index so login is a single point read
+EMAIL_INDEX_FIELDS = ('email', 'username', 'password_hash')
+
+# Shared by every FirebaseService instance (each router creates its own)
+_email_cache = TTLCache(maxsize=settings.EMAIL_CACHE_MAX_ENTRIES, ttl=settings.EMAIL_CACHE_TTL_SECONDS)
+
+
+def without_readings(days):
+    """
+    Day document(s) without raw readings and sketches: what the stale
+    fallback remembers of vitals reads (summary and hourly rollups)
+    """
+    if days is None:
+        return None
+    if isinstance(days, dict):
+        return {**{k: v for k, v in days.items() if k != 'sketches'}, 'readings': []}
+    return [without_readings(day) for day in days]
+
+
+def email_cache_stats() -> dict:
+    return _email_cache.stats()
+
+
+def _firestore():
+    """firebase_admin.firestore, imported on first use (it takes ~250 ms to import)"""
+    from firebase_admin import firestore
+    return firestore
+
+
+def _firestore_deadline_error():
+    from google.api_core.exceptions import DeadlineExceeded
+    return DeadlineExceeded
+
 
 class FirebaseService:
     def __init__(self):
+        # Connected on first use: routers build this at import, before the
+        # app lifespan has initialized Firebase
+        self._db = None
+        self._demo_mode: Optional[bool] = None
+    
+    def _connect(self):
+        import firebase_admin
+        
         # Check if Firebase is initialized
         if not firebase_admin._apps:
-            self.db = None
-            self.demo_mode = True
-            print("⚠️  FirebaseService running in DEMO MODE (no Firebase connection)")
-            print("   All data operations will be simulated")
+            self._db = None
+            self._demo_mode = True
+            logger.warning("FirebaseService running in DEMO MODE (no Firebase connection); data operations are simulated")
         else:
             try:
-                self.db = firestore.client()
-                self.demo_mode = False
-                print("✅ FirebaseService connected to Firestore")
-                print("   All read/write operations will sync to cloud")
+                self._db = _firestore().client()
+                self._demo_mode = False
+                logger.info("FirebaseService connected to Firestore")
             except Exception as e:
-                self.db = None
-                self.demo_mode = True
-                print(f"❌ Failed to connect to Firestore: {e}")
-                print("   Running in DEMO MODE")
+                self._db = None
+                self._demo_mode = True
+                logger.exception("Failed to connect to Firestore, running in DEMO MODE")
+    
+    @property
+    def demo_mode(self) -> bool:
+        if self._demo_mode is None:
+            self._connect()
+        return self._demo_mode
+    
+    @demo_mode.setter
+    def demo_mode(self, value: bool):
+        self._demo_mode = value
+    
+    @property
+    def db(self):
+        if self._demo_mode is None:
+            self._connect()
+        return self._db
+    
+    @db.setter
+    def db(self, value):
+        self._db = value
+    
+    async def _run(self, operation: str, func, *args, **kwargs):
+        """
+        Run a blocking Firestore call in a worker thread so callers can overlap
+        
+        operation names the call in timings and logs (the calling method's
+        name). func receives timeout= (the request's remaining deadline,
+        capped per call) and is abandoned with a 504 once it runs out. Every
+        call goes through the Firestore circuit breaker: while it is open this
+        raises CircuitOpenError (503) without touching Firestore.
+        """
+        timeout = call_timeout(operation)
+        
+        async def call():
+            return await asyncio.wait_for(asyncio.to_thread(func, *args, timeout=timeout, **kwargs), timeout)
+        
+        start = time.monotonic()
+        timed_out = False
+        try:
+            return await get_firestore_breaker().call(call)
+        except (asyncio.TimeoutError, _firestore_deadline_error()):
+            timed_out = True
+        finally:
+            elapsed_ms = (time.monotonic() - start) * 1000
+            record_timing(operation, elapsed_ms)
+            logger.debug("Firestore %s took %.1f ms", operation, elapsed_ms,
+                         extra={'operation': operation, 'ms': round(elapsed_ms, 1), 'timed_out': timed_out})
+        if timed_out:
+            raise DeadlineExceededError(current_request_state(), operation)
     
     # ==================== USER OPERATIONS ====================
     
+    def _email_index_ref(self, email: str):
+        return self.db.collection('user_emails').document(Validators.normalize_email(email))
+    
+    @staticmethod
+    def _email_index_entry(user_id: str, user_data: dict) -> dict:
+        entry = {field: user_data.get(field) for field in EMAIL_INDEX_FIELDS}
+        entry['user_id'] = user_id
+        return entry
+    
+    @staticmethod
+    def _user_from_email_index(entry: dict) -> dict:
+        user = {field: entry.get(field) for field in EMAIL_INDEX_FIELDS}
+        user['id'] = entry['user_id']
+        return user
+    
     async def create_user(self, user_data: dict) -> str:
-        """Create a new user document"""
+        """
+        Create a new user document
+        
+        The user and its user_emails/{email} index entry are written in one
+        transaction; raises ValueError if the email is already registered,
+        even when two signups race.
+        """
         if self.demo_mode:
             return "demo_user_" + user_data.get('email', 'test')
         
         doc_ref = self.db.collection('users').document()
         user_data['id'] = doc_ref.id
         user_data['created_at'] = datetime.utcnow().isoformat()
-        doc_ref.set(user_data)
+        index_ref = self._email_index_ref(user_data['email'])
+        
+        @_firestore().transactional
+        def create(transaction, timeout=None):
+            if index_ref.get(transaction=transaction, timeout=timeout).exists:
+                raise ValueError("Email already registered")
+            transaction.set(doc_ref, user_data)
+            transaction.create(index_ref, self._email_index_entry(doc_ref.id, user_data))
+        
+        await self._run('create_user', create, self.db.transaction())
         return doc_ref.id
     
+    @single_flight
     async def get_user_by_email(self, email: str) -> Optional[dict]:
-        """Get user by email"""
+        """
+        Get user by email (id, email, username, password_hash)
+        
+        Served from an in-process TTL cache, else one point read of
+        user_emails/{email}. Users created before the index existed fall back
+        to the email query once and are backfilled into the index.
+        """
         if self.demo_mode:
             return None
         
-        users = self.db.collection('users').where('email', '==', email).limit(1).stream()
-        for user in users:
+        key = Validators.normalize_email(email)
+        cached = _email_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+        
+        index_ref = self._email_index_ref(email)
+        snapshot = await self._run('get_user_by_email', index_ref.get)
+        if snapshot.exists:
+            user = self._user_from_email_index(snapshot.to_dict())
+        else:
+            user = await self._get_user_by_email_query(email)
+            if not user:
+                return None
+            from google.api_core.exceptions import AlreadyExists
+            try:
+                await self._run('get_user_by_email', index_ref.create, self._email_index_entry(user['id'], user))
+            except AlreadyExists:
+                # Backfilled concurrently (or a legacy duplicate); the query result still stands
+                pass
+            except Exception:
+                # The login can still proceed; the next lookup retries the backfill
+                logger.exception("Backfilling user_emails for user %s failed", user['id'])
+            user = {**{field: user.get(field) for field in EMAIL_INDEX_FIELDS}, 'id': user['id']}
+        
+        _email_cache.set(key, user)
+        return dict(user)
+    
+    async def _get_user_by_email_query(self, email: str) -> Optional[dict]:
+        query = self.db.collection('users').where('email', '==', email).limit(1)
+        for user in await self._run('_get_user_by_email_query', lambda timeout: list(query.stream(timeout=timeout))):
             data = user.to_dict()
             data['id'] = user.id
             return data
         return None
     
+    @single_flight
     async def get_user_by_id(self, user_id: str) -> Optional[dict]:
         """Get user by ID"""
         if self.demo_mode:
             return {'id': user_id, 'email': 'demo@example.com', 'username': 'demo_user'}
         
-        doc = self.db.collection('users').document(user_id).get()
+        doc = await self._run('get_user_by_id', self.db.collection('users').document(user_id).get)
         if doc.exists:
             data = doc.to_dict()
             data['id'] = doc.id
             return data
         return None
     
-    async def update_user(self, user_id: str, data: dict):
-        """Update user document"""
+    async def update_user(self, user_id: str, data: dict, defer: bool = False):
+        """Update user document (defer=True queues it on the write-behind queue)"""
         if self.demo_mode:
             return
         
         data['updated_at'] = datetime.utcnow().isoformat()
-        self.db.collection('users').document(user_id).update(data)
+        path = f'users/{user_id}'
+        if any(field in data for field in EMAIL_INDEX_FIELDS):
+            await get_write_behind().flush(path)
+            await self._update_user_and_email_index(user_id, data)
+            return
+        if defer:
+            get_write_behind().enqueue(path, data, op='update')
+            return
+        await get_write_behind().flush(path)
+        await self._run('update_user', self.db.collection('users').document(user_id).update, data)
+    
+    async def _update_user_and_email_index(self, user_id: str, data: dict):
+        """Update login fields on the user and its user_emails entry together"""
+        user_ref = self.db.collection('users').document(user_id)
+        
+        @_firestore().transactional
+        def update(transaction, timeout=None):
+            current = user_ref.get(transaction=transaction, timeout=timeout).to_dict() or {}
+            updated = {**current, **data}
+            if not updated.get('email'):
+                # No email to index (a malformed legacy user)
+                transaction.update(user_ref, data)
+                return None
+            new_ref = self._email_index_ref(updated['email'])
+            old_ref = self._email_index_ref(current['email']) if current.get('email') else None
+            if old_ref is not None and old_ref.id != new_ref.id:
+                if new_ref.get(transaction=transaction, timeout=timeout).exists:
+                    raise ValueError("Email already registered")
+                transaction.delete(old_ref)
+            transaction.set(new_ref, self._email_index_entry(user_id, updated))
+            transaction.update(user_ref, data)
+            return current.get('email')
+        
+        old_email = await self._run('_update_user_and_email_index', update, self.db.transaction())
+        for email in (old_email, data.get('email')):
+            if email:
+                _email_cache.invalidate(Validators.normalize_email(email))
+    
+    # ==================== TOKEN REVOCATION ====================
+    
+    async def revoke_token_id(self, token_id: str, kind: str, user_id: str, expires_at: float) -> bool:
+        """
+        Persist a revoked jti or session ID until expires_at (epoch seconds)
+        
+        Returns False if it was already revoked, so two workers rotating the
+        same refresh token can't both succeed.
+        """
+        if self.demo_mode:
+            return True
+        
+        from google.api_core.exceptions import AlreadyExists
+        try:
+            await self._run('revoke_token_id', self.db.collection(REVOKED_COLLECTION).document(token_id).create, {
+                'kind': kind,
+                'user_id': user_id,
+                # A Timestamp, so a Firestore TTL policy on expires_at can delete it
+                'expires_at': datetime.fromtimestamp(expires_at, timezone.utc),
+                'revoked_at': datetime.utcnow().isoformat(),
+            })
+        except AlreadyExists:
+            return False
+        return True
+    
+    async def get_revoked_session_ids(self, page_size: int = 1000) -> List[tuple]:
+        """(session id, expires_at epoch seconds) for every session revocation that hasn't expired"""
+        if self.demo_mode:
+            return []
+        
+        query = self.db.collection(REVOKED_COLLECTION) \
+            .where('kind', '==', SESSION_KIND) \
+            .where('expires_at', '>', datetime.now(timezone.utc)) \
+            .order_by('expires_at') \
+            .select(['expires_at']) \
+            .limit(page_size)
+        entries, page = [], query
+        while True:
+            # One call per page, so each gets the full call timeout
+            docs = await self._run('get_revoked_session_ids', lambda timeout, page=page: list(page.stream(timeout=timeout)))
+            entries.extend((doc.id, doc.get('expires_at').timestamp()) for doc in docs)
+            if len(docs) < page_size:
+                return entries
+            page = query.start_after(docs[-1])
+    
+    async def is_token_id_revoked(self, token_id: str) -> bool:
+        """Point read for IDs the in-memory revocation list can't confirm"""
+        if self.demo_mode:
+            return False
+        
+        doc = await self._run('is_token_id_revoked', self.db.collection(REVOKED_COLLECTION).document(token_id).get, field_paths=['expires_at'])
+        return doc.exists
     
     # ==================== PROFILE OPERATIONS ====================
     
+    @stale_fallback
+    @single_flight
     async def get_user_profile(self, user_id: str) -> Optional[dict]:
         """Get user profile"""
         if self.demo_mode:
@@ -87,45 +349,101 @@ class FirebaseService:
                 'daily_fats_goal': 70
             }
         
-        doc = self.db.collection('users').document(user_id).collection('profile').document('data').get()
-        if doc.exists:
-            return doc.to_dict()
-        return None
+        cache = get_profile_cache()
+        cache.start_listener(self.db)
+        cached = cache.get(user_id)
+        if cached is not None:
+            return cached[1]
+        
+        doc = await self._run('get_user_profile', self.db.collection('users').document(user_id).collection('profile').document('data').get)
+        profile = doc.to_dict() if doc.exists else None
+        cache.put(user_id, profile)
+        return profile
     
-    async def update_user_profile(self, user_id: str, profile_data: dict):
-        """Create or update user profile"""
+    @stale_fallback
+    @single_flight
+    async def get_user_profile_version(self, user_id: str) -> Optional[str]:
+        """Get the profile's updated_at marker without loading the profile"""
+        if self.demo_mode:
+            return None
+        
+        cached = get_profile_cache().get(user_id)
+        if cached is not None:
+            return cached[0] if cached[1] is not None else None
+        
+        doc_ref = self.db.collection('users').document(user_id).collection('profile').document('data')
+        doc = await self._run('get_user_profile_version', doc_ref.get, field_paths=['updated_at'])
+        return (doc.to_dict() or {}).get('updated_at', '') if doc.exists else None
+    
+    async def update_user_profile(self, user_id: str, profile_data: dict, defer: bool = False):
+        """
+        Create or update user profile (defer=True queues it on the write-behind queue)
+        
+        Writes through to the profile cache and bumps profile_versions/{userId}
+        so other workers drop their cached copy.
+        """
         if self.demo_mode:
             return
         
         profile_data['user_id'] = user_id
         profile_data['updated_at'] = datetime.utcnow().isoformat()
-        self.db.collection('users').document(user_id).collection('profile').document('data').set(profile_data, merge=True)
+        stamp = {'version': profile_data['updated_at'], 'updated_at': profile_data['updated_at']}
+        path = f'users/{user_id}/profile/data'
+        if defer:
+            get_profile_cache().merge(user_id, profile_data)
+            get_write_behind().enqueue(path, profile_data)
+            get_write_behind().enqueue(f'{VERSION_COLLECTION}/{user_id}', stamp)
+            return
+        # A queued write must not land after (and overwrite) this one
+        await get_write_behind().flush(path)
+        batch = self.db.batch()
+        batch.set(self.db.collection('users').document(user_id).collection('profile').document('data'), profile_data, merge=True)
+        batch.set(self.db.collection(VERSION_COLLECTION).document(user_id), stamp)
+        try:
+            await self._run('update_user_profile', batch.commit)
+        except BaseException:
+            # The write may or may not have landed (e.g. a timeout): drop the cached copy
+            get_profile_cache().invalidate(user_id)
+            raise
+        get_profile_cache().merge(user_id, profile_data)
     
     # ==================== VITALS OPERATIONS ====================
     
-    async def store_daily_vitals(self, user_id: str, date: str, readings: List[dict], summary: dict):
+    async def store_daily_vitals(self, user_id: str, date: str, readings: List[dict], summary: dict,
+                                 sketches: Optional[dict] = None, activity_analysis: Optional[dict] = None,
+                                 ingest_report: Optional[dict] = None, hourly: Optional[List[dict]] = None):
         """Store daily vitals data"""
         if self.demo_mode:
             return
         
         doc_ref = self.db.collection('users').document(user_id).collection('daily_vitals').document(date)
-        doc_ref.set({
+        # Readings arrive sorted by timestamp; the bounds let window queries skip whole days
+        await self._run('store_daily_vitals', doc_ref.set, {
             'date': date,
             'readings': readings,
+            'readings_sorted': True,
+            'first_timestamp': readings[0]['timestamp'] if readings else None,
+            'last_timestamp': readings[-1]['timestamp'] if readings else None,
             'summary': summary,
+            'sketches': sketches or {},
+            'activity_analysis': activity_analysis,
+            'ingest_report': ingest_report,
+            'hourly': hourly or [],
             'synced_at': datetime.utcnow().isoformat()
         })
     
+    @stale_fallback(keep=without_readings)
+    @single_flight
     async def get_vitals_range(self, user_id: str, start_date: str, end_date: str) -> List[dict]:
         """Get vitals data for a date range"""
         if self.demo_mode:
             return []
         
-        docs = self.db.collection('users').document(user_id).collection('daily_vitals') \
+        query = self.db.collection('users').document(user_id).collection('daily_vitals') \
             .where('date', '>=', start_date) \
             .where('date', '<=', end_date) \
-            .order_by('date') \
-            .stream()
+            .order_by('date')
+        docs = await self._run('get_vitals_range', lambda timeout: list(query.stream(timeout=timeout)))
         
         result = []
         for doc in docs:
@@ -134,18 +452,113 @@ class FirebaseService:
             result.append(data)
         return result
     
+    @single_flight
+    async def get_vitals_sketches(self, user_id: str, start_date: str, end_date: str) -> List[dict]:
+        """Get only the per-day quantile sketches for a date range (no readings)"""
+        if self.demo_mode:
+            return []
+        
+        query = self.db.collection('users').document(user_id).collection('daily_vitals') \
+            .where('date', '>=', start_date) \
+            .where('date', '<=', end_date) \
+            .order_by('date') \
+            .select(['date', 'sketches'])
+        docs = await self._run('get_vitals_sketches', lambda timeout: list(query.stream(timeout=timeout)))
+        
+        return [doc.to_dict() for doc in docs]
+    
+    @single_flight
+    async def get_vitals_chunk_index(self, user_id: str, start_date: str, end_date: str) -> List[dict]:
+        """Get the timestamp bounds of each day in a range (no readings)"""
+        if self.demo_mode:
+            return []
+        
+        query = self.db.collection('users').document(user_id).collection('daily_vitals') \
+            .where('date', '>=', start_date) \
+            .where('date', '<=', end_date) \
+            .order_by('date') \
+            .select(['date', 'first_timestamp', 'last_timestamp'])
+        docs = await self._run('get_vitals_chunk_index', lambda timeout: list(query.stream(timeout=timeout)))
+        
+        return [doc.to_dict() for doc in docs]
+    
+    @single_flight
+    async def get_vitals_readings(self, user_id: str, dates: List[str]) -> List[dict]:
+        """Get the readings of specific days in one batched read"""
+        if self.demo_mode or not dates:
+            return []
+        
+        collection = self.db.collection('users').document(user_id).collection('daily_vitals')
+        refs = [collection.document(date) for date in dates]
+        docs = await self._run('get_vitals_readings', lambda timeout: list(self.db.get_all(refs, field_paths=['date', 'readings', 'readings_sorted'], timeout=timeout)))
+        return [doc.to_dict() for doc in docs if doc.exists]
+    
+    @stale_fallback
+    @single_flight
+    async def get_vitals_versions(self, user_id: str, start_date: str, end_date: str) -> List[dict]:
+        """Get each day's sync marker for a date range (for ETags; no readings)"""
+        return await self._get_day_versions('daily_vitals', user_id, start_date, end_date)
+    
+    @stale_fallback
+    @single_flight
+    async def get_vitals_version(self, user_id: str, date: str) -> Optional[str]:
+        """Get one day's sync marker, or None if the day has no vitals"""
+        if self.demo_mode:
+            return None
+        
+        doc_ref = self.db.collection('users').document(user_id).collection('daily_vitals').document(date)
+        doc = await self._run('get_vitals_version', doc_ref.get, field_paths=['synced_at', 'resolution'])
+        return day_version(doc.to_dict() or {}) if doc.exists else None
+    
+    @stale_fallback(keep=without_readings)
+    @single_flight
     async def get_vitals_by_date(self, user_id: str, date: str) -> Optional[dict]:
         """Get vitals for a specific date"""
         if self.demo_mode:
             return None
         
-        doc = self.db.collection('users').document(user_id).collection('daily_vitals').document(date).get()
+        doc = await self._run('get_vitals_by_date', self.db.collection('users').document(user_id).collection('daily_vitals').document(date).get)
         if doc.exists:
             data = doc.to_dict()
             data['user_id'] = user_id
             return data
         return None
     
+    @single_flight
+    async def get_vitals_summaries_batch(self, user_ids: List[str], date: str) -> Dict[str, dict]:
+        """Get one day's vitals summary for many users in a single batched read"""
+        if self.demo_mode or not user_ids:
+            return {}
+        
+        refs = [
+            self.db.collection('users').document(user_id).collection('daily_vitals').document(date)
+            for user_id in user_ids
+        ]
+        # Only fetch the summary; readings can be several MB per day
+        docs = await self._run('get_vitals_summaries_batch', lambda timeout: list(self.db.get_all(refs, field_paths=['date', 'summary'], timeout=timeout)))
+        
+        result = {}
+        for doc in docs:
+            if doc.exists:
+                data = doc.to_dict()
+                result[doc.reference.parent.parent.id] = data
+        return result
+    
+    @single_flight
+    async def get_latest_vitals_summary(self, user_id: str) -> Optional[dict]:
+        """Get the most recent day's vitals summary"""
+        if self.demo_mode:
+            return None
+        
+        query = self.db.collection('users').document(user_id).collection('daily_vitals') \
+            .select(['date', 'summary']) \
+            .order_by('date', direction='DESCENDING') \
+            .limit(1)
+        docs = await self._run('get_latest_vitals_summary', lambda timeout: list(query.stream(timeout=timeout)))
+        for doc in docs:
+            return doc.to_dict()
+        return None
+    
     # ==================== ACTIVITY OPERATIONS ====================
     
     async def store_daily_activity(self, user_id: str, date: str, activity_data: dict):
@@ -155,18 +568,29 @@ class FirebaseService:
         
         activity_data['synced_at'] = datetime.utcnow().isoformat()
         doc_ref = self.db.collection('users').document(user_id).collection('daily_activities').document(date)
-        doc_ref.set(activity_data)
+        await self._run('store_daily_activity', doc_ref.set, activity_data)
     
+    async def merge_daily_activity(self, user_id: str, date: str, activity_data: dict):
+        """Merge fields into a day's activity document, keeping the rest"""
+        if self.demo_mode:
+            return
+        
+        activity_data['synced_at'] = datetime.utcnow().isoformat()
+        doc_ref = self.db.collection('users').document(user_id).collection('daily_activities').document(date)
+        await self._run('merge_daily_activity', doc_ref.set, activity_data, merge=True)
+    
+    @stale_fallback
+    @single_flight
     async def get_activity_range(self, user_id: str, start_date: str, end_date: str) -> List[dict]:
         """Get activity data for a date range"""
         if self.demo_mode:
             return []
         
-        docs = self.db.collection('users').document(user_id).collection('daily_activities') \
+        query = self.db.collection('users').document(user_id).collection('daily_activities') \
             .where('date', '>=', start_date) \
             .where('date', '<=', end_date) \
-            .order_by('date') \
-            .stream()
+            .order_by('date')
+        docs = await self._run('get_activity_range', lambda timeout: list(query.stream(timeout=timeout)))
         
         result = []
         for doc in docs:
@@ -175,6 +599,45 @@ class FirebaseService:
             result.append(data)
         return result
     
+    @stale_fallback
+    @single_flight
+    async def get_activity_versions(self, user_id: str, start_date: str, end_date: str) -> List[dict]:
+        """Get each day's sync marker for a date range of activity (for ETags)"""
+        return await self._get_day_versions('daily_activities', user_id, start_date, end_date)
+    
+    async def _get_day_versions(self, collection: str, user_id: str, start_date: str, end_date: str) -> List[dict]:
+        if self.demo_mode:
+            return []
+        
+        query = self.db.collection('users').document(user_id).collection(collection) \
+            .where('date', '>=', start_date) \
+            .where('date', '<=', end_date) \
+            .order_by('date') \
+            .select(['date', 'synced_at', 'resolution'])
+        docs = await self._run('_get_day_versions', lambda timeout: list(query.stream(timeout=timeout)))
+        return [doc.to_dict() for doc in docs]
+    
+    @single_flight
+    async def get_activities_batch(self, user_ids: List[str], date: str) -> Dict[str, dict]:
+        """Get one day's activity for many users in a single batched read"""
+        if self.demo_mode or not user_ids:
+            return {}
+        
+        refs = [
+            self.db.collection('users').document(user_id).collection('daily_activities').document(date)
+            for user_id in user_ids
+        ]
+        docs = await self._run('get_activities_batch', lambda timeout: list(self.db.get_all(refs, timeout=timeout)))
+        
+        result = {}
+        for doc in docs:
+            if doc.exists:
+                user_id = doc.reference.parent.parent.id
+                data = doc.to_dict()
+                data['user_id'] = user_id
+                result[user_id] = data
+        return result
+    
     # ==================== SESSION OPERATIONS ====================
     
     async def create_session(self, user_id: str, session_data: dict) -> str:
@@ -185,21 +648,36 @@ class FirebaseService:
         doc_ref = self.db.collection('users').document(user_id).collection('sessions').document()
         session_data['id'] = doc_ref.id
         session_data['user_id'] = user_id
-        doc_ref.set(session_data)
+        await self._run('create_session', doc_ref.set, session_data)
         return doc_ref.id
     
+    @single_flight
+    async def get_session(self, user_id: str, session_id: str) -> Optional[dict]:
+        """Get a single session"""
+        if self.demo_mode:
+            return None
+        
+        doc = await self._run('get_session', self.db.collection('users').document(user_id).collection('sessions').document(session_id).get)
+        if doc.exists:
+            data = doc.to_dict()
+            data['id'] = doc.id
+            return data
+        return None
+    
+    @stale_fallback
+    @single_flight
     async def get_sessions(self, user_id: str, limit: int = 50, start_time: Optional[int] = None) -> List[dict]:
         """Get user sessions"""
         if self.demo_mode:
             return []
         
-        query = self.db.collection('users').document(user_id).collection('sessions').order_by('start_time', direction=firestore.Query.DESCENDING)
+        query = self.db.collection('users').document(user_id).collection('sessions').order_by('start_time', direction='DESCENDING')
         
         if start_time:
             query = query.where('start_time', '>=', start_time)
         
         query = query.limit(limit)
-        docs = query.stream()
+        docs = await self._run('get_sessions', lambda timeout: list(query.stream(timeout=timeout)))
         
         result = []
         for doc in docs:
@@ -210,29 +688,35 @@ class FirebaseService:
     
     # ==================== ALERT OPERATIONS ====================
     
-    async def create_alert(self, user_id: str, alert_data: dict) -> str:
-        """Create a new alert"""
+    async def create_alert(self, user_id: str, alert_data: dict, alert_id: Optional[str] = None) -> str:
+        """Create a new alert (a fixed alert_id makes re-creating it idempotent)"""
         if self.demo_mode:
-            return "demo_alert_" + str(alert_data.get('timestamp', 0))
+            alert_id = alert_id or "demo_alert_" + str(alert_data.get('timestamp', 0))
+            get_alert_broker().publish(user_id, {**alert_data, 'id': alert_id, 'user_id': user_id})
+            return alert_id
         
-        doc_ref = self.db.collection('users').document(user_id).collection('alerts').document()
+        doc_ref = self.db.collection('users').document(user_id).collection('alerts').document(alert_id)
         alert_data['id'] = doc_ref.id
         alert_data['user_id'] = user_id
-        doc_ref.set(alert_data)
+        await self._run('create_alert', doc_ref.set, alert_data)
+        # Push to open GET /alerts/stream connections
+        get_alert_broker().publish(user_id, dict(alert_data))
         return doc_ref.id
     
+    @stale_fallback
+    @single_flight
     async def get_alerts(self, user_id: str, limit: int = 50, since_timestamp: Optional[int] = None) -> List[dict]:
         """Get user alerts"""
         if self.demo_mode:
             return []
         
-        query = self.db.collection('users').document(user_id).collection('alerts').order_by('timestamp', direction=firestore.Query.DESCENDING)
+        query = self.db.collection('users').document(user_id).collection('alerts').order_by('timestamp', direction='DESCENDING')
         
         if since_timestamp:
             query = query.where('timestamp', '>=', since_timestamp)
         
         query = query.limit(limit)
-        docs = query.stream()
+        docs = await self._run('get_alerts', lambda timeout: list(query.stream(timeout=timeout)))
         
         result = []
         for doc in docs:
@@ -241,12 +725,23 @@ class FirebaseService:
             result.append(data)
         return result
     
+    @single_flight
+    async def count_unacknowledged_alerts(self, user_id: str) -> int:
+        """Count alerts not yet acknowledged (server-side aggregation, no documents read)"""
+        if self.demo_mode:
+            return 0
+        
+        query = self.db.collection('users').document(user_id).collection('alerts') \
+            .where('acknowledged', '==', False)
+        results = await self._run('count_unacknowledged_alerts', lambda timeout: query.count().get(timeout=timeout))
+        return int(results[0][0].value) if results else 0
+    
     async def acknowledge_alert(self, user_id: str, alert_id: str):
         """Mark alert as acknowledged"""
         if self.demo_mode:
             return
         
-        self.db.collection('users').document(user_id).collection('alerts').document(alert_id).update({
+        await self._run('acknowledge_alert', self.db.collection('users').document(user_id).collection('alerts').document(alert_id).update, {
             'acknowledged': True,
             'acknowledged_at': int(datetime.utcnow().timestamp())
         })
@@ -261,19 +756,21 @@ class FirebaseService:
         doc_ref = self.db.collection('users').document(user_id).collection('nutrition').document()
         nutrition_data['id'] = doc_ref.id
         nutrition_data['user_id'] = user_id
-        doc_ref.set(nutrition_data)
+        await self._run('create_nutrition_entry', doc_ref.set, nutrition_data)
         return doc_ref.id
     
+    @stale_fallback
+    @single_flight
     async def get_nutrition_entries(self, user_id: str, start_timestamp: int, end_timestamp: int) -> List[dict]:
         """Get nutrition entries for a time range"""
         if self.demo_mode:
             return []
         
-        docs = self.db.collection('users').document(user_id).collection('nutrition') \
+        query = self.db.collection('users').document(user_id).collection('nutrition') \
             .where('timestamp', '>=', start_timestamp) \
             .where('timestamp', '<=', end_timestamp) \
-            .order_by('timestamp', direction=firestore.Query.DESCENDING) \
-            .stream()
+            .order_by('timestamp', direction='DESCENDING')
+        docs = await self._run('get_nutrition_entries', lambda timeout: list(query.stream(timeout=timeout)))
         
         result = []
         for doc in docs:
@@ -281,3 +778,35 @@ class FirebaseService:
             data['id'] = doc.id
             result.append(data)
         return result
+    
+    # ==================== EXPORT ====================
+    
+    async def iter_user_collection(self, user_id: str, collection: str, page_size: int,
+                                   field_paths: Optional[List[str]] = None) -> AsyncIterator[List[dict]]:
+        """
+        Yield every document of one of a user's subcollections, a page at a time
+        
+        Pages follow document ID order with a cursor on the last document
+        read, so only one page is in memory however large the collection is
+        (daily collections are keyed by date, so they come out in date
+        order). Each dict carries its document ID as 'id'.
+        """
+        if self.demo_mode:
+            return
+        
+        query = self.db.collection('users').document(user_id).collection(collection) \
+            .order_by('__name__') \
+            .limit(page_size)
+        if field_paths:
+            query = query.select(field_paths)
+        
+        last = None
+        while True:
+            page = query if last is None else query.start_after(last)
+            docs = await self._run('iter_user_collection', lambda timeout: list(page.stream(timeout=timeout)))
+            if not docs:
+                return
+            yield [{**doc.to_dict(), 'id': doc.id} for doc in docs]
+            if len(docs) < page_size:
+                return
+            last = docs[-1]
@@ -0,0 +1,355 @@
+from bisect import bisect_left
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+import json
+import math
+import re
+
+FOOD_DATABASE_PATH = Path(__file__).resolve().parent.parent / 'data' / 'foods.json'
+
+NUTRIENT_FIELDS = ('calories', 'protein_g', 'carbs_g', 'fats_g', 'fiber_g', 'sugar_g', 'sodium_mg')
+
+# Millilitres per volume unit; converted to grams with the food's density_g_per_ml
+UNIT_ML = {
+    'ml': 1.0, 'l': 1000.0,
+    'cup': 240.0, 'cups': 240.0,
+    'tbsp': 15.0, 'tablespoon': 15.0, 'tablespoons': 15.0,
+    'tsp': 5.0, 'teaspoon': 5.0, 'teaspoons': 5.0,
+    'glass': 150.0, 'glasses': 150.0,
+}
+
+# Grams per unit; None means "use the food's own serving size"
+UNIT_GRAMS = {
+    'g': 1.0, 'gram': 1.0, 'grams': 1.0, 'gr': 1.0,
+    'kg': 1000.0,
+    'oz': 28.35, 'ounce': 28.35, 'ounces': 28.35,
+    'lb': 453.6, 'lbs': 453.6,
+    **{unit: None for unit in UNIT_ML},
+    'slice': None, 'slices': None, 'piece': None, 'pieces': None,
+    'serving': None, 'servings': None, 'portion': None, 'portions': None,
+    'bowl': None, 'bowls': None, 'plate': None, 'plates': None,
+}
+
+NUMBER_WORDS = {
+    'a': 1.0, 'an': 1.0, 'one': 1.0, 'two': 2.0, 'three': 3.0, 'four': 4.0,
+    'five': 5.0, 'six': 6.0, 'half': 0.5, 'quarter': 0.25,
+}
+
+# Words that carry no food meaning: not indexed, ignored in queries
+STOPWORDS = frozenset({'a', 'an', 'and', 'the', 'of', 'with', 'or', 'in', 'on'})
+
+# Larger quantities are typos or abuse, not a meal
+MAX_QUANTITY = 10000.0
+
+# The number must end at a space or letter, so "0.5.5" or "1/2/3" is not a quantity
+_QUANTITY_RE = re.compile(r'^(\d+/\d+|\d+(?:[.,]\d+)?)(?![\d.,/])\s*([a-z]+)?\b\s*(?:of\s+)?(.*)$')
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9 ]+')
+_NON_QUANTITY_RE = re.compile(r'[^a-z0-9./ ]+')
+
+
+def normalize_food_text(text: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace"""
+    return ' '.join(_NON_ALNUM_RE.sub(' ', text.lower()).split())
+
+
+def _trigrams(term: str) -> set:
+    padded = f'  {term} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _abbreviates(word: str, term: str, max_skipped: int = 2) -> bool:
+    """word is term's start with at most max_skipped letters left out ("chikn" -> "chicken")"""
+    letters = iter(term[:len(word) + max_skipped])
+    return all(letter in letters for letter in word)
+
+
+class FoodSearchIndex:
+    """
+    In-memory search index over the bundled food database
+
+    Combines a sorted term list (prefix lookups via binary search) with a
+    trigram inverted index (typo tolerance). Built once per process; the
+    bundled database is small enough that building takes a few milliseconds.
+    """
+
+    def __init__(self, foods: List[dict]):
+        self.foods = foods
+        self._names: List[str] = []  # normalized display name per food
+        self._terms: List[Tuple[str, int]] = []  # sorted (term, food_idx)
+        self._trigram_postings: Dict[str, List[int]] = {}
+        self._phrases: Dict[str, int] = {}  # exact normalized name/alias -> food_idx
+
+        term_set = set()
+        for idx, food in enumerate(foods):
+            name = normalize_food_text(food['name'])
+            self._names.append(name)
+            for phrase in [name] + [normalize_food_text(a) for a in food.get('aliases', [])]:
+                self._phrases.setdefault(phrase, idx)
+                term_set.add((phrase, idx))
+                for word in phrase.split():
+                    if word not in STOPWORDS:
+                        term_set.add((word, idx))
+
+        self._terms = sorted(term_set)
+        self._term_keys = [term for term, _ in self._terms]
+
+        postings: Dict[str, set] = {}
+        for term, idx in self._terms:
+            for gram in _trigrams(term):
+                postings.setdefault(gram, set()).add(idx)
+        self._trigram_postings = {gram: sorted(ids) for gram, ids in postings.items()}
+        self._food_term_grams = [
+            [_trigrams(name)] + [_trigrams(normalize_food_text(a)) for a in food.get('aliases', [])]
+            for name, food in zip(self._names, foods)
+        ]
+
+    @classmethod
+    def load(cls, path: Path = FOOD_DATABASE_PATH) -> 'FoodSearchIndex':
+        """Load the bundled food database and build the index"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f)['foods'])
+
+    def _prefix_matches(self, prefix: str) -> Dict[int, float]:
+        """Foods having a term that starts with prefix, scored by closeness"""
+        scores: Dict[int, float] = {}
+        start = bisect_left(self._term_keys, prefix)
+        for i in range(start, len(self._term_keys)):
+            term = self._term_keys[i]
+            if not term.startswith(prefix):
+                break
+            idx = self._terms[i][1]
+            # Shorter completions of the prefix rank higher; only an exact name/alias scores 1.0
+            score = 0.7 + 0.25 * len(prefix) / len(term)
+            if score > scores.get(idx, 0.0):
+                scores[idx] = score
+        return scores
+
+    def _token_matches(self, query: str) -> Dict[int, float]:
+        """
+        Foods with a word for every query word that the query word abbreviates
+
+        A query word matches a word of a name/alias that it starts, give or
+        take a couple of skipped letters ("chik", "chikn" -> "chicken"): the
+        usual shape of a typo made while typing. Scored by how much of the
+        term the query covers.
+        """
+        per_food: Dict[int, List[float]] = {}
+        words = query.split()
+        for position, word in enumerate(words):
+            if len(word) < 3:
+                continue
+            start = bisect_left(self._term_keys, word[0])
+            for i in range(start, len(self._term_keys)):
+                term = self._term_keys[i]
+                if not term.startswith(word[0]):
+                    break
+                if ' ' in term or not _abbreviates(word, term):
+                    continue
+                idx = self._terms[i][1]
+                best = per_food.setdefault(idx, [0.0] * len(words))
+                best[position] = max(best[position], len(word) / len(term))
+
+        scores: Dict[int, float] = {}
+        for idx, best in per_food.items():
+            if all(best[position] for position, word in enumerate(words) if len(word) >= 3):
+                scores[idx] = 0.5 + 0.2 * sum(best) / len(words)
+        return scores
+
+    def _fuzzy_matches(self, query: str, min_similarity: float) -> Dict[int, float]:
+        """Foods whose name or an alias shares enough trigrams with the query"""
+        query_grams = _trigrams(query)
+        candidates = set()
+        for gram in query_grams:
+            candidates.update(self._trigram_postings.get(gram, ()))
+
+        scores: Dict[int, float] = {}
+        for idx in candidates:
+            # Dice coefficient against the closest name/alias
+            similarity = max(
+                2.0 * len(query_grams & grams) / (len(query_grams) + len(grams))
+                for grams in self._food_term_grams[idx]
+            )
+            if similarity >= min_similarity:
+                scores[idx] = similarity * 0.5
+        return scores
+
+    def search(self, query: str, limit: int = 10, min_similarity: float = 0.45) -> List[Tuple[dict, float]]:
+        """
+        Search foods by name
+
+        Returns (food, score) pairs, best first. Exact name/alias matches
+        score 1.0, prefix matches 0.7-0.95, abbreviated words ("chikn")
+        0.5-0.7 and other typo-tolerant (trigram) matches below 0.5, so a
+        food whose word the query starts or abbreviates always outranks one
+        that merely shares letters with it.
+        """
+        query = normalize_food_text(query)
+        words = ' '.join(word for word in query.split() if word not in STOPWORDS)
+        if not words:
+            return []
+
+        scores: Dict[int, float] = {}
+        exact = self._phrases.get(query)
+        if exact is not None:
+            scores[exact] = 1.0
+
+        # The whole query can still prefix a name that contains stopwords ("macaroni and ch")
+        for matches in (self._prefix_matches(query), self._token_matches(words)):
+            for idx, score in matches.items():
+                if score > scores.get(idx, 0.0):
+                    scores[idx] = score
+
+        if len(scores) < limit:
+            for idx, score in self._fuzzy_matches(words, min_similarity).items():
+                if score > scores.get(idx, 0.0):
+                    scores[idx] = score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], len(self._names[item[0]])))
+        return [(self.foods[idx], round(score, 3)) for idx, score in ranked[:limit]]
+
+    def best_match(self, query: str) -> Optional[dict]:
+        """Return the single best food for a query, or None"""
+        results = self.search(query, limit=1)
+        return results[0][0] if results else None
+
+
+def _parse_quantity(token: str) -> float:
+    """Quantity of a numeric token; NaN when it is too large to be one"""
+    if '/' in token:
+        num, den = token.split('/', 1)
+        quantity = float(num) / float(den) if float(den) else 1.0
+    else:
+        quantity = float(token.replace(',', '.'))
+    return quantity if math.isfinite(quantity) and quantity <= MAX_QUANTITY else math.nan
+
+
+def parse_food_item(text: str) -> Tuple[float, Optional[str], str]:
+    """
+    Split a free-text food item into (quantity, unit, food name)
+
+    Examples: "2 eggs" -> (2, None, "eggs"), "150g rice" -> (150, "g", "rice"),
+    "a cup of milk" -> (1, "cup", "milk"). The quantity is NaN for a
+    malformed or implausibly large number ("0.5.5 rice").
+    """
+    text = ' '.join(_NON_QUANTITY_RE.sub(' ', text.lower()).split())
+    words = text.split()
+    if words and words[0] in NUMBER_WORDS:
+        words[0] = str(NUMBER_WORDS[words[0]])
+        text = ' '.join(words)
+
+    match = _QUANTITY_RE.match(text)
+    if not match:
+        return (math.nan if text[:1].isdigit() else 1.0), None, text
+
+    quantity = _parse_quantity(match.group(1))
+    unit, rest = match.group(2), match.group(3)
+    if unit and unit not in UNIT_GRAMS:
+        # Not a unit, it's the first word of the food name ("2 eggs")
+        rest = f'{unit} {rest}'.strip()
+        unit = None
+    return quantity, unit, rest.strip()
+
+
+class FoodSearchService:
+    def __init__(self, index: Optional[FoodSearchIndex] = None):
+        self._index = index
+
+    @property
+    def index(self) -> FoodSearchIndex:
+        if self._index is None:
+            self._index = get_food_index()
+        return self._index
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """Autocomplete search returning foods with nutrients per 100 g and their typical serving"""
+        return [
+            {
+                'name': food['name'],
+                'score': score,
+                'serving_g': food['serving_g'],
+                'serving_unit': food['serving_unit'],
+                'per_100g': food['per_100g'],
+            }
+            for food, score in self.index.search(query, limit=limit)
+        ]
+
+    def analyze_meal(self, food_items: str) -> dict:
+        """
+        Parse a comma-separated food list into per-item and total macros
+
+        Items that can't be matched, have an implausible quantity (above
+        MAX_QUANTITY), or are measured by volume (ml, cup, tbsp...) for a
+        food with no known density, are returned in 'unmatched' so the app
+        can ask the user to pick a food manually.
+        """
+        items = []
+        unmatched = []
+        totals = {field: 0.0 for field in NUTRIENT_FIELDS}
+
+        for part in re.split(r',|;|\n', food_items or ''):
+            for raw in self._split_conjunctions(part.strip()):
+                quantity, unit, name = parse_food_item(raw)
+                if math.isnan(quantity):
+                    unmatched.append(raw)
+                    continue
+                food = self.index.best_match(name) if name else None
+                grams = _grams(food, quantity, unit) if food else None
+                if grams is None:
+                    unmatched.append(raw)
+                    continue
+
+                factor = grams / 100.0
+                nutrients = {field: round(food['per_100g'][field] * factor, 1) for field in NUTRIENT_FIELDS}
+                for field in NUTRIENT_FIELDS:
+                    totals[field] += nutrients[field]
+
+                items.append({
+                    'input': raw,
+                    'food': food['name'],
+                    'quantity': quantity,
+                    'unit': unit or food['serving_unit'],
+                    'grams': round(grams, 1),
+                    **nutrients,
+                })
+
+        totals = {field: round(value, 1) for field, value in totals.items()}
+        totals['calories'] = int(round(totals['calories']))
+        return {'items': items, 'unmatched': unmatched, 'totals': totals}
+
+    def _split_conjunctions(self, text: str) -> List[str]:
+        """
+        Split "2 eggs and toast" / "rice with chicken" into separate items
+
+        Only when the text isn't itself a food name ("macaroni and cheese")
+        and every part matches a food; otherwise the text stays one item.
+        """
+        parts = [part.strip() for part in re.split(r'\band\b|\bwith\b', text)]
+        if len(parts) == 1:
+            return [text] if text else []
+        whole = self.index.search(parse_food_item(text)[2], limit=1)
+        if whole and whole[0][1] >= 0.7:
+            return [text]
+        names = [parse_food_item(part)[2] for part in parts if part]
+        if all(name and self.index.best_match(name) for name in names):
+            return [part for part in parts if part]
+        return [text]
+
+
+def _grams(food: dict, quantity: float, unit: Optional[str]) -> Optional[float]:
+    """Weight of quantity units of food, or None for a volume the food has no density for"""
+    if unit in UNIT_ML:
+        density = food.get('density_g_per_ml')
+        return quantity * UNIT_ML[unit] * density if density else None
+    unit_grams = UNIT_GRAMS.get(unit) if unit else None
+    return quantity * (unit_grams if unit_grams is not None else food['serving_g'])
+
+
+_food_index: Optional[FoodSearchIndex] = None
+
+
+def get_food_index() -> FoodSearchIndex:
+    """Process-wide food index, built on first use"""
+    global _food_index
+    if _food_index is None:
+        _food_index = FoodSearchIndex.load()
+    return _food_index
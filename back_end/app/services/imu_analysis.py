@@ -0,0 +1,168 @@
+"""
+Server-side activity and sleep classification from IMU readings
+
+Works on column arrays (see app.utils.vitals_columns) so a full day of
+per-second data is processed with a handful of vectorized passes.
+
+Pipeline:
+1. Acceleration magnitude -> ENMO (Euclidean norm minus 1 g, clipped at 0)
+2. 60 s epochs: mean ENMO, magnitude std, gyro magnitude (np.bincount)
+3. Steps: peak detection when the sampling rate resolves gait (>= 5 Hz),
+   otherwise estimated per epoch from walking-intensity cadence
+4. Active minutes: epochs with mean ENMO >= ACTIVE_ENMO_G
+5. Sleep/wake: Cole-Kripke style weighted moving sum of epoch activity,
+   with short wake gaps merged and short sleep bouts discarded
+"""
+import numpy as np
+from app.utils.vitals_columns import timestamps_in_seconds
+from typing import Dict, List, Optional
+
+GRAVITY = 9.80665
+EPOCH_SECONDS = 60
+
+ACTIVE_ENMO_G = 0.1  # ~moderate activity (100 mg)
+WALKING_ENMO_G = 0.03  # lower bound of ambulation
+STEP_PEAK_G = 0.15  # dynamic acceleration peak that counts as a step
+MIN_STEP_INTERVAL_S = 0.25
+MAX_CADENCE_SPM = 180
+
+SLEEP_WEIGHTS = np.array([0.04, 0.04, 0.20, 1.0, 0.20, 0.04, 0.04])  # epochs -3 .. +3
+SLEEP_THRESHOLD = 0.05  # weighted ENMO below this is sleep
+MIN_SLEEP_BOUT_EPOCHS = 20
+MAX_WAKE_GAP_EPOCHS = 5
+
+
+def _magnitude(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    return np.sqrt(x * x + y * y + z * z)
+
+
+def _runs(mask: np.ndarray) -> List[tuple]:
+    """(start, end) index pairs of consecutive True runs, end exclusive"""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return list(zip(edges[0::2], edges[1::2]))
+
+
+def _count_steps_peaks(seconds: np.ndarray, dynamic: np.ndarray) -> np.ndarray:
+    """Per-sample step flags from local maxima of dynamic acceleration"""
+    peaks = np.zeros(len(dynamic), dtype=bool)
+    if len(dynamic) < 3:
+        return peaks
+    local_max = (dynamic[1:-1] > dynamic[:-2]) & (dynamic[1:-1] >= dynamic[2:]) & (dynamic[1:-1] >= STEP_PEAK_G)
+    candidates = np.flatnonzero(local_max) + 1
+    if len(candidates) == 0:
+        return peaks
+    # Enforce a refractory period between steps
+    keep = np.concatenate(([True], np.diff(seconds[candidates]) >= MIN_STEP_INTERVAL_S))
+    peaks[candidates[keep]] = True
+    return peaks
+
+
+def _sleep_mask(epoch_enmo: np.ndarray, has_data: np.ndarray) -> np.ndarray:
+    """Per-epoch sleep flags"""
+    filled = np.where(has_data, epoch_enmo, 0.0)
+    score = np.convolve(filled, SLEEP_WEIGHTS, mode='same')
+    asleep = (score < SLEEP_THRESHOLD) & has_data
+
+    # Merge short wake gaps inside sleep, then drop short sleep bouts
+    for start, end in _runs(~asleep):
+        if 0 < start and end < len(asleep) and end - start <= MAX_WAKE_GAP_EPOCHS:
+            asleep[start:end] = True
+    for start, end in _runs(asleep):
+        if end - start < MIN_SLEEP_BOUT_EPOCHS:
+            asleep[start:end] = False
+    return asleep
+
+
+def analyze_imu(columns: Dict[str, np.ndarray], day_start: Optional[float] = None) -> Optional[dict]:
+    """
+    Classify a day's IMU columns
+
+    day_start is the epoch second of the day's local midnight
+    (day_start_seconds); hourly_breakdown hours count from it. Defaults to
+    the UTC midnight before the first reading. Returns None when the
+    readings carry no accelerometer data, so callers keep the client's
+    numbers.
+    """
+    ax, ay, az = columns['accel_x'], columns['accel_y'], columns['accel_z']
+    valid = ~(np.isnan(ax) | np.isnan(ay) | np.isnan(az))
+    if valid.sum() < 2:
+        return None
+
+    seconds = timestamps_in_seconds(columns['timestamp'])[valid]
+    order = np.argsort(seconds, kind='stable')
+    seconds = seconds[order]
+    magnitude = _magnitude(ax[valid], ay[valid], az[valid])[order]
+
+    # Accept either g or m/s^2 from the sensor
+    if np.median(magnitude) > 5:
+        magnitude = magnitude / GRAVITY
+    enmo = np.clip(magnitude - 1.0, 0.0, None)
+
+    gx, gy, gz = columns['gyro_x'][valid][order], columns['gyro_y'][valid][order], columns['gyro_z'][valid][order]
+    gyro = np.nan_to_num(_magnitude(gx, gy, gz))
+
+    # Epoch features, grouped with bincount (no Python loop over samples)
+    if day_start is None:
+        day_start = np.floor(seconds[0] / 86400) * 86400
+    first_epoch = np.floor(seconds[0] / EPOCH_SECONDS) * EPOCH_SECONDS
+    epoch = ((seconds - first_epoch) // EPOCH_SECONDS).astype(np.int64)
+    n_epochs = int(epoch[-1]) + 1
+    counts = np.bincount(epoch, minlength=n_epochs)
+    has_data = counts > 0
+    safe_counts = np.maximum(counts, 1)
+    epoch_enmo = np.bincount(epoch, weights=enmo, minlength=n_epochs) / safe_counts
+    epoch_mag = np.bincount(epoch, weights=magnitude, minlength=n_epochs) / safe_counts
+    epoch_mag_sq = np.bincount(epoch, weights=magnitude * magnitude, minlength=n_epochs) / safe_counts
+    epoch_std = np.sqrt(np.clip(epoch_mag_sq - epoch_mag * epoch_mag, 0.0, None))
+    epoch_gyro = np.bincount(epoch, weights=gyro, minlength=n_epochs) / safe_counts
+
+    # Steps
+    sample_rate = (len(seconds) - 1) / max(seconds[-1] - seconds[0], 1e-9)
+    if sample_rate >= 5:
+        step_flags = _count_steps_peaks(seconds, np.abs(magnitude - 1.0))
+        epoch_steps = np.bincount(epoch, weights=step_flags.astype(np.float64), minlength=n_epochs)
+        step_method = 'peaks'
+    else:
+        # Too coarse to see individual steps: cadence rises with walking intensity
+        walking = has_data & (epoch_enmo >= WALKING_ENMO_G)
+        cadence = np.clip(60 + 400 * epoch_enmo, 0, MAX_CADENCE_SPM)
+        coverage = np.minimum(counts * max(1.0 / sample_rate, 1.0) / EPOCH_SECONDS, 1.0)
+        epoch_steps = np.where(walking, cadence * coverage, 0.0)
+        step_method = 'cadence_estimate'
+
+    active = has_data & (epoch_enmo >= ACTIVE_ENMO_G)
+    asleep = _sleep_mask(epoch_enmo, has_data)
+
+    # Hours of the local day; every epoch lands in one, so the hours add up to the day's totals
+    epoch_hour = np.maximum((first_epoch + np.arange(n_epochs) * EPOCH_SECONDS - day_start) // 3600, 0).astype(np.int64)
+    hourly_steps = np.bincount(epoch_hour, weights=epoch_steps, minlength=24)
+    hourly_active = np.bincount(epoch_hour, weights=active.astype(np.float64), minlength=24)
+
+    sleep_segments = [
+        {
+            'start': int(first_epoch + start * EPOCH_SECONDS),
+            'end': int(first_epoch + end * EPOCH_SECONDS),
+            'minutes': int(end - start),
+        }
+        for start, end in _runs(asleep)
+    ]
+
+    return {
+        'steps': int(np.round(hourly_steps).sum()),
+        'active_minutes': int(active.sum()),
+        'sleep_minutes': int(asleep.sum()),
+        'sedentary_minutes': int((has_data & ~active & ~asleep).sum()),
+        'sleep_segments': sleep_segments,
+        'step_method': step_method,
+        'hourly_breakdown': [
+            {'hour': hour, 'steps': int(round(hourly_steps[hour])), 'active_minutes': int(hourly_active[hour])}
+            for hour in range(len(hourly_steps))
+            if hourly_steps[hour] or hourly_active[hour]
+        ],
+        'epoch_features': {
+            'mean_enmo': float(np.round(epoch_enmo[has_data].mean(), 4)),
+            'mean_magnitude_std': float(np.round(epoch_std[has_data].mean(), 4)),
+            'mean_gyro': float(np.round(epoch_gyro[has_data].mean(), 4)),
+        },
+    }
@@ -0,0 +1,33 @@
+from app.utils.tdigest import TDigest
+from typing import Dict, List
+
+# Reading fields that get a per-day quantile sketch (built in vitals_aggregation)
+SKETCH_METRICS = ('heart_rate', 'spo2', 'temperature')
+
+
+def merge_percentiles(day_docs: List[dict], metrics: List[str], percentiles: List[float]) -> Dict[str, dict]:
+    """
+    Merge stored daily sketches and read off percentiles
+
+    day_docs are daily_vitals documents projected to {date, sketches}.
+    Days synced before sketches existed are skipped and not counted.
+    """
+    result = {}
+    for metric in metrics:
+        digests = [
+            TDigest.from_dict(doc['sketches'][metric])
+            for doc in day_docs
+            if metric in (doc.get('sketches') or {})
+        ]
+        merged = TDigest.merge_all(digests)
+        result[metric] = {
+            'days': len(digests),
+            'count': int(merged.count),
+            'min': merged.min,
+            'max': merged.max,
+            'percentiles': {
+                f'p{p:g}': (round(merged.quantile(p / 100), 2) if merged.count else None)
+                for p in percentiles
+            },
+        }
+    return result
@@ -0,0 +1,114 @@
+from datetime import datetime
+from typing import Optional, Tuple
+import logging
+import threading
+
+from app.config import get_settings
+from app.utils.cache import TTLCache
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# profile_versions/{userId}: {'version': <profile updated_at>, 'updated_at': ...}
+VERSION_COLLECTION = 'profile_versions'
+
+_MISSING = object()
+
+
+class ProfileCache:
+    """
+    Per-user profile cache (LRU + TTL) shared by every FirebaseService
+
+    Entries are (version, profile) where version is the profile's
+    updated_at; profile is None for users that have no profile document.
+    Local writes go through put/merge. Writes made by other workers are
+    seen through a listener on profile_versions, which evicts entries whose
+    version no longer matches; the TTL bounds staleness if the listener is
+    down. The listener callback runs on a Firestore thread, hence the lock.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._watch = None
+        self._listener_failed = False
+        self.invalidations = 0
+
+    def get(self, user_id: str) -> Optional[Tuple[str, Optional[dict]]]:
+        """(version, profile) if cached, else None"""
+        with self._lock:
+            entry = self._cache.get(user_id, _MISSING)
+        if entry is _MISSING:
+            return None
+        version, profile = entry
+        return version, dict(profile) if profile is not None else None
+
+    def put(self, user_id: str, profile: Optional[dict]):
+        version = (profile or {}).get('updated_at', '')
+        with self._lock:
+            self._cache.set(user_id, (version, dict(profile) if profile is not None else None))
+
+    def merge(self, user_id: str, profile_data: dict):
+        """Write-through of a merge write: apply it to the cached profile if present"""
+        with self._lock:
+            entry = self._cache.peek(user_id, _MISSING)
+            if entry is _MISSING:
+                return
+            _, profile = entry
+            merged = {**(profile or {}), **profile_data}
+            self._cache.set(user_id, (merged.get('updated_at', ''), merged))
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._cache.invalidate(user_id)
+
+    def apply_version(self, user_id: str, version: str):
+        """Evict a user's entry unless it is already at version"""
+        with self._lock:
+            entry = self._cache.peek(user_id, _MISSING)
+            if entry is not _MISSING and entry[0] != version:
+                self._cache.invalidate(user_id)
+                self.invalidations += 1
+
+    def start_listener(self, db):
+        """Watch profile_versions for changes made after this worker started"""
+        if self._watch is not None or self._listener_failed:
+            return
+        started = datetime.utcnow().isoformat()
+        query = db.collection(VERSION_COLLECTION).where('updated_at', '>=', started)
+
+        def on_snapshot(_docs, changes, _read_time):
+            for change in changes:
+                data = change.document.to_dict() or {}
+                self.apply_version(change.document.id, data.get('version', ''))
+
+        try:
+            self._watch = query.on_snapshot(on_snapshot)
+        except Exception as e:
+            # Fall back to TTL-only expiry rather than failing profile reads
+            self._listener_failed = True
+            logger.warning("Profile cache invalidation listener not started: %s", e)
+
+    def stop_listener(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = self._cache.stats()
+        stats['invalidations'] = self.invalidations
+        stats['listening'] = self._watch is not None
+        return stats
+
+
+_profile_cache: Optional[ProfileCache] = None
+
+
+def get_profile_cache() -> ProfileCache:
+    """Process-wide profile cache"""
+    global _profile_cache
+    if _profile_cache is None:
+        _profile_cache = ProfileCache(maxsize=settings.PROFILE_CACHE_MAX_ENTRIES,
+                                      ttl=settings.PROFILE_CACHE_TTL_SECONDS)
+    return _profile_cache
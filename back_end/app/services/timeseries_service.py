@@ -0,0 +1,148 @@
+from app.config import get_settings
+from app.services.firebase_service import FirebaseService
+from app.utils.vitals_columns import MILLISECONDS_THRESHOLD, NUMERIC_FIELDS
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+settings = get_settings()
+
+
+def parse_metrics(metrics: str) -> List[str]:
+    """Split and validate a comma-separated metrics parameter"""
+    metric_list = [m.strip() for m in metrics.split(',') if m.strip()]
+    if not metric_list or any(m not in NUMERIC_FIELDS for m in metric_list):
+        raise ValueError(f"metrics must be from: {', '.join(NUMERIC_FIELDS)}")
+    return metric_list
+
+
+def timestamp_seconds(timestamp: int) -> float:
+    return timestamp / 1000 if timestamp > MILLISECONDS_THRESHOLD else timestamp
+
+
+def window_dates(start: int, end: int, max_days: Optional[int] = None) -> Tuple[str, str]:
+    """
+    (first, last) day keys to look at for a window; ValueError if the
+    window is inverted, out of range or longer than max_days
+    """
+    max_days = settings.VITALS_WINDOW_MAX_DAYS if max_days is None else max_days
+    if start < 0:
+        raise ValueError("start must be a non-negative timestamp")
+    if timestamp_seconds(end) < timestamp_seconds(start):
+        raise ValueError("end must be >= start")
+    if timestamp_seconds(end) - timestamp_seconds(start) > max_days * 86400:
+        raise ValueError(f"Window must be at most {max_days} days long")
+    try:
+        # Day keys are the phone's local date, so pad by a day either side
+        first = datetime.utcfromtimestamp(timestamp_seconds(start)) - timedelta(days=1)
+        last = datetime.utcfromtimestamp(timestamp_seconds(end)) + timedelta(days=1)
+    except (OverflowError, OSError, ValueError):
+        raise ValueError("Timestamps are out of range")
+    return first.date().isoformat(), last.date().isoformat()
+
+
+def sort_readings(readings: List[dict]) -> List[dict]:
+    """Readings ordered by timestamp (stable, so same-timestamp order is kept)"""
+    return sorted(readings, key=lambda reading: reading['timestamp'])
+
+
+def find_chunks(chunk_index: List[dict], start: int, end: int) -> List[str]:
+    """
+    Dates of daily chunks overlapping [start, end]
+
+    chunk_index entries are {date, first_timestamp, last_timestamp}. Days
+    don't overlap, so both bounds are sorted and two binary searches find
+    the overlapping run. Legacy days without bounds are always included.
+    """
+    bounded = sorted(
+        (c for c in chunk_index if c.get('first_timestamp') is not None),
+        key=lambda c: c['first_timestamp']
+    )
+    firsts = [c['first_timestamp'] for c in bounded]
+    lasts = [c['last_timestamp'] for c in bounded]
+    lo = bisect_left(lasts, start)
+    hi = bisect_right(firsts, end)
+
+    dates = [c['date'] for c in bounded[lo:hi]]
+    dates.extend(c['date'] for c in chunk_index if c.get('first_timestamp') is None)
+    return sorted(dates)
+
+
+def slice_window(readings: List[dict], start: int, end: int) -> List[dict]:
+    """Readings with start <= timestamp <= end, by binary search on sorted readings"""
+    lo = bisect_left(readings, start, key=lambda reading: reading['timestamp'])
+    hi = bisect_right(readings, end, key=lambda reading: reading['timestamp'])
+    return readings[lo:hi]
+
+
+def project(readings: List[dict], metrics: List[str]) -> List[dict]:
+    return [{'timestamp': r['timestamp'], **{m: r.get(m) for m in metrics}} for r in readings]
+
+
+def bucket_readings(readings: List[dict], metrics: List[str], start: int, bucket: int) -> List[dict]:
+    """
+    Average readings into fixed buckets aligned to the window start
+
+    Each point is stamped with its bucket start and carries the number of
+    readings that fell into it.
+    """
+    points: List[dict] = []
+    current_key: Optional[int] = None
+    sums: Dict[str, float] = {}
+    counts: Dict[str, int] = {}
+    total = 0
+
+    def flush():
+        point = {'timestamp': current_key, 'count': total}
+        for metric in metrics:
+            point[metric] = round(sums[metric] / counts[metric], 3) if counts[metric] else None
+        points.append(point)
+
+    for reading in readings:
+        key = start + (reading['timestamp'] - start) // bucket * bucket
+        if key != current_key:
+            if current_key is not None:
+                flush()
+            current_key, total = key, 0
+            sums = {metric: 0.0 for metric in metrics}
+            counts = {metric: 0 for metric in metrics}
+        total += 1
+        for metric in metrics:
+            value = reading.get(metric)
+            if value is not None:
+                sums[metric] += value
+                counts[metric] += 1
+    if current_key is not None:
+        flush()
+    return points
+
+
+class TimeSeriesService:
+    def __init__(self, firebase_service: Optional[FirebaseService] = None):
+        self.firebase_service = firebase_service or FirebaseService()
+
+    async def get_window(self, user_id: str, start: int, end: int, metrics: List[str],
+                         bucket: Optional[int] = None) -> List[dict]:
+        """
+        Readings between two timestamps, optionally bucketed
+
+        Only the day documents overlapping the window are loaded; within a
+        day the window is located by binary search over sorted readings.
+        Raises ValueError for a window window_dates() rejects.
+        """
+        start_date, end_date = window_dates(start, end)
+        chunk_index = await self.firebase_service.get_vitals_chunk_index(user_id, start_date, end_date)
+        dates = find_chunks(chunk_index, start, end)
+        days = await self.firebase_service.get_vitals_readings(user_id, dates)
+
+        window: List[dict] = []
+        for day in days:
+            readings = day.get('readings') or []
+            if not day.get('readings_sorted'):
+                readings = sort_readings(readings)
+            window.extend(slice_window(readings, start, end))
+        window.sort(key=lambda reading: reading['timestamp'])
+
+        if bucket:
+            return bucket_readings(window, metrics, start, bucket)
+        return project(window, metrics)
@@ -0,0 +1,148 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+import logging
+import threading
+import time
+
+from app.config import get_settings
+from app.utils.bloom import BloomFilter
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# revoked_tokens/{jti or session id}: {'expires_at': <timestamp>, 'kind': 'token'|'session', 'user_id', 'revoked_at'}
+REVOKED_COLLECTION = 'revoked_tokens'
+# Only these are kept in memory: a rotated refresh token's jti is caught by the store when it is revoked again
+SESSION_KIND = 'session'
+
+
+class RevocationList:
+    """
+    In-memory view of revoked session IDs (sid)
+
+    check() is the hot-path test: a bloom filter answers "not revoked" for
+    almost every token without touching the denylist, and the denylist
+    (id -> expiry, bounded to max_entries, oldest dropped first) confirms
+    bloom hits. Once an unexpired entry has been dropped, a bloom hit the
+    denylist can't confirm is reported as unknown and the caller looks the
+    ID up in Firestore.
+
+    Loaded from Firestore at startup; revocations made by other workers
+    arrive through a snapshot listener. While the list is incomplete (the
+    load failed) every ID is reported as unconfirmed.
+    """
+
+    def __init__(self, capacity: int, fp_rate: float, max_entries: int):
+        self._bloom = BloomFilter(capacity, fp_rate)
+        self._denylist: 'OrderedDict[str, float]' = OrderedDict()
+        self.max_entries = max_entries
+        self._evicted = False
+        self._complete = True
+        self._lock = threading.Lock()
+        self._watch = None
+        self._listener_failed = False
+        self.stats = {'checks': 0, 'bloom_hits': 0, 'revoked': 0, 'lookups': 0}
+
+    def add(self, token_id: str, expires_at: float) -> bool:
+        """Record a revocation until expires_at (epoch seconds); False if already recorded"""
+        now = time.time()
+        if expires_at <= now:
+            return True
+        with self._lock:
+            if token_id in self._denylist:
+                return False
+            self._bloom.add(token_id)
+            self._denylist[token_id] = expires_at
+            if len(self._denylist) > self.max_entries:
+                self._prune(now)
+        return True
+
+    def _prune(self, now: float):
+        while len(self._denylist) > self.max_entries:
+            _, expires_at = self._denylist.popitem(last=False)
+            if expires_at > now:
+                # Still revoked (the bloom filter remembers it), but now only Firestore can confirm it
+                self._evicted = True
+
+    def check(self, token_ids: Iterable[str]) -> Tuple[bool, Optional[str]]:
+        """
+        (revoked, unconfirmed ID): revoked is True if any ID is known to be
+        revoked; otherwise an ID that hit the bloom filter but has left the
+        denylist is returned for the caller to look up
+        """
+        self.stats['checks'] += 1
+        unconfirmed = None
+        for token_id in token_ids:
+            if token_id not in self._bloom:
+                if not self._complete and unconfirmed is None:
+                    unconfirmed = token_id
+                continue
+            self.stats['bloom_hits'] += 1
+            if token_id in self._denylist:
+                self.stats['revoked'] += 1
+                return True, None
+            if (self._evicted or not self._complete) and unconfirmed is None:
+                unconfirmed = token_id
+        if unconfirmed is not None:
+            self.stats['lookups'] += 1
+        return False, unconfirmed
+
+    def load(self, entries: Iterable[Tuple[str, float]]):
+        for token_id, expires_at in entries:
+            self.add(token_id, expires_at)
+        self._complete = True
+
+    def mark_incomplete(self):
+        """Revocations made before this worker started are missing until the next load()"""
+        self._complete = False
+
+    def start_listener(self, db):
+        """Watch revoked_tokens for session revocations made after this worker started"""
+        if self._watch is not None or self._listener_failed:
+            return
+        started = datetime.utcnow().isoformat()
+        query = db.collection(REVOKED_COLLECTION).where('kind', '==', SESSION_KIND).where('revoked_at', '>=', started)
+
+        def on_snapshot(_docs, changes, _read_time):
+            for change in changes:
+                data = change.document.to_dict() or {}
+                if data.get('expires_at') is not None:
+                    self.add(change.document.id, data['expires_at'].timestamp())
+
+        try:
+            self._watch = query.on_snapshot(on_snapshot)
+        except Exception as e:
+            # Other workers' revocations then only reach this worker when it restarts
+            self._listener_failed = True
+            logger.warning("Token revocation listener not started: %s", e)
+
+    def stop_listener(self):
+        if self._watch is not None:
+            self._watch.unsubscribe()
+            self._watch = None
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            'entries': len(self._denylist),
+            'bloom_items': self._bloom.count,
+            'evicted': self._evicted,
+            'complete': self._complete,
+            'listening': self._watch is not None,
+        }
+
+
+_revocation_list: Optional[RevocationList] = None
+
+
+def get_revocation_list() -> RevocationList:
+    """Process-wide revocation list"""
+    global _revocation_list
+    if _revocation_list is None:
+        _revocation_list = RevocationList(
+            capacity=settings.REVOCATION_BLOOM_CAPACITY,
+            fp_rate=settings.REVOCATION_BLOOM_FP_RATE,
+            max_entries=settings.REVOCATION_MAX_ENTRIES,
+        )
+    return _revocation_list
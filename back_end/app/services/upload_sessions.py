@@ -0,0 +1,285 @@
+from app.config import get_settings
+from contextlib import ExitStack
+from datetime import datetime
+from typing import List, Optional, Tuple
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+SESSION_FILE = 'session.json'
+COMMIT_LOCK = 'commit.lock'
+CHUNK_SUFFIX = '.chunk'
+# A commit lock older than this was left by a worker that died mid-commit
+STALE_LOCK_SECONDS = 300
+
+
+class UploadNotFoundError(LookupError):
+    """Unknown upload ID, someone else's upload, or one already committed/expired"""
+
+
+class UploadBusyError(Exception):
+    """The upload is being committed by another request"""
+
+
+class UploadStore:
+    """
+    Resumable upload sessions for large sync payloads, spooled to local disk
+
+    An upload is a directory under root holding session.json and one file
+    per received chunk. Chunks have a fixed size (the last one holds the
+    rest) and are written to a temporary file and renamed, so a chunk
+    file is always complete and re-sending a chunk is harmless. All state
+    lives on disk, so any worker on the same host can serve any request of
+    an upload; with several hosts, uploads need sticky routing or a
+    shared volume.
+
+    Activity (creating, a chunk, a commit attempt) touches session.json;
+    uploads idle for longer than idle_seconds are deleted by
+    collect_garbage(). All methods do blocking file I/O: call them from a
+    worker thread.
+    """
+
+    def __init__(self, root: str, chunk_size: int, max_size: int, idle_seconds: float):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self._gc_task: Optional[asyncio.Task] = None
+        self.stats = {'created': 0, 'chunks': 0, 'committed': 0, 'expired': 0}
+
+    # ==================== SESSIONS ====================
+
+    def create(self, user_id: str, content_type: str, total_size: int, sha256: Optional[str] = None) -> dict:
+        """Start an upload of total_size bytes; returns its status"""
+        if total_size > self.max_size:
+            raise ValueError(f"Uploads are limited to {self.max_size} bytes")
+        upload_id = uuid.uuid4().hex
+        path = os.path.join(self.root, upload_id)
+        os.makedirs(path, mode=0o700)
+        session = {
+            'upload_id': upload_id,
+            'user_id': user_id,
+            'content_type': content_type,
+            'total_size': total_size,
+            'chunk_size': self.chunk_size,
+            'chunk_count': -(-total_size // self.chunk_size),
+            'sha256': sha256.lower() if sha256 else None,
+            'created_at': datetime.utcnow().isoformat(),
+        }
+        _write_atomic(os.path.join(path, SESSION_FILE), json.dumps(session).encode())
+        self.stats['created'] += 1
+        return self._status(path, session)
+
+    def _load(self, user_id: str, upload_id: str) -> Tuple[str, dict]:
+        if not UPLOAD_ID_PATTERN.match(upload_id):
+            raise UploadNotFoundError(upload_id)
+        path = os.path.join(self.root, upload_id)
+        try:
+            with open(os.path.join(path, SESSION_FILE), 'rb') as f:
+                session = json.load(f)
+        except FileNotFoundError:
+            raise UploadNotFoundError(upload_id)
+        if session['user_id'] != user_id:
+            raise UploadNotFoundError(upload_id)
+        return path, session
+
+    def _received(self, path: str) -> List[int]:
+        return sorted(int(name[:-len(CHUNK_SUFFIX)]) for name in os.listdir(path) if name.endswith(CHUNK_SUFFIX))
+
+    def _status(self, path: str, session: dict) -> dict:
+        received = self._received(path)
+        have = set(received)
+        return {
+            **{key: session[key] for key in ('upload_id', 'content_type', 'total_size', 'chunk_size', 'chunk_count')},
+            'received': received,
+            'missing': [index for index in range(session['chunk_count']) if index not in have],
+            'idle_timeout_seconds': self.idle_seconds,
+        }
+
+    def status(self, user_id: str, upload_id: str) -> dict:
+        return self._status(*self._load(user_id, upload_id))
+
+    @staticmethod
+    def expected_size(session: dict, index: int) -> int:
+        last = session['chunk_count'] - 1
+        return session['chunk_size'] if index < last else session['total_size'] - session['chunk_size'] * last
+
+    # ==================== CHUNKS ====================
+
+    def put_chunk(self, user_id: str, upload_id: str, index: int, data: bytes, sha256: str) -> dict:
+        """Store chunk index after checking its size and SHA-256; returns the upload's status"""
+        path, session = self._load(user_id, upload_id)
+        if os.path.exists(os.path.join(path, COMMIT_LOCK)):
+            raise UploadBusyError(upload_id)
+        if not 0 <= index < session['chunk_count']:
+            raise ValueError(f"Chunk index must be from 0 to {session['chunk_count'] - 1}")
+        expected = self.expected_size(session, index)
+        if len(data) != expected:
+            raise ValueError(f"Chunk {index} must be {expected} bytes, got {len(data)}")
+        if hashlib.sha256(data).hexdigest() != sha256.lower():
+            raise ValueError(f"Chunk {index} does not match its SHA-256 checksum")
+
+        _write_atomic(os.path.join(path, f"{index:06d}{CHUNK_SUFFIX}"), data)
+        os.utime(os.path.join(path, SESSION_FILE))
+        self.stats['chunks'] += 1
+        if os.path.exists(os.path.join(path, COMMIT_LOCK)):
+            # A commit started while we wrote: it reads the chunks it opened, maybe not this copy
+            raise UploadBusyError(upload_id)
+        return self._status(path, session)
+
+    # ==================== COMMIT ====================
+
+    def assemble(self, user_id: str, upload_id: str) -> Tuple[dict, bytearray]:
+        """
+        Lock the upload for commit and read its chunks, in order, into one buffer
+
+        Each chunk is read straight into its slice of a buffer of
+        total_size, so the payload is in memory once, as for a single
+        request body. Every chunk file is opened before any is read, so a
+        chunk re-sent during the commit (renamed over the old file) can't
+        change what is read. The whole-payload checksum is checked if one
+        was given at creation. Follow with finish() once the payload has
+        been ingested, or release() to allow another attempt.
+        """
+        path, session = self._load(user_id, upload_id)
+        self._lock(path, upload_id)
+        os.utime(os.path.join(path, SESSION_FILE))
+
+        try:
+            missing = self._status(path, session)['missing']
+            if missing:
+                raise ValueError(f"{len(missing)} of {session['chunk_count']} chunks not received yet")
+
+            body = bytearray(session['total_size'])
+            view = memoryview(body)
+            digest = hashlib.sha256()
+            offset = 0
+            with ExitStack() as stack:
+                chunks = [
+                    stack.enter_context(open(os.path.join(path, f"{index:06d}{CHUNK_SUFFIX}"), 'rb'))
+                    for index in range(session['chunk_count'])
+                ]
+                for index, f in enumerate(chunks):
+                    size = self.expected_size(session, index)
+                    if f.readinto(view[offset:offset + size]) != size:
+                        raise ValueError(f"Chunk {index} is damaged, upload it again")
+                    digest.update(view[offset:offset + size])
+                    offset += size
+            view.release()
+            if session['sha256'] and digest.hexdigest() != session['sha256']:
+                raise ValueError("Assembled upload does not match its SHA-256 checksum")
+        except BaseException:
+            self.release(upload_id)
+            raise
+        return session, body
+
+    def _lock(self, path: str, upload_id: str):
+        lock = os.path.join(path, COMMIT_LOCK)
+        for _ in range(2):
+            try:
+                os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return
+            except FileExistsError:
+                try:
+                    if time.time() - os.stat(lock).st_mtime < STALE_LOCK_SECONDS:
+                        break
+                    os.remove(lock)
+                except FileNotFoundError:
+                    pass
+        raise UploadBusyError(upload_id)
+
+    def release(self, upload_id: str):
+        """Unlock an upload after a failed commit"""
+        try:
+            os.remove(os.path.join(self.root, upload_id, COMMIT_LOCK))
+        except FileNotFoundError:
+            pass
+
+    def finish(self, upload_id: str):
+        """Delete a committed upload"""
+        shutil.rmtree(os.path.join(self.root, upload_id), ignore_errors=True)
+        self.stats['committed'] += 1
+
+    # ==================== GARBAGE COLLECTION ====================
+
+    def collect_garbage(self) -> int:
+        """Delete uploads idle for longer than idle_seconds; returns how many"""
+        cutoff = time.time() - self.idle_seconds
+        removed = 0
+        try:
+            entries = list(os.scandir(self.root))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            if not entry.is_dir() or not UPLOAD_ID_PATTERN.match(entry.name):
+                continue
+            try:
+                last_activity = os.stat(os.path.join(entry.path, SESSION_FILE)).st_mtime
+            except FileNotFoundError:
+                # Never finished creating, or being deleted: judge by the directory
+                last_activity = entry.stat().st_mtime
+            if last_activity < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        self.stats['expired'] += removed
+        return removed
+
+    def start_gc(self, interval: float):
+        """Collect garbage now and then every interval seconds (call from the event loop)"""
+        if self._gc_task is None:
+            os.makedirs(self.root, mode=0o700, exist_ok=True)
+            self._gc_task = asyncio.get_running_loop().create_task(self._gc_loop(interval), context=contextvars.Context())
+
+    async def _gc_loop(self, interval: float):
+        while True:
+            try:
+                removed = await asyncio.to_thread(self.collect_garbage)
+                if removed:
+                    logger.info("Deleted %d idle upload(s)", removed)
+            except Exception:
+                logger.exception("Upload garbage collection failed")
+            await asyncio.sleep(interval)
+
+    async def stop_gc(self):
+        if self._gc_task is not None:
+            self._gc_task.cancel()
+            try:
+                await self._gc_task
+            except asyncio.CancelledError:
+                pass
+            self._gc_task = None
+
+
+def _write_atomic(path: str, data: bytes):
+    temporary = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+_upload_store: Optional[UploadStore] = None
+
+
+def get_upload_store() -> UploadStore:
+    """Process-wide upload store"""
+    global _upload_store
+    if _upload_store is None:
+        _upload_store = UploadStore(
+            root=settings.UPLOAD_SPOOL_DIR or os.path.join(tempfile.gettempdir(), 'healthtrack-uploads'),
+            chunk_size=settings.UPLOAD_CHUNK_SIZE,
+            max_size=settings.UPLOAD_MAX_SIZE,
+            idle_seconds=settings.UPLOAD_IDLE_TIMEOUT_SECONDS,
+        )
+    return _upload_store
@@ -0,0 +1,187 @@
+"""
+Server-side daily aggregation of vitals
+
+One pass over the cleaned column arrays produces everything derived from
+a day of readings: the VitalsSummary statistics, hourly rollups, the
+per-metric quantile sketches and sustained-threshold alerts. Masks and
+minute/hour bins are computed once and shared by every stage.
+
+Wellness score (0-100)
+----------------------
+Weighted average of the components that have data, each scored 0-1:
+
+- heart rate (30): resting HR (10th percentile) in 50-70 bpm scores 1,
+  falling linearly to 0 at 40 and 100 bpm
+- SpO2 (25): average 96 %+ scores 1, falling linearly to 0 at 90 %
+- temperature (15): average 36.1-37.2 C scores 1, 0 beyond 1.5 C outside
+- activity (20): steps / daily step goal, capped at 1
+- sleep (10): sleep minutes / 420, capped at 1
+
+Missing components are left out and the remaining weights rescaled, so a
+day without temperature data isn't penalised for it.
+"""
+from app.utils.tdigest import TDigest
+from app.utils.vitals_columns import timestamps_in_seconds
+from typing import Dict, List, Optional
+import numpy as np
+
+SUMMARY_METRICS = ('heart_rate', 'spo2', 'temperature')
+
+WELLNESS_WEIGHTS = {'heart_rate': 30, 'spo2': 25, 'temperature': 15, 'activity': 20, 'sleep': 10}
+SLEEP_TARGET_MINUTES = 420
+
+# (vital_type, comparison, threshold, minimum consecutive minutes, severity, message, recommendation)
+ALERT_RULES = (
+    ('spo2', 'below', 85, 1, 'critical', "Blood oxygen below 85% for {minutes} min",
+     "Seek medical attention if you feel short of breath or dizzy."),
+    ('spo2', 'below', 90, 2, 'warning', "Blood oxygen below 90% for {minutes} min",
+     "Check the sensor fit; if readings stay low, contact your doctor."),
+    ('heart_rate', 'above', 130, 10, 'warning', "Heart rate above 130 bpm for {minutes} min",
+     "If you weren't exercising, rest and contact your doctor if it continues."),
+    ('heart_rate', 'below', 40, 5, 'warning', "Heart rate below 40 bpm for {minutes} min",
+     "Contact your doctor if you feel faint or unusually tired."),
+    ('temperature', 'above', 38.0, 10, 'warning', "Temperature above 38.0 C for {minutes} min",
+     "Rest, stay hydrated and monitor for other symptoms."),
+)
+
+
+def _ramp(value: float, zero_low: float, full_low: float, full_high: float, zero_high: float) -> float:
+    """1 inside [full_low, full_high], linear down to 0 at zero_low/zero_high"""
+    if full_low <= value <= full_high:
+        return 1.0
+    if value < full_low:
+        return max(0.0, (value - zero_low) / (full_low - zero_low)) if full_low > zero_low else 0.0
+    return max(0.0, (zero_high - value) / (zero_high - full_high)) if zero_high > full_high else 0.0
+
+
+def wellness_score(summary: dict, resting_heart_rate: Optional[float] = None,
+                   step_goal: int = 10000) -> Optional[int]:
+    """Score a day 0-100 as documented in the module docstring"""
+    components = {}
+    if resting_heart_rate is not None:
+        components['heart_rate'] = _ramp(resting_heart_rate, 40, 50, 70, 100)
+    if summary.get('avg_spo2') is not None:
+        components['spo2'] = _ramp(summary['avg_spo2'], 90, 96, 100, 100)
+    if summary.get('avg_temperature') is not None:
+        components['temperature'] = _ramp(summary['avg_temperature'], 34.6, 36.1, 37.2, 38.7)
+    if summary.get('steps'):
+        components['activity'] = min(summary['steps'] / max(step_goal, 1), 1.0)
+    if summary.get('sleep_minutes') is not None:
+        components['sleep'] = min(summary['sleep_minutes'] / SLEEP_TARGET_MINUTES, 1.0)
+
+    if not components:
+        return None
+    total_weight = sum(WELLNESS_WEIGHTS[name] for name in components)
+    score = sum(WELLNESS_WEIGHTS[name] * value for name, value in components.items()) / total_weight
+    return int(round(score * 100))
+
+
+def _consecutive_runs(mask: np.ndarray) -> List[tuple]:
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return list(zip(edges[0::2], edges[1::2]))
+
+
+def _detect_alerts(metric: str, minute_means: np.ndarray, minute_starts: np.ndarray) -> List[dict]:
+    """Sustained threshold crossings on per-minute means; one alert per run, worst rule first"""
+    alerts = []
+    claimed = np.zeros(len(minute_means), dtype=bool)
+    for vital_type, comparison, threshold, min_minutes, severity, message, recommendation in ALERT_RULES:
+        if vital_type != metric:
+            continue
+        with np.errstate(invalid='ignore'):
+            crossed = minute_means < threshold if comparison == 'below' else minute_means > threshold
+        for start, end in _consecutive_runs(crossed):
+            if end - start < min_minutes or claimed[start:end].any():
+                continue
+            claimed[start:end] = True
+            window = minute_means[start:end]
+            worst = float(np.nanmin(window) if comparison == 'below' else np.nanmax(window))
+            alerts.append({
+                'timestamp': int(minute_starts[start]),
+                'severity': severity,
+                'vital_type': vital_type,
+                'message': message.format(minutes=int(end - start)),
+                'recommendation': recommendation,
+                'vital_value': round(worst, 1),
+            })
+    return alerts
+
+
+def aggregate_day(columns: Dict[str, np.ndarray], day_start: Optional[float] = None) -> dict:
+    """
+    Derive summary statistics, hourly rollups, sketches and alerts
+
+    Expects cleaned columns (sorted, no impossible values). day_start is
+    the epoch second of the day's local midnight (day_start_seconds);
+    hourly rows count from it, defaulting to the UTC midnight before the
+    first reading. Returns
+    {'summary', 'resting_heart_rate', 'hourly', 'sketches', 'alerts'}.
+    """
+    timestamps = columns['timestamp']
+    result = {'summary': {}, 'resting_heart_rate': None, 'hourly': [], 'sketches': {}, 'alerts': []}
+    if len(timestamps) == 0:
+        return result
+
+    raw_timestamps = timestamps
+    seconds = timestamps_in_seconds(timestamps)
+    to_raw = 1000 if raw_timestamps.max() > seconds.max() else 1
+
+    # Shared bins: every stage below groups by these
+    if day_start is None:
+        day_start = np.floor(seconds[0] / 86400) * 86400
+    first_minute = np.floor(seconds[0] / 60) * 60
+    minute = ((seconds - first_minute) // 60).astype(np.int64)
+    n_minutes = int(minute[-1]) + 1
+    minute_starts = ((first_minute + np.arange(n_minutes) * 60) * to_raw).astype(np.int64)
+    hour = np.maximum((seconds - day_start) // 3600, 0).astype(np.int64)
+    n_hours = int(hour[-1]) + 1
+
+    summary = result['summary']
+    hourly_columns = {}
+    for metric in SUMMARY_METRICS:
+        values = columns[metric]
+        present = ~np.isnan(values)
+        count = int(present.sum())
+        if count == 0:
+            continue
+        filled = np.where(present, values, 0.0)
+        present_f = present.astype(np.float64)
+
+        result['sketches'][metric] = TDigest.from_values(values[present]).to_dict()
+
+        per_minute_n = np.bincount(minute, weights=present_f, minlength=n_minutes)
+        per_minute_sum = np.bincount(minute, weights=filled, minlength=n_minutes)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            minute_means = per_minute_sum / per_minute_n
+        result['alerts'].extend(_detect_alerts(metric, minute_means, minute_starts))
+
+        per_hour_n = np.bincount(hour, weights=present_f, minlength=n_hours)
+        per_hour_sum = np.bincount(hour, weights=filled, minlength=n_hours)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            hourly_columns[metric] = (per_hour_sum / per_hour_n, per_hour_n)
+
+        mean = float(filled.sum() / count)
+        if metric == 'heart_rate':
+            present_values = values[present]
+            summary['avg_heart_rate'] = round(mean, 1)
+            summary['min_heart_rate'] = int(present_values.min())
+            summary['max_heart_rate'] = int(present_values.max())
+            # Resting HR proxy: 10th percentile of per-minute means
+            valid_minutes = minute_means[~np.isnan(minute_means)]
+            result['resting_heart_rate'] = round(float(np.percentile(valid_minutes, 10)), 1)
+        elif metric == 'spo2':
+            summary['avg_spo2'] = round(mean, 1)
+        else:
+            summary['avg_temperature'] = round(mean, 2)
+
+    for h in range(n_hours):
+        row = {'hour': h}
+        for metric, (means, counts) in hourly_columns.items():
+            if counts[h]:
+                row[f'avg_{metric}'] = round(float(means[h]), 2)
+                row[f'{metric}_samples'] = int(counts[h])
+        if len(row) > 1:
+            result['hourly'].append(row)
+
+    return result
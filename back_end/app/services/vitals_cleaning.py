@@ -0,0 +1,108 @@
+"""
+Signal cleaning stage for vitals ingest
+
+Runs on column arrays (app.utils.vitals_columns) before anything is
+stored or aggregated:
+1. Stable sort by timestamp (BLE batches arrive out of order)
+2. Drop duplicate timestamps, keeping the last copy (retransmits)
+3. Mask physiologically impossible values (HR 0/255, SpO2 127, ...)
+4. Replace isolated spikes with the rolling median of their neighbours
+5. Drop rows left with no values at all
+"""
+from numpy.lib.stride_tricks import sliding_window_view
+from app.utils.vitals_columns import NUMERIC_FIELDS, take
+from typing import Dict, Tuple
+import numpy as np
+
+# Inclusive plausible ranges; anything outside is a sensor error
+VALID_RANGES = {
+    'heart_rate': (25, 240),
+    'spo2': (50, 100),
+    'temperature': (30.0, 43.0),
+    'battery': (0, 100),
+}
+
+# Rolling-median spike filter: max allowed distance from the local median
+SPIKE_THRESHOLDS = {
+    'heart_rate': 30,
+    'spo2': 5,
+    'temperature': 1.5,
+}
+SPIKE_WINDOW = 5  # samples, centred
+
+
+def rolling_nanmedian(values: np.ndarray, window: int = SPIKE_WINDOW) -> np.ndarray:
+    """Centred rolling median that ignores NaN (edges use a shrunken window)"""
+    half = window // 2
+    padded = np.concatenate((np.full(half, np.nan), values, np.full(half, np.nan)))
+    # Sorting pushes NaN to the end, so the median of the k valid values
+    # sits at positions (k-1)//2 and k//2 of each sorted window
+    windows = np.sort(sliding_window_view(padded, window), axis=1)
+    valid = window - np.isnan(windows).sum(axis=1)
+    rows = np.arange(len(values))
+    lower = windows[rows, np.maximum(valid - 1, 0) // 2]
+    upper = windows[rows, np.minimum(valid // 2, window - 1)]
+    median = (lower + np.where(valid % 2 == 1, lower, upper)) / 2
+    median[valid == 0] = np.nan
+    return median
+
+
+def clean_columns(columns: Dict[str, np.ndarray]) -> Tuple[Dict[str, np.ndarray], dict]:
+    """
+    Clean a batch of readings
+
+    Returns the cleaned columns (sorted by timestamp) and a report with
+    the number of samples dropped or corrected at each step.
+    """
+    timestamps = columns['timestamp']
+    report = {
+        'input_samples': int(len(timestamps)),
+        'out_of_order': int((np.diff(timestamps) < 0).sum()) if len(timestamps) > 1 else 0,
+        'duplicates_dropped': 0,
+        'out_of_range_masked': {},
+        'spikes_corrected': {},
+        'empty_dropped': 0,
+        'output_samples': 0,
+    }
+    if len(timestamps) == 0:
+        return columns, report
+
+    columns = take(columns, np.argsort(timestamps, kind='stable'))
+
+    timestamps = columns['timestamp']
+    last_of_group = np.append(timestamps[1:] != timestamps[:-1], True)
+    report['duplicates_dropped'] = int((~last_of_group).sum())
+    if report['duplicates_dropped']:
+        columns = take(columns, last_of_group)
+
+    for field, (low, high) in VALID_RANGES.items():
+        values = columns[field]
+        invalid = (values < low) | (values > high)  # NaN compares False, so stays untouched
+        count = int(invalid.sum())
+        if count:
+            values = values.copy()
+            values[invalid] = np.nan
+            columns[field] = values
+            report['out_of_range_masked'][field] = count
+
+    for field, threshold in SPIKE_THRESHOLDS.items():
+        values = columns[field]
+        if np.isnan(values).all():
+            continue
+        median = rolling_nanmedian(values)
+        spikes = np.abs(values - median) > threshold
+        count = int(spikes.sum())
+        if count:
+            values = values.copy()
+            values[spikes] = median[spikes]
+            columns[field] = values
+            report['spikes_corrected'][field] = count
+
+    numeric = np.vstack([columns[field] for field in NUMERIC_FIELDS])
+    has_any = ~np.isnan(numeric).all(axis=0)
+    report['empty_dropped'] = int((~has_any).sum())
+    if report['empty_dropped']:
+        columns = take(columns, has_any)
+
+    report['output_samples'] = int(len(columns['timestamp']))
+    return columns, report
@@ -0,0 +1,102 @@
+from app.services.firebase_service import FirebaseService
+from app.services.imu_analysis import analyze_imu
+from app.services.vitals_aggregation import aggregate_day, wellness_score
+from app.services.vitals_cleaning import clean_columns
+from app.utils.vitals_columns import readings_to_columns, columns_to_readings, day_start_seconds, timestamps_in_seconds
+from app.config import get_settings
+from typing import Dict, List, Optional
+import numpy as np
+
+settings = get_settings()
+
+
+class VitalsIngestService:
+    """
+    End-of-day vitals ingestion
+
+    readings -> column arrays -> cleaning -> one aggregation pass (summary,
+    hourly rollup, sketches, alerts) + activity/sleep analysis ->
+    daily_vitals (+ daily_activities rollup, alerts)
+    """
+
+    def __init__(self, firebase_service: Optional[FirebaseService] = None):
+        self.firebase_service = firebase_service or FirebaseService()
+
+    async def ingest(self, user_id: str, date: str, readings: List[dict], summary: dict,
+                     utc_offset_minutes: Optional[int] = None) -> dict:
+        """
+        Clean, analyze and store one day of readings; returns the cleaning report
+
+        utc_offset_minutes is the phone's offset from UTC at the start of
+        the day; hourly figures count from that local midnight. Inferred
+        from the readings when missing (see day_start_seconds).
+        """
+        return await self.ingest_columns(user_id, date, readings_to_columns(readings), summary, utc_offset_minutes)
+
+    async def ingest_columns(self, user_id: str, date: str, columns: Dict[str, np.ndarray], summary: dict,
+                             utc_offset_minutes: Optional[int] = None) -> dict:
+        """Same as ingest(), for callers that already have column arrays"""
+        columns, report = clean_columns(columns)
+        day_start = day_start_seconds(date, timestamps_in_seconds(columns['timestamp']), utc_offset_minutes)
+        aggregate = aggregate_day(columns, day_start)
+
+        # Vitals statistics come from the readings, not the phone's summary
+        summary.update({
+            'avg_heart_rate': None, 'max_heart_rate': None, 'min_heart_rate': None,
+            'avg_spo2': None, 'avg_temperature': None,
+            **aggregate['summary'],
+        })
+
+        # Server-side activity/sleep classification overrides the client's counts
+        activity = None
+        if settings.SERVER_ACTIVITY_ANALYSIS and report['output_samples']:
+            activity = analyze_imu(columns, day_start)
+        if activity:
+            summary['steps'] = activity['steps']
+            summary['active_minutes'] = activity['active_minutes']
+            summary['sleep_minutes'] = activity['sleep_minutes']
+
+        profile = await self.firebase_service.get_user_profile(user_id) or {}
+        summary['wellness_score'] = wellness_score(
+            summary,
+            resting_heart_rate=aggregate['resting_heart_rate'],
+            step_goal=profile.get('daily_step_goal') or 10000
+        )
+
+        await self.firebase_service.store_daily_vitals(
+            user_id=user_id,
+            date=date,
+            readings=columns_to_readings(columns),
+            summary=summary,
+            sketches=aggregate['sketches'],
+            activity_analysis=activity,
+            ingest_report=report,
+            hourly=aggregate['hourly']
+        )
+
+        if activity:
+            await self.firebase_service.merge_daily_activity(
+                user_id=user_id,
+                date=date,
+                activity_data={
+                    'user_id': user_id,
+                    'date': date,
+                    'steps': activity['steps'],
+                    'active_minutes': activity['active_minutes'],
+                    'hourly_breakdown': activity['hourly_breakdown'],
+                    'source': 'server_imu'
+                }
+            )
+
+        if settings.SERVER_ALERT_DETECTION:
+            for alert in aggregate['alerts']:
+                # Deterministic ID so re-syncing a day doesn't duplicate alerts
+                alert_id = f"server_{date}_{alert['vital_type']}_{alert['timestamp']}"
+                await self.firebase_service.create_alert(
+                    user_id=user_id,
+                    alert_data={**alert, 'user_id': user_id, 'acknowledged': False, 'source': 'server'},
+                    alert_id=alert_id
+                )
+
+        report['alerts_detected'] = len(aggregate['alerts'])
+        return report
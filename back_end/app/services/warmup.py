@@ -0,0 +1,42 @@
+from typing import Dict
+import asyncio
+import logging
+import time
+
+from app.services.firebase_service import FirebaseService
+from app.services.profile_cache import get_profile_cache
+from app.utils.security import SecurityUtils
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up() -> Dict[str, float]:
+    """
+    Pay one-off costs at startup instead of on the first requests
+
+    - bcrypt backend loaded and a JWT signed/verified (first login/request)
+    - Firestore client created and its gRPC channel opened with one point
+      read, and the profile invalidation listener started
+
+    A failing step is reported and skipped; the app still starts.
+    Returns milliseconds per step.
+    """
+    timings = {}
+
+    async def step(name, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(func, *args, **kwargs)
+        except Exception as e:
+            logger.warning("Warm-up step '%s' failed: %s", name, e)
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    await step('auth', SecurityUtils.warm_up)
+
+    service = FirebaseService()
+    if not service.demo_mode:
+        # A missing document still opens the channel and authenticates
+        await step('firestore', service.db.collection('users').document('_warmup').get, timeout=5)
+        await step('profile_listener', get_profile_cache().start_listener, service.db)
+
+    return timings
@@ -0,0 +1,188 @@
+from typing import Callable, Dict, Optional, Tuple
+import asyncio
+import contextvars
+import logging
+
+from app.config import get_settings
+from app.utils.circuit_breaker import CircuitOpenError, get_firestore_breaker
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Firestore allows at most 500 writes per batch
+MAX_BATCH_WRITES = 500
+
+# Pending write key: (document path, 'set' (merge) or 'update')
+WriteKey = Tuple[str, str]
+
+
+class WriteBehindQueue:
+    """
+    Deferred, coalescing Firestore writes for data no response depends on
+
+    Writes to the same document are merged in memory (later fields win), so
+    ten logins before a flush cost one write. A background task commits
+    pending writes in batches every flush_interval seconds, or sooner once
+    batch_size documents are pending. If a batch fails, its writes are
+    retried one by one so a single bad write (e.g. an update of a deleted
+    document) doesn't hold back the rest; a write that keeps failing is
+    dropped after max_retries, with an error logged. drain() flushes
+    everything and is called on shutdown; a write still queued when the
+    process is killed hard is lost, so only enqueue writes that are safe
+    to lose.
+    """
+
+    def __init__(self, client_factory: Callable, flush_interval: float = 1.0,
+                 batch_size: int = 200, max_retries: int = 3):
+        self._client_factory = client_factory
+        self.flush_interval = flush_interval
+        self.batch_size = min(batch_size, MAX_BATCH_WRITES)
+        self.max_retries = max_retries
+        self._pending: Dict[WriteKey, dict] = {}
+        self._attempts: Dict[WriteKey, int] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+        self.stats = {'enqueued': 0, 'coalesced': 0, 'written': 0, 'batches': 0, 'failed': 0, 'dropped': 0}
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def enqueue(self, path: str, data: dict, op: str = 'set'):
+        """Queue a merge-set (op='set') or update (op='update') of one document"""
+        key = (path, op)
+        self.stats['enqueued'] += 1
+        if key in self._pending:
+            self.stats['coalesced'] += 1
+            self._pending[key].update(data)
+        else:
+            self._pending[key] = dict(data)
+        self._ensure_running()
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            # Fresh context: the task outlives the request that started it
+            self._task = asyncio.get_running_loop().create_task(self._run(), context=contextvars.Context())
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self, path: Optional[str] = None):
+        """Commit pending writes now (only those for one document if path is given)"""
+        if self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            while True:
+                keys = [key for key in self._pending if path is None or key[0] == path][:self.batch_size]
+                if not keys:
+                    return
+                writes = [(key, self._pending.pop(key)) for key in keys]
+                try:
+                    await get_firestore_breaker().call(asyncio.to_thread, self._commit, writes)
+                    self.stats['written'] += len(writes)
+                    self.stats['batches'] += 1
+                    for key, _ in writes:
+                        self._attempts.pop(key, None)
+                except CircuitOpenError:
+                    # Not attempted: keep everything queued for a later flush
+                    self._restore(writes)
+                    return
+                except Exception as e:
+                    self.stats['failed'] += 1
+                    logger.warning("Deferred write batch of %d failed, retrying each write: %s", len(writes), e)
+                    await self._commit_each(writes)
+                    return
+
+    async def _commit_each(self, writes):
+        """Commit writes one at a time after their batch failed; failures are requeued"""
+        for index, (key, data) in enumerate(writes):
+            try:
+                await get_firestore_breaker().call(asyncio.to_thread, self._commit, [(key, data)])
+                self.stats['written'] += 1
+                self._attempts.pop(key, None)
+            except CircuitOpenError:
+                self._restore(writes[index:])
+                return
+            except Exception as e:
+                self._requeue([(key, data)], e)
+
+    def _restore(self, writes):
+        # Fields queued since the attempt are newer and win
+        for key, data in writes:
+            self._pending[key] = {**data, **self._pending.get(key, {})}
+
+    def _commit(self, writes):
+        db = self._client_factory()
+        batch = db.batch()
+        for (path, op), data in writes:
+            ref = db.document(path)
+            if op == 'update':
+                batch.update(ref, data)
+            else:
+                batch.set(ref, data, merge=True)
+        batch.commit(timeout=settings.FIRESTORE_CALL_TIMEOUT_SECONDS)
+
+    def _requeue(self, writes, error: Exception):
+        for key, data in writes:
+            attempts = self._attempts.get(key, 0) + 1
+            if attempts > self.max_retries:
+                self._attempts.pop(key, None)
+                self.stats['dropped'] += 1
+                logger.error("Dropped deferred write to %s after %d retries: %s", key[0], attempts - 1, error)
+                continue
+            self._attempts[key] = attempts
+            logger.warning("Deferred write to %s failed (attempt %d of %d): %s",
+                           key[0], attempts, self.max_retries + 1, error)
+            self._restore([(key, data)])
+
+    async def drain(self):
+        """Flush everything and stop the background task (app shutdown)"""
+        if self._task is not None:
+            # Let an in-flight batch finish rather than cancelling it mid-commit
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            self._stopping = False
+        for _ in range(self.max_retries + 1):
+            if not self._pending:
+                break
+            await self.flush()
+        if self._pending:
+            # e.g. the circuit breaker is open: these writes are lost
+            self.stats['dropped'] += len(self._pending)
+            logger.error("Shutting down with %d deferred write(s) not saved: %s",
+                         len(self._pending), ', '.join(sorted(path for path, _ in self._pending)))
+            self._pending.clear()
+            self._attempts.clear()
+
+
+_write_behind: Optional[WriteBehindQueue] = None
+
+
+def _firestore_client():
+    from firebase_admin import firestore
+    return firestore.client()
+
+
+def get_write_behind() -> WriteBehindQueue:
+    """Process-wide write-behind queue"""
+    global _write_behind
+    if _write_behind is None:
+        _write_behind = WriteBehindQueue(
+            client_factory=_firestore_client,
+            flush_interval=settings.WRITE_BEHIND_FLUSH_SECONDS,
+            batch_size=settings.WRITE_BEHIND_BATCH_SIZE,
+        )
+    return _write_behind
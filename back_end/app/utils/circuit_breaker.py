@@ -0,0 +1,199 @@
+from collections import deque
+from functools import wraps
+from fastapi import HTTPException, status
+from typing import Callable, Optional
+import asyncio
+import time
+
+from app.config import get_settings
+from app.utils.cache import TTLCache
+from app.utils.request_context import mark_stale
+from app.utils.single_flight import freeze_args
+from app.utils.deadlines import DeadlineExceededError
+
+settings = get_settings()
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+_MISSING = object()
+
+_backend_errors: Optional[tuple] = None
+
+
+def backend_errors() -> tuple:
+    """
+    Errors that say the backend is unhealthy; client errors such as NotFound
+    or AlreadyExists (and our own ValueErrors) don't count against the circuit.
+    Built on first use so google.api_core isn't imported at app import.
+    """
+    global _backend_errors
+    if _backend_errors is None:
+        from google.api_core import exceptions as google_exceptions
+        _backend_errors = (
+            google_exceptions.ServerError,
+            google_exceptions.TooManyRequests,
+            google_exceptions.RetryError,
+            asyncio.TimeoutError,
+            TimeoutError,
+            ConnectionError,
+        )
+    return _backend_errors
+
+
+class CircuitOpenError(HTTPException):
+    """Raised without calling the backend while the circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{name} is temporarily unavailable, retry shortly",
+            headers={"Retry-After": str(max(1, int(round(retry_after))))},
+        )
+
+
+class CircuitBreaker:
+    """
+    Trips when recent calls to a dependency mostly fail or are slow
+
+    Outcomes of the last window_size calls are kept. Once min_calls are
+    recorded, the circuit opens when the failure rate or the slow-call
+    rate reaches its threshold; calls then fail immediately with
+    CircuitOpenError for open_seconds. After that up to half_open_probes
+    calls are let through: if they all succeed quickly the circuit closes,
+    any failure re-opens it.
+    """
+
+    def __init__(self, name: str, window_size: int = 20, min_calls: int = 10,
+                 failure_rate: float = 0.5, slow_call_seconds: float = 2.0, slow_call_rate: float = 0.8,
+                 open_seconds: float = 15.0, half_open_probes: int = 3):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window_size)  # (failed, slow)
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_passed = 0
+        self.stats = {'calls': 0, 'failures': 0, 'slow_calls': 0, 'rejected': 0, 'opened': 0}
+
+    def _before_call(self):
+        if self.state == OPEN:
+            remaining = self._opened_at + self.open_seconds - time.monotonic()
+            if remaining > 0:
+                self.stats['rejected'] += 1
+                raise CircuitOpenError(self.name, remaining)
+            self.state = HALF_OPEN
+            self._probes_started = self._probes_passed = 0
+        if self.state == HALF_OPEN:
+            if self._probes_started >= self.half_open_probes:
+                self.stats['rejected'] += 1
+                raise CircuitOpenError(self.name, self.open_seconds)
+            self._probes_started += 1
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.stats['opened'] += 1
+
+    def _record(self, failed: bool, slow: bool):
+        self.stats['calls'] += 1
+        self.stats['failures'] += failed
+        self.stats['slow_calls'] += slow
+        if self.state == HALF_OPEN:
+            if failed or slow:
+                self._open()
+            else:
+                self._probes_passed += 1
+                if self._probes_passed >= self.half_open_probes:
+                    self.state = CLOSED
+            return
+
+        self._outcomes.append((failed, slow))
+        total = len(self._outcomes)
+        if total < self.min_calls:
+            return
+        failures = sum(1 for f, _ in self._outcomes if f)
+        slow_calls = sum(1 for _, s in self._outcomes if s)
+        if failures / total >= self.failure_rate or slow_calls / total >= self.slow_call_rate:
+            self._open()
+
+    async def call(self, func: Callable, *args, **kwargs):
+        self._before_call()
+        start = time.monotonic()
+        try:
+            result = await func(*args, **kwargs)
+        except backend_errors():
+            self._record(failed=True, slow=False)
+            raise
+        except BaseException:
+            # Caller errors and cancellation say nothing about backend health
+            if self.state == HALF_OPEN:
+                self._probes_started -= 1
+            raise
+        self._record(failed=False, slow=time.monotonic() - start >= self.slow_call_seconds)
+        return result
+
+    def snapshot(self) -> dict:
+        return {'state': self.state, **self.stats}
+
+
+_firestore_breaker: Optional[CircuitBreaker] = None
+
+
+def get_firestore_breaker() -> CircuitBreaker:
+    """Process-wide breaker guarding every Firestore call"""
+    global _firestore_breaker
+    if _firestore_breaker is None:
+        _firestore_breaker = CircuitBreaker(
+            'Firestore',
+            window_size=settings.CIRCUIT_WINDOW_SIZE,
+            min_calls=settings.CIRCUIT_MIN_CALLS,
+            failure_rate=settings.CIRCUIT_FAILURE_RATE,
+            slow_call_seconds=settings.CIRCUIT_SLOW_CALL_SECONDS,
+            slow_call_rate=settings.CIRCUIT_SLOW_CALL_RATE,
+            open_seconds=settings.CIRCUIT_OPEN_SECONDS,
+            half_open_probes=settings.CIRCUIT_HALF_OPEN_PROBES,
+        )
+    return _firestore_breaker
+
+
+# Last good result of each fallback-enabled read, keyed like single-flight
+_last_good = TTLCache(maxsize=settings.STALE_CACHE_MAX_ENTRIES, ttl=settings.STALE_CACHE_TTL_SECONDS)
+stale_stats = {'served': 0}
+
+
+def stale_fallback(method: Optional[Callable] = None, *, keep: Optional[Callable] = None) -> Callable:
+    """
+    Decorator for read methods: remember the last good result, and return
+    it (marking the response stale) when the backend is failing, the
+    circuit is open or the request ran out of time. Without a remembered
+    value the error propagates.
+
+    Results are kept whole unless keep is given, so use it bare only on
+    small reads (a profile, a page of alerts); reads that return raw
+    readings pass keep to remember a reduced copy, e.g.
+    @stale_fallback(keep=without_readings).
+    """
+    if method is None:
+        return lambda method: stale_fallback(method, keep=keep)
+
+    @wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        key = (method.__qualname__, freeze_args(args), freeze_args(kwargs))
+        try:
+            result = await method(self, *args, **kwargs)
+        except (CircuitOpenError, DeadlineExceededError) + backend_errors():
+            cached = _last_good.get(key, _MISSING)
+            if cached is _MISSING:
+                raise
+            stale_stats['served'] += 1
+            mark_stale()
+            return cached
+        _last_good.set(key, keep(result) if keep is not None else result)
+        return result
+    return wrapper
@@ -0,0 +1,120 @@
+"""
+Columnar MessagePack encoding for /vitals/sync
+
+Content-Type: application/x-msgpack (application/msgpack and
+application/vnd.msgpack are accepted too). The body is one map:
+
+    {
+        "date": "2025-11-17",
+        "utc_offset_minutes": 60,      # optional, at local midnight; inferred if missing
+        "summary": {...},              # optional, VitalsSummary fields
+        "count": 86400,                # number of readings
+        "columns": {
+            "timestamp": <bin>,        # int64 little-endian, required
+            "heart_rate": <bin>,       # float32 or float64 little-endian, NaN = missing
+            ...                        # any numeric VitalReading field
+            "activity_state": [...]    # optional list of str/nil
+        }
+    }
+
+Each numeric column is a single bin blob that is viewed with
+np.frombuffer, so decoding allocates one buffer per column instead of
+one dict per reading.
+"""
+from app.utils.vitals_columns import NUMERIC_FIELDS, STRING_FIELDS
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+MSGPACK_CONTENT_TYPES = ('application/x-msgpack', 'application/msgpack', 'application/vnd.msgpack')
+
+
+def _numeric_column(name: str, blob: bytes, count: int) -> np.ndarray:
+    if not isinstance(blob, (bytes, bytearray, memoryview)):
+        raise ValueError(f"Column '{name}' must be binary")
+    if len(blob) == count * 4:
+        return np.frombuffer(blob, dtype='<f4').astype(np.float64)
+    if len(blob) == count * 8:
+        return np.frombuffer(blob, dtype='<f8')
+    raise ValueError(f"Column '{name}' has {len(blob)} bytes, expected {count} float32 or float64 values")
+
+
+def decode_vitals_msgpack(body: bytes) -> Tuple[str, Optional[dict], Dict[str, np.ndarray], Optional[int]]:
+    """
+    Decode a columnar sync body into (date, summary, columns, utc_offset_minutes)
+
+    Raises ValueError if malformed.
+    """
+    import msgpack
+
+    try:
+        payload = msgpack.unpackb(body, raw=False)
+    except Exception as e:
+        raise ValueError(f"Invalid MessagePack body: {e}")
+    if not isinstance(payload, dict):
+        raise ValueError("Body must be a MessagePack map")
+
+    date = payload.get('date')
+    raw_columns = payload.get('columns')
+    if not isinstance(date, str) or not isinstance(raw_columns, dict):
+        raise ValueError("Body must contain 'date' (str) and 'columns' (map)")
+    summary = payload.get('summary')
+    if summary is not None and not isinstance(summary, dict):
+        raise ValueError("'summary' must be a map")
+    utc_offset_minutes = payload.get('utc_offset_minutes')
+    if utc_offset_minutes is not None and (
+        not isinstance(utc_offset_minutes, int) or isinstance(utc_offset_minutes, bool)
+        or not -840 <= utc_offset_minutes <= 840
+    ):
+        raise ValueError("'utc_offset_minutes' must be an integer from -840 to 840")
+
+    timestamps = raw_columns.get('timestamp')
+    if not isinstance(timestamps, (bytes, bytearray)) or len(timestamps) % 8:
+        raise ValueError("Column 'timestamp' must be int64 binary")
+    count = payload.get('count', len(timestamps) // 8)
+    if count != len(timestamps) // 8:
+        raise ValueError("'count' doesn't match the timestamp column")
+
+    unknown = set(raw_columns) - {'timestamp', *NUMERIC_FIELDS, *STRING_FIELDS}
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+
+    columns = {'timestamp': np.frombuffer(timestamps, dtype='<i8')}
+    for field in NUMERIC_FIELDS:
+        if field in raw_columns:
+            columns[field] = _numeric_column(field, raw_columns[field], count)
+        else:
+            columns[field] = np.full(count, np.nan)
+    for field in STRING_FIELDS:
+        values = raw_columns.get(field)
+        if values is None:
+            columns[field] = np.full(count, None, dtype=object)
+        elif (isinstance(values, list) and len(values) == count
+              and all(value is None or isinstance(value, str) for value in values)):
+            columns[field] = np.array(values, dtype=object)
+        else:
+            raise ValueError(f"Column '{field}' must be a list of {count} str/nil values")
+
+    return date, summary, columns, utc_offset_minutes
+
+
+def encode_vitals_msgpack(date: str, columns: Dict[str, np.ndarray], summary: Optional[dict] = None,
+                          float_dtype: str = '<f4', utc_offset_minutes: Optional[int] = None) -> bytes:
+    """Reference encoder (what the app sends); numeric columns that are all NaN are omitted"""
+    import msgpack
+
+    encoded = {'timestamp': np.ascontiguousarray(columns['timestamp'], dtype='<i8').tobytes()}
+    for field in NUMERIC_FIELDS:
+        values = columns.get(field)
+        if values is not None and not np.isnan(values).all():
+            encoded[field] = np.ascontiguousarray(values, dtype=float_dtype).tobytes()
+    for field in STRING_FIELDS:
+        values = columns.get(field)
+        if values is not None and any(v is not None for v in values):
+            encoded[field] = list(values)
+
+    payload = {'date': date, 'count': len(columns['timestamp']), 'columns': encoded}
+    if summary is not None:
+        payload['summary'] = summary
+    if utc_offset_minutes is not None:
+        payload['utc_offset_minutes'] = utc_offset_minutes
+    return msgpack.packb(payload, use_bin_type=True)
@@ -0,0 +1,52 @@
+from fastapi import HTTPException, status
+from typing import Optional
+
+from app.config import get_settings
+from app.utils.request_context import RequestState, current_request_state
+
+settings = get_settings()
+
+
+class DeadlineExceededError(HTTPException):
+    """504 carrying where the request's time budget went"""
+
+    def __init__(self, state: Optional[RequestState], operation: str):
+        detail = {"message": f"Request deadline exceeded during {operation}"}
+        if state is not None:
+            detail.update({
+                "deadline_ms": round((state.deadline - state.started) * 1000) if state.deadline else None,
+                "elapsed_ms": round(state.elapsed_ms(), 1),
+                "timings": [{"operation": op, "ms": round(ms, 1)} for op, ms in state.timings],
+            })
+        super().__init__(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=detail)
+
+
+def route_deadline(path: str) -> Optional[float]:
+    """Deadline in seconds for a request path: longest matching ROUTE_DEADLINES prefix, else the default"""
+    deadline = settings.REQUEST_DEADLINE_SECONDS
+    matched = ''
+    for prefix, seconds in settings.ROUTE_DEADLINES.items():
+        if path.startswith(prefix) and len(prefix) > len(matched):
+            matched, deadline = prefix, seconds
+    return deadline or None
+
+
+def call_timeout(operation: str) -> float:
+    """
+    Timeout for one backend call: the request's remaining budget, capped at
+    FIRESTORE_CALL_TIMEOUT_SECONDS. Raises DeadlineExceededError if the
+    budget is already spent.
+    """
+    state = current_request_state()
+    remaining = state.remaining() if state is not None else None
+    if remaining is None:
+        return settings.FIRESTORE_CALL_TIMEOUT_SECONDS
+    if remaining <= 0:
+        raise DeadlineExceededError(state, operation)
+    return min(remaining, settings.FIRESTORE_CALL_TIMEOUT_SECONDS)
+
+
+def record_timing(operation: str, ms: float):
+    state = current_request_state()
+    if state is not None:
+        state.timings.append((operation, ms))
@@ -0,0 +1,51 @@
+from fastapi import Response
+from typing import Iterable, Optional
+import hashlib
+
+# Clients must revalidate, but may keep the body and send If-None-Match
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """
+    Weak ETag from version markers (updated_at/synced_at values, dates, query params)
+
+    Weak because it names the data, not the bytes: the gzip, br and
+    identity encodings of a response share it.
+    """
+    digest = hashlib.sha1('\x1f'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest[:24]}"'
+
+
+def day_version(doc: dict, version_field: str = 'synced_at') -> str:
+    """A day's version marker; compaction changes it without touching synced_at"""
+    version = str(doc.get(version_field))
+    return f"{version}/{doc['resolution']}" if doc.get('resolution') else version
+
+
+def versions_etag(kind: str, start: str, end: str, docs: Iterable[dict], version_field: str = 'synced_at') -> str:
+    """ETag for a date-range response, from each day's date and version"""
+    return make_etag(kind, start, end, *(f"{doc.get('date')}@{day_version(doc, version_field)}" for doc in docs))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for GET)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == opaque:
+            return True
+    return False
+
+def etag_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
@@ -1,16 +1,19 @@
-import firebase_admin
-from firebase_admin import credentials
 from app.config import get_settings
 import json
+import logging
 import os
 from pathlib import Path
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 def initialize_firebase():
-    """Initialize Firebase Admin SDK"""
+    """Initialize Firebase Admin SDK (blocking; called from the app lifespan and job CLIs)"""
+    import firebase_admin
+    from firebase_admin import credentials
+    
     if firebase_admin._apps:
-        print("✅ Firebase already initialized")
+        logger.info("Firebase already initialized")
         return  # Already initialized
     
     try:
@@ -25,17 +28,17 @@ def initialize_firebase():
                 cred_path = base_dir / cred_path
             
             if cred_path.exists():
-                print(f"📄 Loading Firebase credentials from: {cred_path}")
+                logger.info("Loading Firebase credentials from %s", cred_path)
                 cred = credentials.Certificate(str(cred_path))
                 firebase_admin.initialize_app(cred)
-                print("✅ Firebase initialized successfully with Firestore access")
+                logger.info("Firebase initialized with Firestore access")
                 return
             else:
-                print(f"⚠️  Credentials file not found: {cred_path}")
+                logger.warning("Firebase credentials file not found: %s", cred_path)
         
         # Try environment variables as fallback
         if settings.FIREBASE_PROJECT_ID and settings.FIREBASE_PRIVATE_KEY and settings.FIREBASE_CLIENT_EMAIL:
-            print("📄 Loading Firebase credentials from environment variables")
+            logger.info("Loading Firebase credentials from environment variables")
             cred_dict = {
                 "type": "service_account",
                 "project_id": settings.FIREBASE_PROJECT_ID,
@@ -48,15 +51,11 @@ def initialize_firebase():
             }
             cred = credentials.Certificate(cred_dict)
             firebase_admin.initialize_app(cred)
-            print("✅ Firebase initialized successfully with Firestore access")
+            logger.info("Firebase initialized with Firestore access")
             return
         
-        print("⚠️  No Firebase credentials found")
-        print("   Set FIREBASE_CREDENTIALS_PATH in .env or provide credentials")
-        print("   App will work in DEMO MODE without cloud sync")
+        logger.warning("No Firebase credentials found (set FIREBASE_CREDENTIALS_PATH in .env); "
+                       "running in DEMO MODE without cloud sync")
         
-    except Exception as e:
-        print(f"❌ Firebase initialization failed: {e}")
-        print("   App will work in DEMO MODE without cloud sync")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Firebase initialization failed; running in DEMO MODE without cloud sync")
@@ -0,0 +1,168 @@
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+import json
+import logging
+import queue
+import random
+import sys
+
+from app.utils.request_context import current_request_state
+
+# LogRecord attributes that aren't user-supplied `extra` fields
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {
+    'message', 'asctime', 'request_id', 'user_id', 'elapsed_ms',
+}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request context and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for field in ('request_id', 'user_id', 'elapsed_ms'):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        if getattr(record, 'request_id', None) is None:
+            record.request_id = '-'
+        return super().format(record)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Stamps records with the current request's ID, user ID and elapsed time,
+    and samples DEBUG records
+
+    Runs in the calling thread, before the record is queued, because the
+    context variables aren't visible from the listener thread. DEBUG
+    records are kept for a sample of requests (all of a sampled request's
+    debug lines, none of the others) so hot-path debug logging can stay on
+    in production; outside a request each record is sampled on its own.
+    """
+
+    def __init__(self, debug_sample_rate: float = 1.0):
+        super().__init__()
+        self.debug_sample_rate = debug_sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        state = current_request_state()
+        if record.levelno <= logging.DEBUG and self.debug_sample_rate < 1.0:
+            if state is None:
+                if random.random() >= self.debug_sample_rate:
+                    return False
+            else:
+                if state.debug_sampled is None:
+                    state.debug_sampled = random.random() < self.debug_sample_rate
+                if not state.debug_sampled:
+                    return False
+        if state is not None:
+            record.request_id = state.request_id
+            record.user_id = state.user_id
+            record.elapsed_ms = round(state.elapsed_ms(), 1)
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Queues records for the listener thread without ever blocking the caller
+
+    prepare() only merges the message arguments and renders the traceback
+    (both must happen before the record crosses threads); JSON formatting
+    and the write itself happen on the listener thread. When the queue is
+    full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler: Optional[DroppingQueueHandler] = None
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(level: str = 'INFO', json_format: bool = True,
+                  queue_size: int = 10000, debug_sample_rate: float = 1.0):
+    """
+    Route all logging through a bounded in-memory queue drained by one
+    background thread writing to stdout. Uvicorn's loggers are routed
+    through it too. Safe to call more than once.
+    """
+    global _handler, _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if json_format else TextFormatter())
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    _handler = DroppingQueueHandler(log_queue)
+    _handler.addFilter(RequestContextFilter(debug_sample_rate))
+    _listener = QueueListener(log_queue, output, respect_handler_level=False)
+    _listener.start()
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(_handler)
+    root.setLevel(level.upper())
+
+    for name in ('uvicorn', 'uvicorn.error'):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+    # Replaced by the request log line from RequestContextMiddleware
+    logging.getLogger('uvicorn.access').disabled = True
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    logging.getLogger().removeHandler(_handler)
+    _listener = None
+
+
+def logging_stats() -> dict:
+    if _handler is None:
+        return {}
+    return {'queued': _handler.queue.qsize(), 'dropped': _handler.dropped}
@@ -0,0 +1,100 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+import time
+
+PERIOD_SECONDS = {'second': 1.0, 'minute': 60.0, 'hour': 3600.0, 'day': 86400.0}
+
+
+def parse_rate(spec: str) -> Tuple[float, float]:
+    """'10/minute' -> (capacity 10, refill 10/60 tokens per second)"""
+    count, _, period = spec.partition('/')
+    count = float(count)
+    period = period.strip().rstrip('s') or 'second'
+    if period not in PERIOD_SECONDS or count <= 0:
+        raise ValueError(f"Invalid rate limit '{spec}' (expected e.g. '10/minute')")
+    return count, count / PERIOD_SECONDS[period]
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets per key, refilled lazily on access
+
+    A decision is one dict lookup and a little arithmetic. Buckets are kept
+    in LRU order and the least recently used ones are dropped beyond
+    max_keys; a dropped bucket comes back full, which only errs towards
+    allowing a request.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: 'OrderedDict[Hashable, List[float]]' = OrderedDict()  # key -> [tokens, last refill]
+        self.stats = {'allowed': 0, 'limited': 0}
+
+    def allow(self, key: Hashable, capacity: float, refill_per_second: float) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, seconds until a token is available)"""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [capacity, now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * refill_per_second)
+            bucket[1] = now
+
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            self.stats['allowed'] += 1
+            return True, 0.0
+        self.stats['limited'] += 1
+        return False, (1.0 - bucket[0]) / refill_per_second
+
+
+class RouteLimits:
+    """Per-route rate specs from settings; the longest matching path prefix wins"""
+
+    def __init__(self, limits: Dict[str, str], default: str):
+        self.default = ('*',) + parse_rate(default)
+        self._routes = sorted(
+            ((prefix,) + parse_rate(spec) for prefix, spec in limits.items()),
+            key=lambda route: len(route[0]), reverse=True,
+        )
+
+    def match(self, path: str) -> Tuple[str, float, float]:
+        """(limit name, capacity, refill per second) for a path"""
+        for route in self._routes:
+            if path.startswith(route[0]):
+                return route
+        return self.default
+
+
+class ConcurrencyLimiter:
+    """Global cap on in-flight requests; excess requests are rejected, not queued"""
+
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.stats = {'shed': 0, 'peak': 0}
+
+    def try_acquire(self) -> bool:
+        if self.in_flight >= self.max_in_flight:
+            self.stats['shed'] += 1
+            return False
+        self.in_flight += 1
+        if self.in_flight > self.stats['peak']:
+            self.stats['peak'] = self.in_flight
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+
+
+def client_ip(scope: dict, trust_forwarded: bool = False) -> Optional[str]:
+    """Client address; the first X-Forwarded-For hop only behind a trusted proxy"""
+    if trust_forwarded:
+        for name, value in scope.get('headers', ()):
+            if name == b'x-forwarded-for':
+                return value.decode('latin-1').split(',')[0].strip()
+    client = scope.get('client')
+    return client[0] if client else None
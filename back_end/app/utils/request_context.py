@@ -0,0 +1,63 @@
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+import time
+import uuid
+
+
+class RequestState:
+    """
+    Per-request flags set deep in the data layer and read by middleware
+
+    One mutable object per request, so tasks started during the request
+    (which copy the context) still update the same state.
+    """
+
+    def __init__(self, deadline_seconds: Optional[float] = None, request_id: Optional[str] = None):
+        self.request_id = request_id or uuid.uuid4().hex
+        self.user_id: Optional[str] = None  # set once the caller is authenticated
+        self.debug_sampled: Optional[bool] = None  # decided on the request's first DEBUG record
+        self.stale = False  # a response value came from the stale-data fallback
+        self.started = time.monotonic()
+        self.deadline = self.started + deadline_seconds if deadline_seconds else None
+        self.timings: List[Tuple[str, float]] = []  # (operation, milliseconds) per backend call
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline (None if the request has none)"""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def elapsed_ms(self) -> float:
+        return (time.monotonic() - self.started) * 1000
+
+
+_request_state: ContextVar[Optional[RequestState]] = ContextVar('request_state', default=None)
+
+
+def begin_request(deadline_seconds: Optional[float] = None, request_id: Optional[str] = None) -> RequestState:
+    state = RequestState(deadline_seconds, request_id)
+    _request_state.set(state)
+    return state
+
+
+def current_request_state() -> Optional[RequestState]:
+    return _request_state.get()
+
+
+def clear_request_state():
+    """Detach the current context from any request (for work shared by several requests)"""
+    _request_state.set(None)
+
+
+def mark_stale():
+    """Flag the current response as (partly) served from stale data"""
+    state = _request_state.get()
+    if state is not None:
+        state.stale = True
+
+
+def set_request_user(user_id: Optional[str]):
+    """Attach the authenticated user to the current request (for logs)"""
+    state = _request_state.get()
+    if state is not None:
+        state.user_id = user_id
@@ -0,0 +1,21 @@
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from typing import Any, Optional
+
+
+def model_response(content: BaseModel, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    """
+    Serialize a response model straight to JSON bytes
+
+    Returning a Response skips FastAPI's response_model re-validation and
+    jsonable_encoder pass; pydantic-core writes the JSON directly. Keep
+    response_model on the route so the OpenAPI schema is unchanged.
+    """
+    return Response(content=content.model_dump_json(), status_code=status_code,
+                    headers=headers, media_type="application/json")
+
+
+def list_response(adapter: TypeAdapter, items: Any, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    """model_response for top-level lists, e.g. TypeAdapter(List[Alert])"""
+    return Response(content=adapter.dump_json(items), status_code=status_code,
+                    headers=headers, media_type="application/json")
@@ -1,42 +1,66 @@
 from datetime import datetime, timedelta
-from jose import jwt, JWTError
-from passlib.context import CryptContext
+from functools import lru_cache
 from app.config import get_settings
 from typing import Optional
+import uuid
 
 settings = get_settings()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+@lru_cache()
+def get_pwd_context():
+    """bcrypt context, built on first use (passlib is slow to import)"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
 
 class SecurityUtils:
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-        """Create JWT access token"""
-        to_encode = data.copy()
-        
-        if expires_delta:
-            expire = datetime.utcnow() + expires_delta
-        else:
-            expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        
-        to_encode.update({"exp": expire, "iat": datetime.utcnow()})
-        encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-        return encoded_jwt
+        """Create JWT access token (with a unique jti so it can be revoked)"""
+        if expires_delta is None:
+            expires_delta = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        return SecurityUtils._encode({**data, 'type': 'access'}, expires_delta)
+    
+    @staticmethod
+    def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+        """Create JWT refresh token, only accepted by /auth/refresh"""
+        if expires_delta is None:
+            expires_delta = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        return SecurityUtils._encode({**data, 'type': 'refresh'}, expires_delta)
     
     @staticmethod
-    def verify_token(token: str) -> Optional[dict]:
-        """Verify and decode JWT token"""
+    def _encode(data: dict, expires_delta: timedelta) -> str:
+        from jose import jwt
+        now = datetime.utcnow()
+        to_encode = {**data, "exp": now + expires_delta, "iat": now, "jti": uuid.uuid4().hex}
+        return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    
+    @staticmethod
+    def verify_token(token: str, token_type: str = 'access') -> Optional[dict]:
+        """Verify and decode JWT token; None if invalid, expired or of another type"""
+        from jose import jwt, JWTError
         try:
             payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-            return payload
         except JWTError:
             return None
+        # Tokens issued before refresh tokens existed have no type and are access tokens
+        if payload.get('type', 'access') != token_type:
+            return None
+        return payload
     
     @staticmethod
     def hash_password(password: str) -> str:
         """Hash a password using bcrypt"""
-        return pwd_context.hash(password)
+        return get_pwd_context().hash(password)
     
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verify a password against a hash"""
-        return pwd_context.verify(plain_password, hashed_password)
+        return get_pwd_context().verify(plain_password, hashed_password)
+    
+    @staticmethod
+    def warm_up():
+        """Load the bcrypt backend and run one JWT round trip so the first login doesn't pay for it"""
+        get_pwd_context().handler("bcrypt").get_backend()
+        SecurityUtils.verify_token(SecurityUtils.create_access_token({'sub': 'warmup'}))
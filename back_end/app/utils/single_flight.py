@@ -0,0 +1,89 @@
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import asyncio
+import contextvars
+import time
+
+from app.utils.deadlines import DeadlineExceededError, record_timing
+from app.utils.request_context import clear_request_state, current_request_state
+
+
+def freeze_args(value: Any) -> Hashable:
+    """Hashable form of call arguments (lists/dicts become tuples)"""
+    if isinstance(value, (list, tuple, set)):
+        return tuple(freeze_args(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze_args(item)) for key, item in value.items()))
+    return value
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent async calls into one
+
+    The first caller for a key starts the call as a task; callers arriving
+    while it is in flight await the same task and get the same result (or
+    exception). The result object is shared, so callers must not mutate it.
+    A caller being cancelled (e.g. client disconnect) doesn't cancel the
+    shared task for the others.
+
+    The task runs outside any request, so the first caller's deadline
+    doesn't cut it short for the others and its timings aren't charged to
+    that caller. Each caller waits at most its own remaining deadline
+    (504 after that) and records the wait in its own timings.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {'calls': 0, 'executed': 0, 'coalesced': 0}
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable], operation: str = 'single_flight') -> Any:
+        self.stats['calls'] += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.stats['executed'] += 1
+            context = contextvars.copy_context()
+            context.run(clear_request_state)
+            task = asyncio.get_running_loop().create_task(func(), context=context)
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.stats['coalesced'] += 1
+
+        state = current_request_state()
+        remaining = state.remaining() if state is not None else None
+        start = time.monotonic()
+        try:
+            if remaining is None:
+                return await asyncio.shield(task)
+            return await asyncio.wait_for(asyncio.shield(task), max(remaining, 0))
+        except asyncio.TimeoutError:
+            if task.done():
+                raise
+            raise DeadlineExceededError(state, operation)
+        finally:
+            record_timing(operation, (time.monotonic() - start) * 1000)
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Process-wide single-flight group"""
+    return _single_flight
+
+
+def single_flight(method: Callable) -> Callable:
+    """
+    Decorator for read-only async methods: concurrent calls with the same
+    arguments share one execution. The key is (method name, arguments);
+    self is not part of it, so separate service instances coalesce too.
+    """
+    @wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        key = (method.__qualname__, freeze_args(args), freeze_args(kwargs))
+        return await _single_flight.do(key, lambda: method(self, *args, **kwargs), method.__name__)
+    return wrapper
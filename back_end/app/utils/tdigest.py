@@ -0,0 +1,167 @@
+from typing import Iterable, List, Optional
+import math
+import numpy as np
+
+
+class TDigest:
+    """
+    Mergeable t-digest for approximate quantiles
+
+    Keeps at most ~compression centroids regardless of how many values were
+    added, so a day of per-second readings becomes a few hundred numbers.
+    Digests merge exactly like they are built, which is what lets a
+    percentile over 90 days read 90 small digests instead of raw readings.
+    """
+
+    def __init__(self, compression: int = 100):
+        self.compression = compression
+        self.means: List[float] = []
+        self.weights: List[float] = []
+        self.count = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._unmerged: List[float] = []
+
+    def add(self, value: float):
+        self._unmerged.append(float(value))
+        if len(self._unmerged) >= self.compression * 10:
+            self._compress()
+
+    def update(self, values: Iterable[float]):
+        for value in values:
+            if value is not None:
+                self.add(value)
+
+    def merge(self, other: 'TDigest') -> 'TDigest':
+        """Fold another digest into this one (in place)"""
+        other._compress()
+        self._compress()
+        self._compress(list(zip(other.means, other.weights)))
+        return self
+
+    @classmethod
+    def from_values(cls, values: np.ndarray, compression: int = 100) -> 'TDigest':
+        """
+        Build a digest from an array in one vectorized pass
+
+        With unit weights and sorted input, each value's centroid is fixed by
+        the scale function of its rank, so grouping is a single bincount.
+        """
+        digest = cls(compression=compression)
+        values = np.sort(values[~np.isnan(values)])
+        n = len(values)
+        if n == 0:
+            return digest
+
+        q = (np.arange(n) + 0.5) / n
+        k = compression / (2 * math.pi) * np.arcsin(2 * q - 1)
+        cluster = np.floor(k - k[0]).astype(np.int64)
+        counts = np.bincount(cluster)
+        sums = np.bincount(cluster, weights=values)
+        keep = counts > 0
+
+        digest.means = (sums[keep] / counts[keep]).tolist()
+        digest.weights = counts[keep].astype(float).tolist()
+        digest.count = float(n)
+        digest.min = float(values[0])
+        digest.max = float(values[-1])
+        return digest
+
+    @classmethod
+    def merge_all(cls, digests: Iterable['TDigest'], compression: int = 100) -> 'TDigest':
+        """Merge many digests with a single compression pass"""
+        merged = cls(compression=compression)
+        centroids = []
+        for digest in digests:
+            digest._compress()
+            centroids.extend(zip(digest.means, digest.weights))
+            if digest.min is not None:
+                merged.min = digest.min if merged.min is None else min(merged.min, digest.min)
+                merged.max = digest.max if merged.max is None else max(merged.max, digest.max)
+        merged._compress(centroids)
+        return merged
+
+    def _k(self, q: float) -> float:
+        # k1 scale function: small centroids near the tails, large in the middle
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _compress(self, extra: Optional[list] = None):
+        points = list(zip(self.means, self.weights))
+        points.extend((value, 1.0) for value in self._unmerged)
+        if extra:
+            points.extend(extra)
+        self._unmerged = []
+        if not points:
+            return
+        points.sort(key=lambda point: point[0])
+
+        total = sum(weight for _, weight in points)
+        means, weights = [], []
+        cur_mean, cur_weight = points[0]
+        done = 0.0
+        k_low = self._k(0.0)
+        for mean, weight in points[1:]:
+            q = (done + cur_weight + weight) / total
+            if self._k(q) - k_low <= 1.0:
+                cur_weight += weight
+                cur_mean += (mean - cur_mean) * weight / cur_weight
+            else:
+                means.append(cur_mean)
+                weights.append(cur_weight)
+                done += cur_weight
+                k_low = self._k(done / total)
+                cur_mean, cur_weight = mean, weight
+        means.append(cur_mean)
+        weights.append(cur_weight)
+
+        self.means, self.weights, self.count = means, weights, total
+        self.min = points[0][0] if self.min is None else min(self.min, points[0][0])
+        self.max = points[-1][0] if self.max is None else max(self.max, points[-1][0])
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate value at quantile q (0-1), None if empty"""
+        self._compress()
+        if not self.means:
+            return None
+        if len(self.means) == 1 or q <= 0:
+            return self.min if q <= 0 else self.means[0]
+        if q >= 1:
+            return self.max
+
+        # Interpolate between centroid centres, treating min/max as the ends
+        target = q * self.count
+        cumulative = 0.0
+        prev_pos, prev_mean = 0.0, self.min
+        for mean, weight in zip(self.means, self.weights):
+            pos = cumulative + weight / 2
+            if target < pos:
+                span = pos - prev_pos
+                frac = (target - prev_pos) / span if span > 0 else 0.0
+                return prev_mean + (mean - prev_mean) * frac
+            prev_pos, prev_mean = pos, mean
+            cumulative += weight
+        span = self.count - prev_pos
+        frac = (target - prev_pos) / span if span > 0 else 1.0
+        return prev_mean + (self.max - prev_mean) * frac
+
+    def to_dict(self) -> dict:
+        """Compact, Firestore-friendly representation"""
+        self._compress()
+        return {
+            'compression': self.compression,
+            'count': self.count,
+            'min': self.min,
+            'max': self.max,
+            'means': [round(mean, 3) for mean in self.means],
+            'weights': self.weights,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'TDigest':
+        digest = cls(compression=data.get('compression', 100))
+        digest.means = list(data.get('means', []))
+        digest.weights = [float(weight) for weight in data.get('weights', [])]
+        digest.count = float(data.get('count', sum(digest.weights)))
+        digest.min = data.get('min')
+        digest.max = data.get('max')
+        return digest
@@ -8,6 +8,11 @@ class Validators:
         pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
         return re.match(pattern, email) is not None
     
+    @staticmethod
+    def normalize_email(email: str) -> str:
+        """Canonical form used for lookups and uniqueness (case-insensitive)"""
+        return email.strip().lower()
+    
     @staticmethod
     def validate_password(password: str) -> tuple[bool, Optional[str]]:
         """
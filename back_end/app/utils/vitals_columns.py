@@ -0,0 +1,113 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import numpy as np
+
+# Numeric VitalReading fields, stored as float64 columns with NaN for missing values
+NUMERIC_FIELDS = (
+    'heart_rate', 'spo2', 'temperature',
+    'accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z', 'battery',
+)
+
+# Numeric fields that VitalReading declares as int
+INTEGER_FIELDS = ('heart_rate', 'spo2', 'battery')
+
+# Non-numeric fields, carried as object arrays
+STRING_FIELDS = ('activity_state',)
+
+# Timestamps above this are milliseconds (the app has used both units)
+MILLISECONDS_THRESHOLD = 10 ** 11
+
+# UTC offsets run from -12:00 to +14:00, in steps of at least 15 minutes
+MAX_UTC_OFFSET_MINUTES = 14 * 60
+UTC_OFFSET_STEP_SECONDS = 15 * 60
+
+
+def readings_to_columns(readings: List[dict]) -> Dict[str, np.ndarray]:
+    """
+    Convert row-oriented readings into parallel column arrays
+
+    'timestamp' is int64; every other numeric field is float64 with NaN
+    where the reading had no value, so vectorized code never sees None.
+    """
+    columns = {'timestamp': np.fromiter((r['timestamp'] for r in readings), dtype=np.int64, count=len(readings))}
+    for field in NUMERIC_FIELDS:
+        columns[field] = np.fromiter(
+            (np.nan if r.get(field) is None else r[field] for r in readings),
+            dtype=np.float64,
+            count=len(readings),
+        )
+    for field in STRING_FIELDS:
+        columns[field] = np.array([r.get(field) for r in readings], dtype=object)
+    return columns
+
+
+def take(columns: Dict[str, np.ndarray], index: np.ndarray) -> Dict[str, np.ndarray]:
+    """Apply the same row selection/order (index array or boolean mask) to every column"""
+    return {field: values[index] for field, values in columns.items()}
+
+
+def columns_to_readings(columns: Dict[str, np.ndarray]) -> List[dict]:
+    """Convert column arrays back to VitalReading-shaped dicts (NaN -> None)"""
+    fields = ['timestamp']
+    values = [columns['timestamp'].tolist()]
+    for field in NUMERIC_FIELDS:
+        if field not in columns:
+            continue
+        column = columns[field]
+        missing = np.isnan(column)
+        if field in INTEGER_FIELDS:
+            as_list = np.where(missing, 0, np.rint(column)).astype(np.int64).tolist()
+        else:
+            as_list = column.tolist()
+        if missing.any():
+            for i in np.flatnonzero(missing).tolist():
+                as_list[i] = None
+        fields.append(field)
+        values.append(as_list)
+    for field in STRING_FIELDS:
+        if field in columns:
+            fields.append(field)
+            values.append(columns[field].tolist())
+    return [dict(zip(fields, row)) for row in zip(*values)]
+
+
+def timestamps_in_seconds(timestamps: np.ndarray) -> np.ndarray:
+    """Timestamps as float seconds, whichever unit the app sent"""
+    if len(timestamps) and timestamps.max() > MILLISECONDS_THRESHOLD:
+        return timestamps / 1000.0
+    return timestamps.astype(np.float64)
+
+
+def day_start_seconds(date: str, seconds: np.ndarray, utc_offset_minutes: Optional[int] = None) -> float:
+    """
+    Epoch seconds of the local midnight that starts date (YYYY-MM-DD)
+
+    Readings are bucketed into hours from this point, so a day recorded
+    east or west of UTC still gets hours 0-23. Without the client's UTC
+    offset, the one closest to UTC that puts every reading (sorted
+    seconds) inside the local day is used. If none does, or date doesn't
+    parse, the day starts at the UTC midnight before the first reading.
+    """
+    try:
+        midnight = datetime.strptime(date, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        midnight = None
+    if midnight is not None and utc_offset_minutes is not None:
+        return midnight - utc_offset_minutes * 60
+    if midnight is None or len(seconds) == 0:
+        return float(np.floor(seconds[0] / 86400) * 86400) if len(seconds) else 0.0
+
+    # The local day [midnight - offset, midnight - offset + 1 day) must hold every reading
+    limit = MAX_UTC_OFFSET_MINUTES * 60
+    low = max(midnight - float(seconds[0]), -limit)
+    high = min(midnight + 86400 - float(seconds[-1]), limit + 1)
+    step = UTC_OFFSET_STEP_SECONDS
+    if low <= 0 < high:
+        offset = 0.0
+    elif low > 0:
+        offset = np.ceil(low / step) * step
+    else:
+        offset = (np.ceil(high / step) - 1) * step
+    if not low <= offset < high:
+        return float(np.floor(seconds[0] / 86400) * 86400)
+    return midnight - offset
@@ -0,0 +1,55 @@
+"""
+Vitals compaction: downsampling cost and stored size for one day of 1 Hz readings
+Run this from the back_end directory: python -m benchmarks.bench_compaction
+"""
+from app.jobs.compact_vitals import compacted_fields
+import json
+import random
+import time
+
+DAY_START = 1_699_920_000  # 2023-11-14 00:00 UTC
+
+
+def day_of_readings(seconds: int = 86400):
+    random.seed(7)
+    return [
+        {
+            'timestamp': DAY_START + i,
+            'heart_rate': random.randint(55, 120),
+            'spo2': random.randint(94, 100),
+            'temperature': round(random.uniform(36.1, 37.2), 2),
+            'accel_x': random.uniform(-1, 1), 'accel_y': random.uniform(-1, 1), 'accel_z': random.uniform(9, 10),
+            'battery': 80,
+            'activity_state': random.choice(('rest', 'walk', 'sleep')),
+        }
+        for i in range(seconds)
+    ]
+
+
+def main():
+    raw = {'date': '2023-11-14', 'readings': day_of_readings()}
+    raw_bytes = len(json.dumps(raw['readings']))
+    print(f"\none day, {len(raw['readings'])} raw readings, {raw_bytes / 1e6:.1f} MB as JSON\n")
+
+    start = time.perf_counter()
+    minute = compacted_fields(raw, 'minute')
+    minute_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    hour = compacted_fields({**raw, **minute}, 'hour')
+    hour_ms = (time.perf_counter() - start) * 1000
+    direct = compacted_fields(raw, 'hour')
+
+    for label, fields, elapsed in (('raw -> minute', minute, minute_ms), ('minute -> hour', hour, hour_ms)):
+        size = len(json.dumps(fields['readings']))
+        print(f"  {label:15s} {len(fields['readings']):5d} readings, {size / 1e3:7.1f} kB "
+              f"({raw_bytes / size:6.0f}x smaller), {elapsed:6.1f} ms")
+
+    # Weighting by samples makes the two-step path match compacting raw data directly
+    for a, b in zip(hour['readings'], direct['readings']):
+        assert a['samples'] == b['samples'] and abs(a['temperature'] - b['temperature']) < 0.002
+    assert compacted_fields({**raw, **hour}, 'minute') is None
+    print("\n  minute -> hour matches raw -> hour; already compacted days are skipped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Account export: peak memory and throughput as the account grows
+Run this from the back_end directory: python -m benchmarks.bench_export
+"""
+from app.services.export_service import ExportService, pyarrow
+import asyncio
+import random
+import time
+import tracemalloc
+
+READINGS_PER_DAY = 86400
+
+
+def day(index: int, with_readings: bool = True) -> dict:
+    random.seed(index)
+    start = 1_700_000_000 + index * 86400
+    doc = {'id': f'day{index:05d}', 'date': f'day{index:05d}', 'summary': {'avg_heart_rate': 72.0, 'steps': 8000}}
+    if with_readings:
+        doc['readings'] = [
+            {'timestamp': start + i, 'heart_rate': random.randint(55, 120), 'spo2': 97,
+             'temperature': 36.6, 'accel_x': 0.1, 'accel_y': 0.2, 'accel_z': 9.8, 'activity_state': 'rest'}
+            for i in range(READINGS_PER_DAY)
+        ]
+    return doc
+
+
+class FakeFirebaseService:
+    """Serves `days` raw days of vitals, building each page only when it is read"""
+
+    def __init__(self, days: int):
+        self.days = days
+
+    async def iter_user_collection(self, user_id, collection, page_size, field_paths=None):
+        if collection != 'daily_vitals':
+            return
+        with_readings = field_paths is None or 'readings' in field_paths
+        for start in range(0, self.days, page_size):
+            yield [day(index, with_readings) for index in range(start, min(start + page_size, self.days))]
+
+
+async def export(days: int, export_format: str):
+    service = ExportService(FakeFirebaseService(days))
+    size = 0
+    async for chunk in service.stream_archive('bench', {'id': 'bench'}, None, export_format):
+        size += len(chunk)
+    return size
+
+
+def main():
+    formats = ['csv'] + (['parquet'] if pyarrow is not None else [])
+    print(f"\nraw days of {READINGS_PER_DAY} readings, streamed to a byte counter\n")
+    for export_format in formats:
+        for days in (2, 8):
+            tracemalloc.start()
+            start = time.perf_counter()
+            size = asyncio.run(export(days, export_format))
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  {export_format:8s} {days:2d} days: {size / 1e6:6.1f} MB zip, peak memory {peak / 1e6:5.1f} MB, "
+                  f"{days * READINGS_PER_DAY / elapsed / 1e3:5.0f}k readings/s")
+    if pyarrow is None:
+        print("\n  (pip install pyarrow to include Parquet)")
+
+
+if __name__ == '__main__':
+    main()
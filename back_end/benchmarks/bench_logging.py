@@ -0,0 +1,77 @@
+"""
+Logging cost on the request path: queued JSON logging vs a synchronous stdout handler
+Run this from the back_end directory: python -m benchmarks.bench_logging
+
+Log lines go to a sink whose writes block for SINK_WRITE_SECONDS, like
+stdout piped to a busy log collector.
+"""
+from app.utils.log import setup_logging, stop_logging, logging_stats
+from app.utils.request_context import begin_request
+import logging
+import sys
+import time
+
+RECORDS = 5000
+SINK_WRITE_SECONDS = 0.0001
+
+
+class SlowSink:
+    """File-like object whose writes block (and release the GIL) like a backed-up pipe"""
+
+    def write(self, text: str):
+        time.sleep(SINK_WRITE_SECONDS)
+
+    def flush(self):
+        pass
+
+
+def time_records(logger: logging.Logger, level: int = logging.INFO) -> float:
+    """Microseconds per log call as seen by the caller"""
+    start = time.perf_counter()
+    for i in range(RECORDS):
+        logger.log(level, "GET /api/v1/vitals/today %d", 200, extra={'duration_ms': 12.5, 'n': i})
+    return (time.perf_counter() - start) / RECORDS * 1e6
+
+
+def report(label: str, micros: float):
+    print(f"  {label:42s} {micros:7.2f} µs/record")
+
+
+def main():
+    print(f"\n{RECORDS} records per case, sink write {SINK_WRITE_SECONDS * 1e6:.0f} µs\n")
+    begin_request(10)
+
+    # Baseline: formatting and writing in the caller, like print()
+    sync_logger = logging.getLogger('bench.sync')
+    sync_logger.propagate = False
+    handler = logging.StreamHandler(SlowSink())
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s %(message)s'))
+    sync_logger.addHandler(handler)
+    sync_logger.setLevel(logging.INFO)
+    report("synchronous StreamHandler (text)", time_records(sync_logger))
+
+    stdout, sys.stdout = sys.stdout, SlowSink()
+    setup_logging('DEBUG', json_format=True, queue_size=RECORDS * 2, debug_sample_rate=0.01)
+    sys.stdout = stdout
+    queued = logging.getLogger('bench.queued')
+    report("queued JSON (caller side)", time_records(queued))
+
+    # 1000 requests with 5 hot-path DEBUG records each; unsampled requests drop them before queueing
+    start = time.perf_counter()
+    sampled = 0
+    for _ in range(1000):
+        state = begin_request(10)
+        for _ in range(5):
+            queued.debug("Firestore %s took %.1f ms", 'get_vitals_range', 12.5)
+        sampled += state.debug_sampled
+    report("DEBUG with 1% request sampling", (time.perf_counter() - start) / 5000 * 1e6)
+    print(f"  {sampled} of 1000 requests kept their DEBUG records")
+
+    start = time.perf_counter()
+    stop_logging()
+    print(f"  listener drained the backlog in {(time.perf_counter() - start) * 1000:.0f} ms, "
+          f"stats {logging_stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Response serialization and compression: FastAPI default path vs model_response
+Run this from the back_end directory: python -m benchmarks.bench_responses
+"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.middleware.compression import CompressionMiddleware, brotli
+from app.models.vitals import DailyVitals
+from app.schemas.vitals import GetVitalsResponse
+from app.utils.responses import model_response
+import random
+import time
+
+
+def make_response(days: int = 7, readings_per_day: int = 1440) -> GetVitalsResponse:
+    """A week of minute-resolution history, like /vitals/historical?days=7"""
+    rng = random.Random(0)
+    data = []
+    for day in range(days):
+        start = 1763337600 + day * 86400
+        readings = [
+            {'timestamp': start + i * 60, 'heart_rate': rng.randint(55, 120), 'spo2': rng.randint(94, 100),
+             'temperature': round(rng.uniform(36.2, 37.0), 2), 'activity_state': 'rest'}
+            for i in range(readings_per_day)
+        ]
+        data.append(DailyVitals(user_id='bench', date=f'2025-11-{17 + day:02d}', readings=readings,
+                                summary={'avg_heart_rate': 72.0, 'steps': 8000}))
+    return GetVitalsResponse(data=data, days=days, start_date='2025-11-17', end_date='2025-11-23')
+
+
+def main():
+    payload = make_response()
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/default", response_model=GetVitalsResponse)
+    def default_path():
+        return payload
+
+    @app.get("/fast", response_model=GetVitalsResponse)
+    def fast_path():
+        return model_response(payload)
+
+    client = TestClient(app)
+    readings = sum(len(day.readings) for day in payload.data)
+    print(f"\nGetVitalsResponse with {readings} readings\n")
+
+    for path in ('/default', '/fast'):
+        client.get(path)
+        runs = 10
+        started = time.process_time()
+        for _ in range(runs):
+            client.get(path, headers={'Accept-Encoding': 'identity'})
+        cpu_ms = (time.process_time() - started) / runs * 1000
+        print(f"{path:<10} {cpu_ms:8.1f} ms CPU per response (uncompressed)")
+
+    print()
+    encodings = ['identity', 'gzip'] + (['br'] if brotli is not None else [])
+    for encoding in encodings:
+        response = client.get('/fast', headers={'Accept-Encoding': encoding})
+        size = int(response.headers.get('content-length') or len(response.content))
+        started = time.process_time()
+        for _ in range(5):
+            client.get('/fast', headers={'Accept-Encoding': encoding})
+        cpu_ms = (time.process_time() - started) / 5 * 1000
+        print(f"{encoding:<10} {size / 1e3:8.1f} KB   {cpu_ms:8.1f} ms CPU per response")
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Token revocation check: cost per request and how often Firestore has to be asked
+Run this from the back_end directory: python -m benchmarks.bench_revocation
+"""
+from app.services.token_revocation import RevocationList
+import time
+import uuid
+
+CAPACITY = 100000
+REVOKED = 100000
+MAX_ENTRIES = 50000
+CHECKS = 100000
+
+
+def per_check_us(revocations: RevocationList, payload_ids) -> float:
+    start = time.perf_counter()
+    for ids in payload_ids:
+        revocations.check(ids)
+    return (time.perf_counter() - start) / len(payload_ids) * 1e6
+
+
+def main():
+    expires = time.time() + 3600
+    revocations = RevocationList(capacity=CAPACITY, fp_rate=0.001, max_entries=MAX_ENTRIES)
+    revoked = [uuid.uuid4().hex for _ in range(REVOKED)]
+    revocations.load((token_id, expires) for token_id in revoked)
+
+    # A request's token: its jti and session ID
+    valid = [(uuid.uuid4().hex, uuid.uuid4().hex) for _ in range(CHECKS)]
+    print(f"\n{REVOKED} revoked IDs, denylist capped at {MAX_ENTRIES}\n")
+    print(f"  valid token          {per_check_us(revocations, valid):5.2f} µs/check")
+
+    before = revocations.stats['lookups']
+    for ids in valid:
+        revocations.check(ids)
+    lookups = revocations.stats['lookups'] - before
+    print(f"  Firestore lookups for valid tokens: {lookups} of {CHECKS} "
+          f"({lookups / CHECKS:.3%}, bloom false positives)")
+
+    recent = [(token_id, 'x') for token_id in revoked[-MAX_ENTRIES:]]
+    print(f"  revoked, in denylist {per_check_us(revocations, recent):5.2f} µs/check")
+    assert all(revocations.check(ids)[0] for ids in recent)
+
+    # Evicted from the denylist: never reported as valid, always looked up
+    evicted = [(token_id, 'x') for token_id in revoked[:MAX_ENTRIES]]
+    assert all(revocations.check(ids) == (False, ids[0]) for ids in evicted)
+    print(f"  revoked, evicted     {per_check_us(revocations, evicted):5.2f} µs/check (then a Firestore read)")
+
+    print(f"  denylist memory: {len(revocations._bloom._bits) / 1024:.0f} KiB bloom filter "
+          f"+ {MAX_ENTRIES} exact entries")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Single-flight reads: N concurrent identical FirebaseService reads -> one Firestore query
+Run this from the back_end directory: python -m benchmarks.bench_single_flight
+(the behaviour itself is covered by tests/test_single_flight.py)
+"""
+from app.services.firebase_service import FirebaseService
+from app.utils.single_flight import get_single_flight
+import asyncio
+import time
+
+QUERY_LATENCY = 0.05  # seconds, roughly one Firestore round trip
+
+
+class FakeSnapshot:
+    def __init__(self, date: str):
+        self._data = {'date': date, 'readings': [], 'summary': {}}
+
+    def to_dict(self) -> dict:
+        return dict(self._data)
+
+
+class FakeQuery:
+    """Stands in for any Firestore collection/query chain; counts stream() calls"""
+
+    def __init__(self, counter: list):
+        self.counter = counter
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def stream(self, timeout=None):
+        self.counter[0] += 1
+        time.sleep(QUERY_LATENCY)
+        return [FakeSnapshot(f'2025-11-{17 + day:02d}') for day in range(7)]
+
+
+async def concurrent_reads(service: FirebaseService, callers: int):
+    return await asyncio.gather(*[
+        service.get_vitals_range('bench_user', '2025-11-17', '2025-11-23') for _ in range(callers)
+    ])
+
+
+def main():
+    counter = [0]
+    service = FirebaseService()
+    service.demo_mode = False
+    service.db = FakeQuery(counter)
+    flights = get_single_flight()
+
+    print(f"\nget_vitals_range, simulated {QUERY_LATENCY * 1000:.0f} ms query\n")
+    for callers in (1, 10, 100):
+        counter[0] = 0
+        before = dict(flights.stats)
+        start = time.perf_counter()
+        results = asyncio.run(concurrent_reads(service, callers))
+        elapsed = (time.perf_counter() - start) * 1000
+        coalesced = flights.stats['coalesced'] - before['coalesced']
+        shared = all(result is results[0] for result in results)
+        print(f"  {callers:4d} callers: {counter[0]} query, {coalesced:3d} coalesced, {elapsed:6.1f} ms"
+              f"{'' if shared else ' (results not shared)'}")
+
+    # Sequential calls are not coalesced: each one sees fresh data
+    counter[0] = 0
+    for _ in range(3):
+        asyncio.run(concurrent_reads(service, 1))
+    print(f"     3 sequential calls: {counter[0]} queries")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Worker startup: import time of app.main and time to the first served request
+(including the lifespan: Firebase init and warm-up). Each run is a fresh process.
+Run this from the back_end directory: python -m benchmarks.bench_startup
+"""
+import json
+import statistics
+import subprocess
+import sys
+
+RUNS = 5
+
+PROBE = r'''
+import json, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    started = time.perf_counter()
+    status = client.get("/health").status_code
+    first = time.perf_counter()
+    client.post("/api/v1/auth/login", json={"email": "bench@example.com", "password": "x"})
+    login = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": (started - imported) * 1000,
+    "first_request_ms": (first - start) * 1000,
+    "first_login_ms": (login - first) * 1000,
+    "status": status,
+}))
+'''
+
+
+def main():
+    results = []
+    for _ in range(RUNS):
+        out = subprocess.run([sys.executable, '-c', PROBE], capture_output=True, text=True, check=True)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"\nWorker startup, median of {RUNS} fresh processes\n")
+    for key, label in (('import_ms', 'import app.main'), ('startup_ms', 'lifespan (Firebase init + warm-up)'),
+                       ('first_request_ms', 'process start -> first response'),
+                       ('first_login_ms', 'first /auth/login after startup')):
+        print(f"  {label:<36} {statistics.median(r[key] for r in results):8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""
+Payload size and server decode cost: JSON vs columnar MessagePack for /vitals/sync
+Run this from the back_end directory: python -m benchmarks.bench_sync_formats
+"""
+from app.schemas.vitals import SyncVitalsRequest
+from app.utils.columnar_codec import encode_vitals_msgpack, decode_vitals_msgpack
+from app.utils.vitals_columns import readings_to_columns
+from benchmarks.bench_vitals_cleaning import make_day, timed
+import gzip
+import json
+
+
+def main():
+    readings = make_day()
+    count = len(readings)
+    summary = {'steps': 8000, 'calories': 2100, 'distance_km': 6.2, 'active_minutes': 45}
+
+    json_body = json.dumps({'date': '2025-11-17', 'readings': readings, 'summary': summary}).encode()
+    columns = readings_to_columns(readings)
+    msgpack_body = encode_vitals_msgpack('2025-11-17', columns, summary)
+
+    print(f"\n/vitals/sync payload for {count} readings\n")
+    for label, body in (('JSON', json_body), ('MessagePack (columnar)', msgpack_body)):
+        print(f"{label:<24} {len(body) / 1e6:7.2f} MB raw   {len(gzip.compress(body)) / 1e6:7.2f} MB gzip"
+              f"   {len(body) / count:6.1f} B/reading")
+
+    print("\nServer decode to column arrays (ms per sync, throughput)\n")
+
+    def decode_json():
+        request = SyncVitalsRequest.model_validate_json(json_body)
+        return readings_to_columns([reading.dict() for reading in request.readings])
+
+    timed("JSON + Pydantic", decode_json, count, repeat=3)
+    timed("MessagePack (columnar)", lambda: decode_vitals_msgpack(msgpack_body), count, repeat=10)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+from app.services.alert_broker import AlertBroker
+import asyncio
+
+
+def test_alert_published_during_replay_is_sent_once():
+    async def scenario():
+        broker = AlertBroker()
+        last_event_id = broker.publish('u1', {'id': 'a1'})
+        stream = broker.stream('u1', last_event_id=last_event_id, heartbeat_seconds=0.05)
+        assert (await anext(stream)).startswith('retry:')
+
+        # Subscribed but not replayed yet: the alert lands in the replay buffer and the live queue
+        broker.publish('u1', {'id': 'a2'})
+        frames = [await anext(stream), await anext(stream)]
+        await stream.aclose()
+        return frames
+
+    replayed, following = asyncio.run(scenario())
+    assert '"id":"a2"' in replayed
+    assert following == ": ping\n\n"
+
+
+def test_stream_ends_once_the_token_is_no_longer_valid():
+    async def scenario():
+        broker = AlertBroker()
+        checks = []
+
+        async def authorized():
+            checks.append(True)
+            return len(checks) < 2
+
+        return [frame async for frame in broker.stream('u1', heartbeat_seconds=0.01, authorized=authorized)]
+
+    frames = asyncio.run(scenario())
+    assert frames[1:] == [": ping\n\n"]
@@ -0,0 +1,130 @@
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+import asyncio
+import pytest
+import time
+
+
+async def ok():
+    return 'ok'
+
+
+async def down():
+    raise ConnectionError("backend down")
+
+
+async def not_found():
+    raise LookupError("no such document")
+
+
+def call(breaker, func):
+    return asyncio.run(breaker.call(func))
+
+
+def trip(breaker):
+    for _ in range(breaker.min_calls):
+        with pytest.raises(ConnectionError):
+            call(breaker, down)
+
+
+def test_opens_when_most_recent_calls_fail_and_rejects_without_calling():
+    breaker = CircuitBreaker('test', window_size=4, min_calls=4, failure_rate=0.5, open_seconds=60)
+    call(breaker, ok)
+    call(breaker, ok)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            call(breaker, down)
+    assert breaker.state == 'open'
+
+    with pytest.raises(CircuitOpenError):
+        call(breaker, ok)
+    assert breaker.stats['rejected'] == 1
+
+
+def test_caller_errors_do_not_count_against_the_backend():
+    breaker = CircuitBreaker('test', window_size=4, min_calls=4)
+    for _ in range(6):
+        with pytest.raises(LookupError):
+            call(breaker, not_found)
+    assert breaker.state == 'closed'
+
+
+def test_half_open_probes_close_the_circuit_when_they_succeed():
+    breaker = CircuitBreaker('test', window_size=4, min_calls=4, open_seconds=0.01, half_open_probes=2)
+    trip(breaker)
+    time.sleep(0.02)
+
+    assert call(breaker, ok) == 'ok'
+    assert breaker.state == 'half_open'
+    assert call(breaker, ok) == 'ok'
+    assert breaker.state == 'closed'
+
+
+def test_a_failed_half_open_probe_reopens_the_circuit():
+    breaker = CircuitBreaker('test', window_size=4, min_calls=4, open_seconds=0.01, half_open_probes=2)
+    trip(breaker)
+    time.sleep(0.02)
+
+    with pytest.raises(ConnectionError):
+        call(breaker, down)
+    assert breaker.state == 'open'
+    assert breaker.stats['opened'] == 2
+    with pytest.raises(CircuitOpenError):
+        call(breaker, ok)
+
+
+def test_vitals_reads_fall_back_to_summaries_without_readings(monkeypatch):
+    from app.services.firebase_service import FirebaseService
+    from app.utils import circuit_breaker
+
+    breaker = CircuitBreaker('test', min_calls=1000)
+    monkeypatch.setattr(circuit_breaker, '_firestore_breaker', breaker)
+
+    class FakeDoc:
+        exists = True
+
+        def to_dict(self):
+            return {'age': 40, 'summary': {'avg_heart_rate': 61}, 'readings': [1] * 1000, 'sketches': {'heart_rate': [1]}}
+
+    class FakeFirestore:
+        def __getattr__(self, name):
+            return lambda *args, **kwargs: self
+
+        def get(self, timeout=None, **kwargs):
+            return FakeDoc()
+
+    service = FirebaseService()
+    service._db, service._demo_mode = FakeFirestore(), False
+    profile = asyncio.run(service.get_user_profile('stale-user'))
+    asyncio.run(service.get_vitals_by_date('stale-user', '2024-03-01'))
+
+    breaker._open()
+    assert asyncio.run(service.get_user_profile('stale-user')) == profile
+    stale = asyncio.run(service.get_vitals_by_date('stale-user', '2024-03-01'))
+    assert stale['summary'] == {'avg_heart_rate': 61}
+    assert stale['readings'] == [] and 'sketches' not in stale
+    # Days never read while healthy have nothing to fall back to
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(service.get_vitals_by_date('stale-user', '2024-03-02'))
+
+
+def test_stale_responses_carry_no_etag():
+    from app.middleware.request_context import RequestContextMiddleware
+    from app.utils.request_context import mark_stale
+    from fastapi import FastAPI
+    from fastapi.responses import JSONResponse
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get('/day')
+    def day(stale: bool = False):
+        if stale:
+            mark_stale()
+        return JSONResponse({'readings': []}, headers={'ETag': 'W/"v1"'})
+
+    client = TestClient(app)
+    fresh = client.get('/day')
+    assert fresh.headers['etag'] == 'W/"v1"' and 'x-data-stale' not in fresh.headers
+    stale = client.get('/day', params={'stale': True})
+    assert 'etag' not in stale.headers and stale.headers['x-data-stale'] == 'true'
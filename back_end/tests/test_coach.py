@@ -0,0 +1,69 @@
+from app import dependencies
+from app.api.v1 import coach
+from app.dependencies import get_current_coach, get_current_user
+from app.main import app
+from fastapi.testclient import TestClient
+import json
+import pytest
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[get_current_user] = lambda: {'user_id': 'coach1'}
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        app.dependency_overrides.clear()
+
+
+def as_coach(patient_ids):
+    app.dependency_overrides[get_current_coach] = lambda: {
+        'user_id': 'coach1', 'role': 'coach', 'patient_ids': patient_ids,
+    }
+
+
+def lines(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_an_invalid_stored_summary_does_not_cut_the_stream(client, monkeypatch):
+    as_coach(['u1', 'u2', 'u3'])
+
+    async def stream_summaries(user_ids, date=None):
+        yield {'user_id': 'u1', 'summary_date': '2024-03-01', 'summary': {'avg_heart_rate': 'not a number'}}
+        yield {'user_id': 'u2', 'summary_date': '2024-03-01', 'unacknowledged_alerts': 2}
+        yield {'user_id': 'u3', 'error': 'Firestore unavailable'}
+
+    monkeypatch.setattr(coach.coach_service, 'stream_summaries', stream_summaries)
+    response = client.post('/api/v1/coach/summaries', json={'user_ids': ['u1', 'u2', 'u3', 'u4']})
+
+    assert response.status_code == 200
+    by_user = {line['user_id']: line for line in lines(response)}
+    assert set(by_user) == {'u1', 'u2', 'u3', 'u4'}
+    assert by_user['u1']['error'] == 'Stored data for this user is invalid'
+    assert by_user['u2']['unacknowledged_alerts'] == 2 and by_user['u2']['error'] is None
+    assert by_user['u3']['error'] == 'Firestore unavailable'
+    assert by_user['u4']['error'] == 'Not authorized for this user'
+
+
+@pytest.mark.parametrize('date', ['2024-13-01', '03/01/2024', '2024-03-01T00:00', ''])
+def test_invalid_dates_are_rejected(client, date):
+    as_coach(['u1'])
+    response = client.post('/api/v1/coach/summaries', json={'user_ids': ['u1'], 'date': date})
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize('role, status', [(None, 403), ('patient', 403), ('coach', 200), ('admin', 200)])
+def test_only_coaches_and_admins_get_summaries(client, monkeypatch, role, status):
+    async def get_user_by_id(user_id):
+        return {'id': user_id, 'role': role, 'patient_ids': []}
+
+    async def stream_summaries(user_ids, date=None):
+        for user_id in user_ids:
+            yield {'user_id': user_id}
+
+    monkeypatch.setattr(dependencies.auth_service.firebase_service, 'get_user_by_id', get_user_by_id)
+    monkeypatch.setattr(coach.coach_service, 'stream_summaries', stream_summaries)
+    response = client.post('/api/v1/coach/summaries', json={'user_ids': ['u1']})
+    assert response.status_code == status
@@ -0,0 +1,77 @@
+from app.dependencies import get_current_user
+from app.main import app
+from app.utils.columnar_codec import decode_vitals_msgpack, encode_vitals_msgpack
+from fastapi.testclient import TestClient
+import msgpack
+import numpy as np
+import pytest
+
+START = 1_700_000_000
+
+
+def columns(count=3):
+    return {
+        'timestamp': np.arange(START, START + count, dtype=np.int64),
+        'heart_rate': np.array([60.0, np.nan, 62.0][:count]),
+        'activity_state': np.array(['rest', None, 'walking'][:count], dtype=object),
+    }
+
+
+def body(**overrides):
+    payload = msgpack.unpackb(encode_vitals_msgpack('2023-11-14', columns(), summary={'avg_heart_rate': 61}))
+    payload.update(overrides)
+    return msgpack.packb(payload, use_bin_type=True)
+
+
+def test_round_trip_keeps_values_and_missing_markers():
+    date, summary, decoded, offset = decode_vitals_msgpack(
+        encode_vitals_msgpack('2023-11-14', columns(), summary={'avg_heart_rate': 61}, utc_offset_minutes=60))
+    assert (date, summary, offset) == ('2023-11-14', {'avg_heart_rate': 61}, 60)
+    assert decoded['timestamp'].tolist() == columns()['timestamp'].tolist()
+    assert decoded['heart_rate'][0] == 60 and np.isnan(decoded['heart_rate'][1])
+    assert np.isnan(decoded['spo2']).all()
+    assert decoded['activity_state'].tolist() == ['rest', None, 'walking']
+
+
+@pytest.mark.parametrize('overrides, message', [
+    ({'summary': [1, 2]}, 'summary'),
+    ({'summary': 'high'}, 'summary'),
+    ({'count': 4}, 'count'),
+    ({'utc_offset_minutes': 900}, 'utc_offset_minutes'),
+    ({'columns': {'timestamp': b'\0' * 7}}, 'timestamp'),
+])
+def test_malformed_bodies_are_rejected(overrides, message):
+    with pytest.raises(ValueError, match=message):
+        decode_vitals_msgpack(body(**overrides))
+
+
+@pytest.mark.parametrize('states', [[1, None, 'rest'], [{'a': 1}, None, None], ['rest', None]])
+def test_activity_states_must_be_strings_or_nil(states):
+    payload = msgpack.unpackb(body(), raw=False)
+    payload['columns']['activity_state'] = states
+    with pytest.raises(ValueError, match='activity_state'):
+        decode_vitals_msgpack(msgpack.packb(payload, use_bin_type=True))
+
+
+def test_numeric_columns_must_match_the_count():
+    payload = msgpack.unpackb(body(), raw=False)
+    payload['columns']['heart_rate'] = b'\0' * 5
+    with pytest.raises(ValueError, match='heart_rate'):
+        decode_vitals_msgpack(msgpack.packb(payload, use_bin_type=True))
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[get_current_user] = lambda: {'user_id': 'u1'}
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+
+
+@pytest.mark.parametrize('summary', [[1, 2], {b'avg_heart_rate': 61}, {'avg_heart_rate': {'x': 1}}, {'unknown': 1, 'avg_heart_rate': 'fast'}])
+def test_sync_rejects_a_bad_summary_with_400(client, summary):
+    response = client.post('/api/v1/vitals/sync', content=body(summary=summary),
+                           headers={'Content-Type': 'application/x-msgpack'})
+    assert response.status_code == 400
@@ -0,0 +1,161 @@
+from app.jobs import compact_vitals
+from app.jobs.compact_vitals import downsample_readings, run
+from datetime import date, timedelta
+from google.api_core.exceptions import FailedPrecondition
+import itertools
+import pytest
+
+HOUR = 1_700_000_000 // 3600 * 3600
+
+
+def raw_hour():
+    """One reading a second for an hour: 70 bpm for 45 minutes, then 110 bpm"""
+    return [
+        {'timestamp': HOUR + second, 'heart_rate': 70 if second < 2700 else 110,
+         'temperature': 36.5, 'activity_state': 'rest' if second < 2700 else 'walking'}
+        for second in range(3600)
+    ]
+
+
+def test_minute_to_hour_is_weighted_by_samples():
+    readings = raw_hour()
+    # A gap in the raw data: the last quarter hour only has one reading a minute
+    readings = [r for r in readings if r['timestamp'] < HOUR + 2700 or r['timestamp'] % 60 == 0]
+
+    direct = downsample_readings(readings, 3600)
+    via_minutes = downsample_readings(downsample_readings(readings, 60), 3600)
+    assert direct == via_minutes
+    assert direct[0]['samples'] == 2700 + 15
+    assert direct[0]['heart_rate'] == round((2700 * 70 + 15 * 110) / 2715)
+
+
+def test_buckets_align_to_the_epoch_and_keep_the_majority_state():
+    minutes = downsample_readings(raw_hour(), 60)
+    assert len(minutes) == 60
+    assert [r['timestamp'] for r in minutes] == [HOUR + 60 * i for i in range(60)]
+    assert all(r['samples'] == 60 for r in minutes)
+
+    hour = downsample_readings(raw_hour(), 3600)[0]
+    assert hour['timestamp'] == HOUR and hour['samples'] == 3600
+    assert hour['heart_rate'] == 80 and hour['temperature'] == pytest.approx(36.5)
+    assert hour['activity_state'] == 'rest'
+
+
+def test_millisecond_timestamps_keep_their_unit():
+    readings = [{'timestamp': (HOUR + second) * 1000, 'heart_rate': 60} for second in range(120)]
+    assert [r['timestamp'] for r in downsample_readings(readings, 60)] == [HOUR * 1000, (HOUR + 60) * 1000]
+
+
+class FakeSnapshot:
+    def __init__(self, reference, record):
+        self.reference = reference
+        self.exists = record is not None
+        self.update_time = record['version'] if record else None
+        self._data = dict(record['data']) if record else None
+
+    def to_dict(self):
+        return self._data
+
+
+class FakeReference:
+    def __init__(self, db, path):
+        self.db, self.path = db, path
+
+    def get(self):
+        return FakeSnapshot(self, self.db.docs.get(self.path))
+
+    def set(self, data):
+        self.db.docs[self.path] = {'data': dict(data), 'version': next(self.db.versions)}
+
+    def update(self, fields, option=None):
+        record = self.db.docs[self.path]
+        if option is not None and option != record['version']:
+            raise FailedPrecondition("changed since read")
+        record['data'].update(fields)
+        record['version'] = next(self.db.versions)
+
+
+class FakeQuery:
+    def __init__(self, db, day=None):
+        self.db, self.day = db, day
+
+    def where(self, field, op, value):
+        return FakeQuery(self.db, value)
+
+    def select(self, fields):
+        return self
+
+    def order_by(self, field):
+        return self
+
+    def limit(self, count):
+        return self
+
+    def stream(self):
+        snapshots = [FakeReference(self.db, path).get() for path in sorted(self.db.docs)
+                     if '/daily_vitals/' in path and self.db.docs[path]['data']['date'] == (self.day or self.db.first)]
+        for snapshot in snapshots:
+            # The day is re-synced between this read and the job's write (on the next `resync` reads)
+            if self.day and self.db.resync.get(snapshot.reference.path, 0) > 0:
+                self.db.resync[snapshot.reference.path] -= 1
+                self.db.docs[snapshot.reference.path]['version'] = next(self.db.versions)
+        return snapshots
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db, self.writes = db, []
+
+    def update(self, ref, fields, option=None):
+        self.writes.append((ref.update, (fields, option)))
+        if option != self.db.docs[ref.path]['version']:
+            self.conflict = True
+
+    def set(self, ref, data):
+        self.writes.append((ref.set, (data,)))
+
+    def commit(self):
+        if getattr(self, 'conflict', False):
+            raise FailedPrecondition("changed since read")
+        for write, args in self.writes:
+            write(*args)
+
+
+class FakeFirestore:
+    def __init__(self):
+        self.docs, self.resync, self.versions = {}, {}, itertools.count(1)
+        self.first = (date.today() - timedelta(days=400)).isoformat()
+
+    def collection_group(self, name):
+        return FakeQuery(self)
+
+    def collection(self, name):
+        return type('Collection', (), {'document': lambda _, doc_id: FakeReference(self, f"{name}/{doc_id}")})()
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def write_option(self, last_update_time):
+        return last_update_time
+
+
+def test_a_day_resynced_during_its_write_is_reread_and_compacted():
+    db = FakeFirestore()
+    for user in ('u1', 'u2'):
+        FakeReference(db, f"users/{user}/daily_vitals/{db.first}").set({'date': db.first, 'readings': raw_hour()})
+    db.resync[f"users/u2/daily_vitals/{db.first}"] = 1
+
+    report = run(db, raw_days=30, minute_days=365)
+    assert report['finished'] and report['conflicts'] == 0 and report['days'] == 2
+    assert all(record['data']['resolution'] == 'hour' for record in db.docs.values() if 'readings' in record['data'])
+    assert db.docs['job_state/compact_vitals']['data']['hour_through'] > db.first
+
+
+def test_a_day_that_keeps_changing_is_reported_and_passed():
+    db = FakeFirestore()
+    FakeReference(db, f"users/u1/daily_vitals/{db.first}").set({'date': db.first, 'readings': raw_hour()})
+    db.resync[f"users/u1/daily_vitals/{db.first}"] = compact_vitals.PAGE_ATTEMPTS
+
+    report = run(db, raw_days=30, minute_days=365)
+    assert report['finished'] and report['conflicts'] == 1 and report['days'] == 0
+    assert 'resolution' not in db.docs[f"users/u1/daily_vitals/{db.first}"]['data']
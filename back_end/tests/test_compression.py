@@ -0,0 +1,45 @@
+from app.middleware.compression import CompressionMiddleware
+from app.utils.etag import etag_headers, etag_matches, make_etag, not_modified
+from fastapi import FastAPI, Header
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+from typing import Optional
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=100)
+ETAG = make_etag('profile', 'u1', '2024-03-01T08:00:00')
+
+
+@app.get('/data')
+async def data(size: int = 5000, if_none_match: Optional[str] = Header(None)):
+    if etag_matches(if_none_match, ETAG):
+        return not_modified(ETAG)
+    return PlainTextResponse('x' * size, headers=etag_headers(ETAG))
+
+
+client = TestClient(app)
+
+
+def test_encodings_share_a_weak_etag_and_vary_on_accept_encoding():
+    responses = {
+        encoding: client.get('/data', headers={'Accept-Encoding': encoding})
+        for encoding in ('br', 'gzip', 'identity')
+    }
+    assert responses['br'].headers['content-encoding'] == 'br'
+    assert responses['gzip'].headers['content-encoding'] == 'gzip'
+    assert 'content-encoding' not in responses['identity'].headers
+    for response in responses.values():
+        assert response.text == 'x' * 5000
+        assert response.headers['etag'] == ETAG and ETAG.startswith('W/')
+        assert response.headers['vary'] == 'Accept-Encoding'
+
+
+def test_small_and_not_modified_responses_vary_too():
+    small = client.get('/data', params={'size': 10}, headers={'Accept-Encoding': 'gzip'})
+    assert 'content-encoding' not in small.headers
+    assert small.headers['vary'] == 'Accept-Encoding'
+
+    cached = client.get('/data', headers={'Accept-Encoding': 'br', 'If-None-Match': ETAG})
+    assert cached.status_code == 304
+    assert cached.headers['vary'] == 'Accept-Encoding'
+    assert client.get('/data', headers={'If-None-Match': ETAG[2:]}).status_code == 304
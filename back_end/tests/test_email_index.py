@@ -0,0 +1,159 @@
+from app.services import firebase_service
+from app.services.firebase_service import FirebaseService
+from google.api_core.exceptions import AlreadyExists
+import asyncio
+import itertools
+import logging
+import pytest
+
+
+class FakeSnapshot:
+    def __init__(self, ref, data):
+        self.id = ref.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeReference:
+    def __init__(self, db, path):
+        self.db, self.path = db, path
+        self.id = path.rsplit('/', 1)[-1]
+
+    def get(self, transaction=None, timeout=None, **kwargs):
+        return FakeSnapshot(self, self.db.docs.get(self.path))
+
+    def create(self, data, timeout=None):
+        if self.db.fail_create:
+            raise self.db.fail_create
+        if self.path in self.db.docs:
+            raise AlreadyExists(self.path)
+        self.db.docs[self.path] = dict(data)
+
+
+class FakeQuery:
+    def __init__(self, db, collection, field=None, value=None):
+        self.db, self.collection, self.field, self.value = db, collection, field, value
+
+    def where(self, field, op, value):
+        return FakeQuery(self.db, self.collection, field, value)
+
+    def limit(self, count):
+        return self
+
+    def document(self, doc_id=None):
+        return FakeReference(self.db, f"{self.collection}/{doc_id or next(self.db.ids)}")
+
+    def stream(self, timeout=None):
+        prefix = f"{self.collection}/"
+        return [FakeSnapshot(FakeReference(self.db, path), data) for path, data in sorted(self.db.docs.items())
+                if path.startswith(prefix) and data.get(self.field) == self.value]
+
+
+class FakeTransaction:
+    """Buffers writes and applies them together, or not at all"""
+
+    def __init__(self, db):
+        self.db, self.writes = db, []
+
+    def set(self, ref, data):
+        self.writes.append(lambda: self.db.docs.__setitem__(ref.path, dict(data)))
+
+    def create(self, ref, data):
+        if ref.path in self.db.docs:
+            raise AlreadyExists(ref.path)
+        self.set(ref, data)
+
+    def update(self, ref, data):
+        self.writes.append(lambda: self.db.docs[ref.path].update(data))
+
+    def delete(self, ref):
+        self.writes.append(lambda: self.db.docs.pop(ref.path, None))
+
+    def commit(self):
+        for write in self.writes:
+            write()
+
+
+class FakeFirestore:
+    def __init__(self):
+        self.docs = {}
+        self.ids = (f"user{i}" for i in itertools.count(1))
+        self.fail_create = None
+
+    def collection(self, name):
+        return FakeQuery(self, name)
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+
+class FakeFirestoreModule:
+    @staticmethod
+    def transactional(func):
+        def run(transaction, *args, **kwargs):
+            result = func(transaction, *args, **kwargs)
+            transaction.commit()
+            return result
+        return run
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(firebase_service, '_firestore', lambda: FakeFirestoreModule)
+    firebase_service._email_cache.clear()
+    service = FirebaseService()
+    service._db, service._demo_mode = FakeFirestore(), False
+    yield service
+    firebase_service._email_cache.clear()
+
+
+def signup(service, email):
+    return asyncio.run(service.create_user({'email': email, 'username': 'ann', 'password_hash': 'h'}))
+
+
+def test_signup_writes_the_user_and_its_index_entry(service):
+    user_id = signup(service, 'Ann@Example.com')
+    assert service.db.docs['user_emails/ann@example.com']['user_id'] == user_id
+
+    with pytest.raises(ValueError, match='already registered'):
+        signup(service, 'ann@example.COM ')
+    assert [path for path in service.db.docs if path.startswith('users/')] == [f'users/{user_id}']
+
+
+def test_login_lookup_backfills_legacy_users(service, caplog):
+    service.db.docs['users/legacy'] = {'email': 'old@example.com', 'username': 'old', 'password_hash': 'h'}
+    service.db.fail_create = RuntimeError("index write failed")
+    with caplog.at_level(logging.ERROR, logger='app.services.firebase_service'):
+        user = asyncio.run(service.get_user_by_email('old@example.com'))
+    assert user['id'] == 'legacy'
+    assert 'Backfilling user_emails' in caplog.text
+    assert 'user_emails/old@example.com' not in service.db.docs
+
+    firebase_service._email_cache.clear()
+    service.db.fail_create = None
+    assert asyncio.run(service.get_user_by_email('old@example.com'))['id'] == 'legacy'
+    assert service.db.docs['user_emails/old@example.com']['user_id'] == 'legacy'
+
+
+def test_email_change_moves_the_index_entry(service):
+    user_id = signup(service, 'ann@example.com')
+    signup(service, 'bob@example.com')
+
+    with pytest.raises(ValueError, match='already registered'):
+        asyncio.run(service.update_user(user_id, {'email': 'bob@example.com'}))
+    assert service.db.docs[f'users/{user_id}']['email'] == 'ann@example.com'
+
+    asyncio.run(service.update_user(user_id, {'email': 'ann@new.example.com'}))
+    assert 'user_emails/ann@example.com' not in service.db.docs
+    assert service.db.docs['user_emails/ann@new.example.com']['user_id'] == user_id
+    assert asyncio.run(service.get_user_by_email('ann@new.example.com'))['id'] == user_id
+
+
+def test_users_without_an_email_are_updated_without_indexing(service):
+    service.db.docs['users/broken'] = {'username': 'nobody'}
+    asyncio.run(service.update_user('broken', {'username': 'somebody'}))
+    assert service.db.docs['users/broken']['username'] == 'somebody'
+    assert not any(path.startswith('user_emails/') for path in service.db.docs)
@@ -0,0 +1,48 @@
+from app.services.food_search_service import FoodSearchService
+
+service = FoodSearchService()
+
+
+def names(query):
+    return [result['name'] for result in service.search(query, limit=3)]
+
+
+def test_typo_prefers_the_abbreviated_word_over_shared_letters():
+    assert 'chicken' in names('chik')[0]
+    assert 'french fries' not in names('chik')
+    assert names('chikn') and 'chicken' in names('chikn')[0]
+
+
+def test_exact_alias_outranks_word_prefix():
+    assert names('chicken')[0] == 'chicken breast, grilled'
+    assert names('milk')[0] == 'whole milk'
+
+
+def test_volume_units_use_the_food_density():
+    item = service.analyze_meal('200 ml orange juice')['items'][0]
+    assert item['grams'] == 206.0
+
+    # No density for eggs: a volume can't be turned into grams
+    analysis = service.analyze_meal('1 cup egg')
+    assert analysis['items'] == [] and analysis['unmatched'] == ['1 cup egg']
+
+
+def test_food_names_containing_and_are_not_split():
+    analysis = service.analyze_meal('macaroni and cheese')
+    assert [item['food'] for item in analysis['items']] == ['macaroni and cheese']
+
+    analysis = service.analyze_meal('2 eggs and toast')
+    assert [item['food'] for item in analysis['items']] == ['egg', 'white bread']
+
+
+def test_stopwords_alone_match_nothing():
+    assert names('and') == []
+    assert names('with with') == []
+    # ...but still count inside a name
+    assert names('macaroni and ch')[0] == 'macaroni and cheese'
+
+
+def test_malformed_and_huge_quantities_are_unmatched():
+    analysis = service.analyze_meal(f"0.5.5 rice, 1/2/3 rice, {'9' * 400} rice, 1/2 cup rice")
+    assert analysis['unmatched'] == ['0.5.5 rice', '1/2/3 rice', f"{'9' * 400} rice"]
+    assert [item['quantity'] for item in analysis['items']] == [0.5]
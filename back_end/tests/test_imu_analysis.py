@@ -0,0 +1,37 @@
+from app.services.imu_analysis import analyze_imu
+from app.utils.vitals_columns import day_start_seconds
+from datetime import datetime, timezone
+import numpy as np
+
+# 2024-03-01 in UTC+2 runs from 22:00 UTC the day before
+LOCAL_MIDNIGHT = datetime(2024, 2, 29, 22, tzinfo=timezone.utc).timestamp()
+
+
+def day_columns(walking_hours):
+    """A day of 1 Hz readings, walking (accelerometer swinging around 1 g) in the given local hours"""
+    seconds = LOCAL_MIDNIGHT + np.arange(86400)
+    hour = np.arange(86400) // 3600
+    swing = np.where(np.isin(hour, walking_hours), 0.4 * np.abs(np.sin(np.arange(86400))), 0.0)
+    zeros = np.zeros(86400)
+    return {
+        'timestamp': (seconds * 1000).astype(np.int64),
+        'accel_x': zeros, 'accel_y': zeros, 'accel_z': 1.0 + swing,
+        'gyro_x': zeros, 'gyro_y': zeros, 'gyro_z': zeros,
+    }
+
+
+def test_day_start_is_inferred_from_the_readings():
+    seconds = LOCAL_MIDNIGHT + np.arange(86400, dtype=np.float64)
+    assert day_start_seconds('2024-03-01', seconds) == LOCAL_MIDNIGHT
+    assert day_start_seconds('2024-03-01', seconds[:3600], utc_offset_minutes=-300) == LOCAL_MIDNIGHT + 7 * 3600
+
+
+def test_hourly_steps_cover_the_whole_local_day():
+    columns = day_columns(walking_hours=[0, 1, 10, 23])
+    result = analyze_imu(columns, day_start_seconds('2024-03-01', columns['timestamp'] / 1000.0))
+
+    hours = {row['hour']: row for row in result['hourly_breakdown']}
+    assert sorted(hours) == [0, 1, 10, 23]
+    assert result['steps'] > 0
+    assert sum(row['steps'] for row in hours.values()) == result['steps']
+    assert sum(row['active_minutes'] for row in hours.values()) == result['active_minutes']
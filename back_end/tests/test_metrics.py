@@ -0,0 +1,26 @@
+from app import dependencies
+from app.main import app
+from fastapi.testclient import TestClient
+import pytest
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def test_metrics_are_disabled_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(dependencies.settings, 'METRICS_TOKEN', '')
+    assert client.get('/metrics').status_code == 404
+    assert client.get('/metrics', headers={'X-Metrics-Token': ''}).status_code == 404
+
+
+def test_metrics_need_the_configured_token(client, monkeypatch):
+    monkeypatch.setattr(dependencies.settings, 'METRICS_TOKEN', 'scrape-secret')
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', headers={'X-Metrics-Token': 'guess'}).status_code == 403
+
+    response = client.get('/metrics', headers={'X-Metrics-Token': 'scrape-secret'})
+    assert response.status_code == 200
+    assert 'profile_cache' in response.json()
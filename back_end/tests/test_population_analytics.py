@@ -0,0 +1,152 @@
+from app.jobs import population_analytics
+from app.jobs.population_analytics import run
+import pytest
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeReference:
+    def __init__(self, db, path, parent=None):
+        self.db = db
+        self.path = path
+        self.id = path.rsplit('/', 1)[-1]
+        self.parent = parent
+
+    def collection(self, name):
+        return FakeCollection(self.db, f"{self.path}/{name}", self)
+
+    def get(self):
+        return FakeSnapshot(self, self.db.docs.get(self.path))
+
+
+class FakeCollection:
+    def __init__(self, db, path, parent=None):
+        self.db = db
+        self.path = path
+        self.id = path.rsplit('/', 1)[-1]
+        self.parent = parent
+
+    def document(self, doc_id):
+        return FakeReference(self.db, f"{self.path}/{doc_id}", self)
+
+
+class FakeGroupQuery:
+    def __init__(self, db, name, filters=()):
+        self.db, self.name, self.filters = db, name, filters
+
+    def where(self, field, op, value):
+        return FakeGroupQuery(self.db, self.name, self.filters + ((field, op, value),))
+
+    def select(self, fields):
+        return self
+
+    def order_by(self, field):
+        return self
+
+    def limit(self, count):
+        return self
+
+    def stream(self):
+        checks = {'>': lambda a, b: a > b, '<=': lambda a, b: a <= b}
+        for path, data in sorted(self.db.docs.items(), key=lambda item: item[1].get('synced_at', '')):
+            parts = path.split('/')
+            if len(parts) != 4 or parts[2] != self.name:
+                continue
+            if all(checks[op](data.get(field), value) for field, op, value in self.filters):
+                user = FakeCollection(self.db, 'users').document(parts[1])
+                yield FakeSnapshot(user.collection(self.name).document(parts[3]), data)
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db, self.writes = db, []
+
+    def set(self, ref, data):
+        self.writes.append((ref.path, data))
+
+    def commit(self):
+        if any(path == self.db.fail_on for path, _ in self.writes):
+            raise RuntimeError(f"write to {self.db.fail_on} failed")
+        self.db.docs.update(self.writes)
+
+
+class FakeFirestore:
+    def __init__(self):
+        self.docs = {}
+        self.fail_on = None
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def collection_group(self, name):
+        return FakeGroupQuery(self, name)
+
+    def get_all(self, refs, field_paths=None):
+        return [ref.get() for ref in refs]
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def sync(self, user_id, date, synced_at, steps):
+        self.docs[f"users/{user_id}/daily_vitals/{date}"] = {
+            'date': date, 'synced_at': synced_at, 'summary': {'steps': steps},
+        }
+
+
+def steps(result):
+    return result['states']['all']['steps']
+
+
+def test_resynced_day_replaces_its_earlier_values():
+    db = FakeFirestore()
+    db.sync('u1', '2024-03-01', '2024-03-02T08:00:00', 4000)
+    db.sync('u2', '2024-03-01', '2024-03-02T09:00:00', 6000)
+    run(db, partitions=2, processes=1)
+
+    db.sync('u1', '2024-03-01', '2024-03-03T08:00:00', 9000)
+    result = run(db, partitions=2, processes=1)
+
+    assert steps(result)['n'] == 2
+    assert steps(result)['sum'] == 15000
+    assert result['days_processed'] == 2
+    assert result['watermark'] == '2024-03-03T08:00:00'
+
+
+def test_days_in_the_overlap_are_not_counted_twice():
+    db = FakeFirestore()
+    db.sync('u1', '2024-03-01', '2024-03-02T08:00:00', 4000)
+    run(db, partitions=1, processes=1)
+    # Written with a synced_at just before the checkpoint, after the last scan
+    db.sync('u2', '2024-03-01', '2024-03-02T07:59:00', 6000)
+
+    result = run(db, partitions=1, processes=1)
+    assert steps(result)['n'] == 2
+    assert run(db, partitions=1, processes=1)['states'] == result['states']
+
+
+def test_contributions_of_an_unfinished_run_are_not_counted(monkeypatch):
+    db = FakeFirestore()
+    db.sync('u1', '2024-03-01', '2024-03-02T08:00:00', 4000)
+    run(db, partitions=1, processes=1)
+
+    # The day's contribution is written but the run dies before the population document
+    db.sync('u1', '2024-03-01', '2024-03-03T08:00:00', 9000)
+    monkeypatch.setattr(population_analytics, 'WRITE_BATCH_SIZE', 1)
+    db.fail_on = 'analytics/population'
+    with pytest.raises(RuntimeError):
+        run(db, partitions=1, processes=1)
+    assert db.docs['analytics_days/u1_2024-03-01']['values'] == {'steps': 9000.0}
+    db.fail_on = None
+
+    result = run(db, partitions=1, processes=1)
+    assert steps(result)['n'] == 1
+    assert steps(result)['sum'] == 9000
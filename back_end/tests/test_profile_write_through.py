@@ -0,0 +1,51 @@
+from app.services.firebase_service import FirebaseService
+from app.services.profile_cache import get_profile_cache
+import asyncio
+import pytest
+
+
+class FakeRef:
+    def collection(self, name):
+        return self
+
+    def document(self, doc_id):
+        return self
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db = db
+
+    def set(self, ref, data, merge=False):
+        pass
+
+    def commit(self, timeout=None):
+        if self.db.fail:
+            raise RuntimeError("commit failed")
+
+
+class FakeFirestore(FakeRef):
+    def __init__(self, fail):
+        self.fail = fail
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+def service(fail: bool) -> FirebaseService:
+    service = FirebaseService()
+    service._db, service._demo_mode = FakeFirestore(fail), False
+    return service
+
+
+def test_profile_cache_is_updated_only_after_the_write_commits():
+    cache = get_profile_cache()
+    cache.put('cached-user', {'weight_kg': 70, 'updated_at': 'v1'})
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(service(fail=True).update_user_profile('cached-user', {'weight_kg': 90}))
+    assert cache.get('cached-user') is None
+
+    cache.put('cached-user', {'weight_kg': 70, 'updated_at': 'v1'})
+    asyncio.run(service(fail=False).update_user_profile('cached-user', {'weight_kg': 80}))
+    assert cache.get('cached-user')[1]['weight_kg'] == 80
@@ -0,0 +1,54 @@
+from app.utils import rate_limit
+from app.utils.rate_limit import TokenBucketLimiter, parse_rate
+import pytest
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit, 'time', clock)
+    return clock
+
+
+def test_parse_rate():
+    assert parse_rate('10/minute') == (10.0, 10 / 60)
+    assert parse_rate('5/hours') == (5.0, 5 / 3600)
+    with pytest.raises(ValueError):
+        parse_rate('10/fortnight')
+
+
+def test_bucket_empties_then_refills_at_the_configured_rate(clock):
+    limiter = TokenBucketLimiter()
+    capacity, refill = parse_rate('3/minute')  # one token every 20 s
+
+    assert [limiter.allow('u1', capacity, refill)[0] for _ in range(3)] == [True] * 3
+    allowed, retry_after = limiter.allow('u1', capacity, refill)
+    assert not allowed and retry_after == pytest.approx(20)
+
+    clock.now += 10
+    allowed, retry_after = limiter.allow('u1', capacity, refill)
+    assert not allowed and retry_after == pytest.approx(10)
+
+    clock.now += 10
+    assert limiter.allow('u1', capacity, refill)[0]
+    assert not limiter.allow('u1', capacity, refill)[0]
+
+    # Refilling stops at capacity
+    clock.now += 3600
+    assert [limiter.allow('u1', capacity, refill)[0] for _ in range(4)] == [True, True, True, False]
+
+
+def test_keys_have_separate_buckets(clock):
+    limiter = TokenBucketLimiter(max_keys=2)
+    assert limiter.allow('u1', 1, 1 / 60)[0]
+    assert not limiter.allow('u1', 1, 1 / 60)[0]
+    assert limiter.allow('u2', 1, 1 / 60)[0]
+    assert limiter.stats == {'allowed': 2, 'limited': 1}
@@ -0,0 +1,138 @@
+from app.services import token_revocation
+from app.services.auth_service import AuthService
+import asyncio
+import pytest
+
+USER = {'user_id': 'refresh-user', 'email': 'refresh@example.com', 'username': 'refresh'}
+
+
+def refresh(auth: AuthService, token: str) -> dict:
+    return asyncio.run(auth.refresh(token))
+
+
+def revoked(auth: AuthService, token: str) -> bool:
+    payload = auth.verify_token(token)
+    return payload is None or asyncio.run(auth.is_revoked(payload))
+
+
+def test_rotation_returns_a_new_pair_for_the_same_session():
+    auth = AuthService()
+    first = auth.create_tokens(USER)
+    second = refresh(auth, first['refresh_token'])
+
+    assert second['refresh_token'] != first['refresh_token']
+    assert auth.verify_token(second['access_token'])['sid'] == auth.verify_token(first['access_token'])['sid']
+    assert not revoked(auth, second['access_token'])
+
+
+def test_reusing_a_rotated_refresh_token_revokes_the_session():
+    auth = AuthService()
+    first = auth.create_tokens(USER)
+    second = refresh(auth, first['refresh_token'])
+
+    with pytest.raises(ValueError):
+        refresh(auth, first['refresh_token'])
+    # Everything issued for the session is now dead, including the legitimate client's pair
+    assert revoked(auth, second['access_token'])
+    with pytest.raises(ValueError):
+        refresh(auth, second['refresh_token'])
+
+    # Other sessions are unaffected
+    other = auth.create_tokens(USER)
+    assert not revoked(auth, other['access_token'])
+
+
+def test_access_token_is_not_a_refresh_token():
+    auth = AuthService()
+    tokens = auth.create_tokens(USER)
+    with pytest.raises(ValueError):
+        refresh(auth, tokens['access_token'])
+    assert not revoked(auth, tokens['access_token'])
+
+
+def test_a_failed_revocation_write_leaves_the_token_usable(monkeypatch):
+    auth = AuthService()
+    tokens = auth.create_tokens(USER)
+
+    async def unavailable(*args):
+        raise ConnectionError("firestore unavailable")
+
+    monkeypatch.setattr(auth.firebase_service, 'revoke_token_id', unavailable)
+    with pytest.raises(ConnectionError):
+        refresh(auth, tokens['refresh_token'])
+    payload = auth.security.verify_token(tokens['refresh_token'], token_type='refresh')
+    assert not asyncio.run(auth.is_revoked(payload))
+
+    # Once the store is back the retry rotates normally instead of looking like a replay
+    monkeypatch.undo()
+    rotated = refresh(auth, tokens['refresh_token'])
+    assert not revoked(auth, rotated['access_token'])
+
+
+class StoredRevocations:
+    """Stands in for revoked_tokens: create() fails for an ID that already exists"""
+
+    def __init__(self, on_store=None):
+        self.ids = set()
+        self.on_store = on_store
+
+    async def revoke_token_id(self, token_id, kind, user_id, expires_at):
+        if token_id in self.ids:
+            return False
+        self.ids.add(token_id)
+        if self.on_store:
+            self.on_store(token_id, kind, expires_at)
+        return True
+
+    async def is_token_id_revoked(self, token_id):
+        return token_id in self.ids
+
+
+@pytest.fixture
+def stored_auth(monkeypatch):
+    monkeypatch.setattr(token_revocation, '_revocation_list', None)
+    auth = AuthService()
+    store = StoredRevocations()
+    monkeypatch.setattr(auth.firebase_service, '_demo_mode', False)
+    monkeypatch.setattr(auth.firebase_service, 'revoke_token_id', store.revoke_token_id)
+    monkeypatch.setattr(auth.firebase_service, 'is_token_id_revoked', store.is_token_id_revoked)
+    return auth, store
+
+
+def test_rotation_succeeds_when_the_listener_records_the_revocation_first(stored_auth):
+    auth, store = stored_auth
+    # The snapshot listener thread sees the write before the request resumes
+    store.on_store = lambda token_id, kind, expires_at: token_revocation.get_revocation_list().add(token_id, expires_at)
+    tokens = auth.create_tokens(USER)
+
+    rotated = refresh(auth, tokens['refresh_token'])
+    assert not revoked(auth, rotated['access_token'])
+    # Reuse is still caught by the store
+    with pytest.raises(ValueError):
+        refresh(auth, tokens['refresh_token'])
+    assert revoked(auth, rotated['access_token'])
+
+
+def test_only_sessions_are_kept_in_memory(stored_auth):
+    auth, _ = stored_auth
+    tokens = auth.create_tokens(USER)
+    refresh(auth, tokens['refresh_token'])
+    assert token_revocation.get_revocation_list().snapshot()['entries'] == 0
+
+    asyncio.run(auth.revoke_session(auth.verify_token(tokens['access_token'])['sid'], USER['user_id']))
+    assert token_revocation.get_revocation_list().snapshot()['entries'] == 1
+
+
+def test_a_failed_load_falls_back_to_firestore_checks(stored_auth, monkeypatch):
+    auth, store = stored_auth
+    tokens = auth.create_tokens(USER)
+    store.ids.add(auth.verify_token(tokens['access_token'])['sid'])  # revoked before this worker started
+
+    async def unavailable(*args, **kwargs):
+        raise ConnectionError("firestore unavailable")
+
+    monkeypatch.setattr(auth.firebase_service, 'get_revoked_session_ids', unavailable)
+    monkeypatch.setattr(token_revocation.RevocationList, 'start_listener', lambda self, db: None)
+    assert asyncio.run(auth.load_revocations()) is False
+    assert revoked(auth, tokens['access_token'])
+    assert not revoked(auth, auth.create_tokens(USER)['access_token'])
@@ -0,0 +1,111 @@
+from app.services.firebase_service import FirebaseService
+from app.utils.deadlines import DeadlineExceededError
+from app.utils.request_context import begin_request, current_request_state
+from app.utils.single_flight import SingleFlight
+import asyncio
+import pytest
+import time
+
+
+class FakeSnapshot:
+    def __init__(self, date: str):
+        self._data = {'date': date, 'readings': [], 'summary': {}}
+
+    def to_dict(self) -> dict:
+        return dict(self._data)
+
+
+class FakeQuery:
+    """Stands in for any Firestore collection/query chain; counts stream() calls"""
+
+    def __init__(self):
+        self.streams = 0
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def stream(self, timeout=None):
+        self.streams += 1
+        time.sleep(0.02)
+        return [FakeSnapshot(f'2025-11-{17 + day:02d}') for day in range(7)]
+
+
+@pytest.mark.parametrize('callers', [1, 10, 100])
+def test_concurrent_identical_reads_run_one_query(callers):
+    db = FakeQuery()
+    service = FirebaseService()
+    service._db, service._demo_mode = db, False
+
+    async def reads():
+        return await asyncio.gather(*[
+            service.get_vitals_range('u1', '2025-11-17', '2025-11-23') for _ in range(callers)
+        ])
+
+    results = asyncio.run(reads())
+    assert db.streams == 1
+    assert all(result is results[0] for result in results)
+
+    # Sequential calls are not coalesced: each one sees fresh data
+    asyncio.run(reads())
+    assert db.streams == 2
+
+
+def test_callers_share_one_execution_and_its_error():
+    flights = SingleFlight()
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise LookupError("gone")
+
+    async def scenario():
+        return await asyncio.gather(*[flights.do('key', fail) for _ in range(5)], return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(isinstance(error, LookupError) for error in errors)
+    assert flights.stats == {'calls': 5, 'executed': 1, 'coalesced': 4}
+    assert flights.in_flight() == 0
+
+
+def test_a_cancelled_caller_does_not_cancel_the_others():
+    flights = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return 'result'
+
+    async def scenario():
+        first = asyncio.ensure_future(flights.do('key', slow))
+        second = asyncio.ensure_future(flights.do('key', slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == 'result'
+
+
+def test_the_shared_call_runs_outside_any_callers_deadline():
+    flights = SingleFlight()
+    seen = []
+
+    async def slow():
+        seen.append(current_request_state())
+        await asyncio.sleep(0.05)
+        return 'result'
+
+    async def caller(deadline_seconds):
+        state = begin_request(deadline_seconds)
+        try:
+            return await flights.do('key', slow, 'get_vitals_range')
+        finally:
+            assert state.timings[-1][0] == 'get_vitals_range'
+
+    async def scenario():
+        return await asyncio.gather(caller(0.01), caller(5), return_exceptions=True)
+
+    hurried, patient = asyncio.run(scenario())
+    assert seen == [None]
+    assert isinstance(hurried, DeadlineExceededError) and hurried.status_code == 504
+    assert patient == 'result'
@@ -0,0 +1,41 @@
+from app.utils.tdigest import TDigest
+import numpy as np
+import pytest
+
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+def rank_error(values: np.ndarray, estimate: float, q: float) -> float:
+    """How far, in quantile rank, the estimate is from q"""
+    return abs(np.searchsorted(np.sort(values), estimate) / len(values) - q)
+
+
+@pytest.mark.parametrize('distribution', ['normal', 'exponential', 'uniform'])
+def test_quantiles_are_within_one_percent_in_rank(distribution):
+    rng = np.random.default_rng(7)
+    values = getattr(rng, distribution)(size=86400)
+    digest = TDigest.from_values(values)
+
+    assert len(digest.means) <= 2 * digest.compression
+    for q in QUANTILES:
+        assert rank_error(values, digest.quantile(q), q) < 0.01
+    assert digest.quantile(0) == values.min() and digest.quantile(1) == values.max()
+
+
+def test_merged_daily_digests_match_the_whole_range():
+    rng = np.random.default_rng(11)
+    days = [rng.normal(70 + day, 8, size=20000) for day in range(30)]
+    merged = TDigest.merge_all(TDigest.from_dict(TDigest.from_values(day).to_dict()) for day in days)
+    values = np.concatenate(days)
+
+    assert merged.count == len(values)
+    for q in QUANTILES:
+        assert rank_error(values, merged.quantile(q), q) < 0.01
+
+
+def test_added_values_match_the_vectorized_build():
+    values = np.random.default_rng(3).normal(size=5000)
+    incremental = TDigest()
+    incremental.update(values.tolist())
+    for q in QUANTILES:
+        assert incremental.quantile(q) == pytest.approx(TDigest.from_values(values).quantile(q), abs=0.05)
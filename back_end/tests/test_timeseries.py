@@ -0,0 +1,97 @@
+from app.dependencies import get_current_user
+from app.main import app
+from app.schemas.vitals import VitalsWindowResponse
+from app.services.timeseries_service import bucket_readings, find_chunks, slice_window, window_dates
+from fastapi.testclient import TestClient
+import pytest
+
+DAY = 86400
+START = 1_700_006_400  # 2023-11-15T00:00:00Z
+
+
+def day(date, first, last):
+    return {'date': date, 'first_timestamp': first, 'last_timestamp': last}
+
+
+CHUNKS = [
+    day('2023-11-14', START - DAY, START - 1),
+    day('2023-11-15', START, START + DAY - 1),
+    day('2023-11-16', START + DAY, START + 2 * DAY - 1),
+]
+
+
+def test_find_chunks_returns_only_overlapping_days():
+    assert find_chunks(CHUNKS, START + 10, START + 20) == ['2023-11-15']
+    assert find_chunks(CHUNKS, START - 10, START + DAY) == ['2023-11-14', '2023-11-15', '2023-11-16']
+    assert find_chunks(CHUNKS, START + 3 * DAY, START + 4 * DAY) == []
+    # A legacy day without bounds is always included
+    assert find_chunks(CHUNKS + [{'date': '2023-11-01'}], START + 10, START + 20) == ['2023-11-01', '2023-11-15']
+
+
+def test_slice_window_bounds_are_inclusive():
+    readings = [{'timestamp': START + second} for second in range(0, 100, 10)]
+    window = slice_window(readings, START + 20, START + 50)
+    assert [r['timestamp'] - START for r in window] == [20, 30, 40, 50]
+    assert slice_window(readings, START + 21, START + 29) == []
+
+
+def test_buckets_align_to_the_start_and_skip_missing_values():
+    readings = [
+        {'timestamp': START + 5, 'heart_rate': 60},
+        {'timestamp': START + 59, 'heart_rate': None},
+        {'timestamp': START + 61, 'heart_rate': 71},
+        {'timestamp': START + 62, 'heart_rate': 72},
+        {'timestamp': START + 200, 'heart_rate': None},
+    ]
+    points = bucket_readings(readings, ['heart_rate'], START, 60)
+    assert points == [
+        {'timestamp': START, 'count': 2, 'heart_rate': 60.0},
+        {'timestamp': START + 60, 'count': 2, 'heart_rate': 71.5},
+        {'timestamp': START + 180, 'count': 1, 'heart_rate': None},
+    ]
+
+
+def test_window_dates_pad_a_day_either_side():
+    assert window_dates(START, START + 3600) == ('2023-11-14', '2023-11-16')
+    assert window_dates(START * 1000, (START + 3600) * 1000) == ('2023-11-14', '2023-11-16')
+
+
+@pytest.mark.parametrize('start, end', [
+    (START, START - 1),
+    (0, START),
+    (START, START + 8 * DAY),
+    (-5, 10),
+    (10 ** 17, 10 ** 17 + 1),
+])
+def test_window_dates_reject_bad_windows(start, end):
+    with pytest.raises(ValueError):
+        window_dates(start, end, max_days=7)
+
+
+def test_integer_values_stay_integers():
+    response = VitalsWindowResponse(start=START, end=START + 60, metrics=['heart_rate', 'temperature'], points=[
+        {'timestamp': START, 'heart_rate': 61, 'temperature': 36.6},
+    ])
+    point = response.model_dump()['points'][0]
+    assert point['timestamp'] == START and isinstance(point['timestamp'], int)
+    assert isinstance(point['heart_rate'], int) and point['temperature'] == 36.6
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[get_current_user] = lambda: {'user_id': 'u1'}
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+
+
+@pytest.mark.parametrize('params', [
+    {'start': 0, 'end': 10 ** 18},
+    {'start': START, 'end': START - 1},
+    {'start': 10 ** 17, 'end': 10 ** 17 + 1},
+])
+def test_window_endpoint_rejects_bad_windows_with_400(client, params):
+    response = client.get('/api/v1/vitals/window', params=params)
+    assert response.status_code == 400
@@ -0,0 +1,124 @@
+from app.services import upload_sessions
+from app.services.upload_sessions import UploadBusyError, UploadNotFoundError, UploadStore
+import hashlib
+import os
+import pytest
+
+CHUNK = 1024
+
+
+def sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadStore(str(tmp_path), chunk_size=CHUNK, max_size=10 * CHUNK, idle_seconds=3600)
+
+
+@pytest.fixture
+def payload():
+    return os.urandom(2 * CHUNK + 100)
+
+
+def upload(store, payload):
+    return store.create('u1', 'application/json', len(payload), sha(payload))['upload_id']
+
+
+def chunk(payload, index):
+    return payload[index * CHUNK:(index + 1) * CHUNK]
+
+
+def test_oversized_uploads_are_refused(store):
+    with pytest.raises(ValueError):
+        store.create('u1', 'application/json', 10 * CHUNK + 1)
+
+
+def test_chunks_are_checked_for_index_size_and_checksum(store, payload):
+    upload_id = upload(store, payload)
+    assert store.status('u1', upload_id)['chunk_count'] == 3
+
+    with pytest.raises(ValueError, match='index'):
+        store.put_chunk('u1', upload_id, 3, chunk(payload, 2), sha(chunk(payload, 2)))
+    # Every chunk but the last must be exactly chunk_size
+    short = chunk(payload, 0)[:-1]
+    with pytest.raises(ValueError, match='bytes'):
+        store.put_chunk('u1', upload_id, 0, short, sha(short))
+    with pytest.raises(ValueError, match='bytes'):
+        store.put_chunk('u1', upload_id, 2, chunk(payload, 0), sha(chunk(payload, 0)))
+    with pytest.raises(ValueError, match='SHA-256'):
+        store.put_chunk('u1', upload_id, 0, chunk(payload, 0), sha(b'something else'))
+
+    status = store.put_chunk('u1', upload_id, 2, chunk(payload, 2), sha(chunk(payload, 2)).upper())
+    assert status['received'] == [2] and status['missing'] == [0, 1]
+
+
+def test_assembly_needs_every_chunk_and_the_payload_checksum(store, payload):
+    upload_id = upload(store, payload)
+    store.put_chunk('u1', upload_id, 0, chunk(payload, 0), sha(chunk(payload, 0)))
+    with pytest.raises(ValueError, match='not received'):
+        store.assemble('u1', upload_id)
+
+    for index in (1, 2):
+        store.put_chunk('u1', upload_id, index, chunk(payload, index), sha(chunk(payload, index)))
+    session, body = store.assemble('u1', upload_id)
+    assert bytes(body) == payload
+
+    # Locked for commit until released
+    with pytest.raises(UploadBusyError):
+        store.put_chunk('u1', upload_id, 0, chunk(payload, 0), sha(chunk(payload, 0)))
+    store.release(upload_id)
+    store.finish(upload_id)
+    with pytest.raises(UploadNotFoundError):
+        store.status('u1', upload_id)
+
+
+def test_a_payload_that_does_not_match_its_checksum_is_rejected(store, payload):
+    upload_id = store.create('u1', 'application/json', len(payload), sha(b'other'))['upload_id']
+    for index in range(3):
+        store.put_chunk('u1', upload_id, index, chunk(payload, index), sha(chunk(payload, index)))
+    with pytest.raises(ValueError, match='checksum'):
+        store.assemble('u1', upload_id)
+    # The failed commit released the lock: the upload can be fixed and retried
+    store.put_chunk('u1', upload_id, 0, chunk(payload, 0), sha(chunk(payload, 0)))
+
+
+def test_uploads_belong_to_their_user(store, payload):
+    upload_id = upload(store, payload)
+    with pytest.raises(UploadNotFoundError):
+        store.status('u2', upload_id)
+    with pytest.raises(UploadNotFoundError):
+        store.status('u1', '../../etc')
+
+
+def test_a_chunk_resent_during_assembly_does_not_change_the_payload(store, payload, monkeypatch):
+    upload_id = upload(store, payload)
+    for index in range(3):
+        store.put_chunk('u1', upload_id, index, chunk(payload, index), sha(chunk(payload, index)))
+
+    expected_size = UploadStore.expected_size
+    resent = []
+
+    def resend_while_reading(session, index):
+        if index == 0 and not resent:
+            # Another request replaces chunk 2 after the commit opened it
+            upload_sessions._write_atomic(os.path.join(store.root, upload_id, '000002.chunk'), b'x' * 100)
+            resent.append(index)
+        return expected_size(session, index)
+
+    monkeypatch.setattr(UploadStore, 'expected_size', staticmethod(resend_while_reading))
+    session, body = store.assemble('u1', upload_id)
+    assert resent and bytes(body) == payload
+
+
+def test_a_chunk_written_as_a_commit_starts_is_reported_busy(store, payload, monkeypatch):
+    upload_id = upload(store, payload)
+    write_atomic = upload_sessions._write_atomic
+
+    def write_then_lock(path, data):
+        write_atomic(path, data)
+        open(os.path.join(store.root, upload_id, upload_sessions.COMMIT_LOCK), 'w').close()
+
+    monkeypatch.setattr(upload_sessions, '_write_atomic', write_then_lock)
+    with pytest.raises(UploadBusyError):
+        store.put_chunk('u1', upload_id, 0, chunk(payload, 0), sha(chunk(payload, 0)))
@@ -0,0 +1,23 @@
+from app.services.vitals_aggregation import aggregate_day
+from app.utils.vitals_columns import day_start_seconds
+from datetime import datetime, timezone
+import numpy as np
+
+# 2024-03-01 in UTC+2 runs from 22:00 UTC the day before, crossing UTC midnight
+LOCAL_MIDNIGHT = datetime(2024, 2, 29, 22, tzinfo=timezone.utc).timestamp()
+
+
+def test_hourly_rollups_count_from_local_midnight():
+    seconds = LOCAL_MIDNIGHT + np.arange(0, 86400, 10, dtype=np.float64)
+    heart_rate = 60 + (seconds - LOCAL_MIDNIGHT) // 3600  # 60 bpm in local hour 0, 61 in hour 1, ...
+    columns = {
+        'timestamp': seconds.astype(np.int64),
+        'heart_rate': heart_rate,
+        'spo2': np.full(len(seconds), np.nan),
+        'temperature': np.full(len(seconds), np.nan),
+    }
+
+    hourly = aggregate_day(columns, day_start_seconds('2024-03-01', seconds))['hourly']
+    assert [row['hour'] for row in hourly] == list(range(24))
+    assert [row['avg_heart_rate'] for row in hourly] == [60.0 + hour for hour in range(24)]
+    assert sum(row['heart_rate_samples'] for row in hourly) == len(seconds)
@@ -0,0 +1,58 @@
+from app.services.vitals_cleaning import clean_columns, rolling_nanmedian
+from app.utils.vitals_columns import readings_to_columns
+import numpy as np
+
+START = 1_700_000_000
+
+
+def heart_rates(values, start=START):
+    return readings_to_columns([{'timestamp': start + i, 'heart_rate': value} for i, value in enumerate(values)])
+
+
+def test_rows_are_sorted_and_the_last_copy_of_a_timestamp_wins():
+    columns = readings_to_columns([
+        {'timestamp': START + 2, 'heart_rate': 72},
+        {'timestamp': START, 'heart_rate': 70},
+        {'timestamp': START + 1, 'heart_rate': 60},
+        {'timestamp': START + 1, 'heart_rate': 71},  # retransmit
+    ])
+    cleaned, report = clean_columns(columns)
+    assert cleaned['timestamp'].tolist() == [START, START + 1, START + 2]
+    assert cleaned['heart_rate'].tolist() == [70, 71, 72]
+    assert report['out_of_order'] == 1 and report['duplicates_dropped'] == 1
+
+
+def test_impossible_values_are_masked_and_empty_rows_dropped():
+    columns = readings_to_columns([
+        {'timestamp': START, 'heart_rate': 0, 'spo2': 98},
+        {'timestamp': START + 1, 'heart_rate': 255},  # nothing valid left
+        {'timestamp': START + 2, 'heart_rate': 70, 'spo2': 127, 'temperature': 36.6},
+        {'timestamp': START + 3, 'heart_rate': 25, 'spo2': 100, 'temperature': 36.8},  # bounds are valid
+    ])
+    cleaned, report = clean_columns(columns)
+    assert cleaned['timestamp'].tolist() == [START, START + 2, START + 3]
+    assert np.isnan(cleaned['heart_rate'][0]) and cleaned['spo2'][0] == 98
+    assert np.isnan(cleaned['spo2'][1]) and cleaned['temperature'][1] == 36.6
+    assert cleaned['heart_rate'][2] == 25 and cleaned['spo2'][2] == 100
+    assert report['out_of_range_masked'] == {'heart_rate': 2, 'spo2': 1}
+    assert report['empty_dropped'] == 1
+
+
+def test_an_isolated_spike_is_replaced_by_the_local_median():
+    cleaned, report = clean_columns(heart_rates([70, 71, 72, 150, 72, 71, 70]))
+    assert cleaned['heart_rate'].tolist() == [70, 71, 72, 72, 72, 71, 70]
+    assert report['spikes_corrected'] == {'heart_rate': 1}
+
+
+def test_a_sustained_change_is_kept():
+    # Starting to run: the rate jumps and stays up
+    values = [70, 70, 70, 70, 130, 130, 130, 130, 130]
+    cleaned, report = clean_columns(heart_rates(values))
+    assert cleaned['heart_rate'].tolist() == values
+    assert report['spikes_corrected'] == {}
+
+
+def test_rolling_median_ignores_gaps():
+    median = rolling_nanmedian(np.array([1.0, np.nan, 3.0, np.nan, np.nan, np.nan, np.nan]), window=3)
+    assert median[:3].tolist() == [1.0, 2.0, 3.0]
+    assert median[3] == 3.0 and np.isnan(median[5])
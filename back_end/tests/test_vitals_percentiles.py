@@ -0,0 +1,22 @@
+from app.dependencies import get_current_user
+from app.main import app
+from fastapi.testclient import TestClient
+import pytest
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[get_current_user] = lambda: {'user_id': 'u1'}
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+
+
+@pytest.mark.parametrize('percentiles', ['nan', '50,inf', '-inf', '-1', '100.5', 'abc', ''])
+def test_invalid_percentiles_are_rejected(client, percentiles):
+    response = client.get('/api/v1/vitals/percentiles', params={
+        'start_date': '2024-03-01', 'end_date': '2024-03-07', 'percentiles': percentiles,
+    })
+    assert response.status_code == 422
@@ -0,0 +1,76 @@
+from app.services import write_behind
+from app.services.write_behind import WriteBehindQueue
+from app.utils.circuit_breaker import CircuitBreaker
+import asyncio
+import logging
+import pytest
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db, self.writes = db, []
+
+    def set(self, ref, data, merge=False):
+        self.writes.append((ref, data))
+
+    def update(self, ref, data):
+        self.writes.append((ref, data))
+
+    def commit(self, timeout=None):
+        self.db.commits += 1
+        if any(ref in self.db.broken for ref, _ in self.writes):
+            raise RuntimeError("404 No document to update")
+        for ref, data in self.writes:
+            self.db.docs.setdefault(ref, {}).update(data)
+
+
+class FakeFirestore:
+    def __init__(self, broken=()):
+        self.docs, self.broken, self.commits = {}, set(broken), 0
+
+    def document(self, path):
+        return path
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+@pytest.fixture(autouse=True)
+def breaker(monkeypatch):
+    breaker = CircuitBreaker('test', min_calls=1000)
+    monkeypatch.setattr(write_behind, 'get_firestore_breaker', lambda: breaker)
+    return breaker
+
+
+def test_one_bad_write_does_not_lose_the_rest_of_its_batch(caplog):
+    db = FakeFirestore(broken={'users/gone'})
+
+    async def scenario():
+        queue = WriteBehindQueue(lambda: db, flush_interval=60, max_retries=2)
+        for user in ('a', 'gone', 'b'):
+            queue.enqueue(f'users/{user}', {'last_login': 1}, op='update')
+        await queue.drain()
+        return queue
+
+    with caplog.at_level(logging.WARNING, logger=write_behind.__name__):
+        queue = asyncio.run(scenario())
+    assert set(db.docs) == {'users/a', 'users/b'}
+    assert queue.stats['written'] == 2 and queue.stats['dropped'] == 1
+    assert queue.pending_count() == 0
+    assert any('Dropped deferred write to users/gone' in record.message for record in caplog.records)
+
+
+def test_writes_left_at_shutdown_are_logged(breaker, caplog):
+    db = FakeFirestore()
+
+    async def scenario():
+        queue = WriteBehindQueue(lambda: db, flush_interval=60)
+        queue.enqueue('users/a', {'last_login': 1})
+        breaker._open()  # Firestore is down: nothing can be written
+        await queue.drain()
+        return queue
+
+    with caplog.at_level(logging.ERROR, logger=write_behind.__name__):
+        queue = asyncio.run(scenario())
+    assert db.commits == 0 and queue.stats['dropped'] == 1
+    assert any('users/a' in record.message for record in caplog.records)